@@ -0,0 +1,90 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from django.conf import settings
+from .models import ProfileAnalysis
+
+
+def content_hash(profile_data: Dict[str, Any], fields: Iterable[str], version: int = 1) -> str:
+    """
+    Stable hash of the profile fields a prompt uses. Any change to those fields (or to the
+    prompt version) produces a new hash, which invalidates previously cached analyses.
+    """
+    payload = {field: profile_data.get(field) for field in fields}
+    encoded = json.dumps([version, payload], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class ProfileAnalysisCache:
+    """
+    Two-level cache of Gemini profile analyses: an in-process LRU in front of the
+    profile_analyses table. Entries are looked up by content hash, so a profile is
+    analyzed once per revision of the fields its prompt uses.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[Tuple[str, str], Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> int:
+        if self.maxsize is not None:
+            return self.maxsize
+        return settings.GEMINI_ANALYSIS_CACHE_SIZE
+
+    def _remember(self, key: Tuple[str, str], analysis: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity():
+                self._entries.popitem(last=False)
+
+    def get(self, profile_type: str, profile_id, digest: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached analysis for this profile revision, or None
+        """
+        key = (profile_type, digest)
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                return analysis
+
+        if profile_id is None:
+            return None
+
+        row = ProfileAnalysis.objects.filter(
+            profileType=profile_type,
+            profileId=profile_id,
+            contentHash=digest
+        ).values_list('analysis', flat=True).first()
+        if row is not None:
+            self._remember(key, row)
+        return row
+
+    def store(self, profile_type: str, profile_id, digest: str, analysis: Dict[str, Any]):
+        """
+        Store an analysis, replacing any analysis of an older revision of the same profile
+        """
+        self._remember((profile_type, digest), analysis)
+        if profile_id is not None:
+            ProfileAnalysis.objects.update_or_create(
+                profileType=profile_type,
+                profileId=profile_id,
+                defaults={'contentHash': digest, 'analysis': analysis}
+            )
+
+    def forget(self, profile_type: str, profile_id):
+        """
+        Drop the persisted analysis of a deleted profile
+        """
+        ProfileAnalysis.objects.filter(profileType=profile_type, profileId=profile_id).delete()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+profile_analysis_cache = ProfileAnalysisCache()
@@ -0,0 +1,381 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+from django.conf import settings
+from django.db.models import Count, Max
+import numpy as np
+from .models import StudentProfile, ProfessorProfile
+from .text_vectors import PROFESSOR_TEXT_FIELDS, HashingVectorizer, profile_vector
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+KMEANS_ITERATIONS = 10
+MIN_CAPACITY = 64
+# Retrain (and compact) once the row count, which grows with every insert and update, outgrows the trained size this much
+RETRAIN_GROWTH = 2
+DATA_FILES = ('vectors.f32', 'ids.u8', 'lists.i32')
+# Mutations kept in meta.json so other processes can catch up without rescanning every row
+MUTATION_LOG_SIZE = 256
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Unit-norm centroids for L2-normalized vectors (k-means on cosine similarity)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms > 0, norms, 1)
+    return centroids.astype(np.float32)
+
+
+class ProfessorVectorIndex:
+    """
+    IVF (inverted file) index over the text vectors of professors accepting students.
+
+    Vectors are clustered with spherical k-means into ~sqrt(n) lists; a query scores the
+    centroids, then only the rows of the `nprobe` closest lists, so retrieval touches about
+    nprobe * sqrt(n) vectors instead of all n. Rows live in memory-mapped files under
+    ANN_INDEX_DIR (vectors, ids, list assignment) and are inserted/deleted in place by the
+    ProfessorProfile signals; meta.json holds the row count, a version counter and the
+    catalog fingerprint. Processes sharing the directory serialize writes with a file lock
+    and, when the version moves, replay the recent mutations logged in meta.json (a full
+    reload only after a rebuild or a longer gap). A fingerprint mismatch (edits that
+    bypassed the signals, checked at most every ANN_FINGERPRINT_INTERVAL seconds) triggers
+    a full rebuild, which also retrains the centroids, as does doubling the catalog since
+    the last training. A signal edit only records the database fingerprint when it is the
+    one the edit leads to; otherwise the index is marked stale and rebuilt on next use.
+    """
+
+    def __init__(self, directory=None, dim: Optional[int] = None, nprobe: Optional[int] = None):
+        self._directory = Path(directory) if directory else None
+        self._dim = dim
+        self._nprobe = nprobe
+        self._lock = threading.RLock()
+        self._meta: Optional[Dict] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._lists: Optional[np.ndarray] = None
+        self._rows: Dict[uuid.UUID, int] = {}
+        self._members: Dict[int, Set[int]] = {}
+        self._fingerprint_checked_at: Optional[float] = None
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or Path(settings.ANN_INDEX_DIR)
+
+    @property
+    def dim(self) -> int:
+        return self._dim or settings.TEXT_VECTOR_DIM
+
+    @property
+    def nprobe(self) -> int:
+        return self._nprobe or settings.ANN_NPROBE
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # Files
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    @contextmanager
+    def _file_lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path('lock'), 'w') as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self._path('meta.json')) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta: Dict):
+        temporary = self._path('meta.json.tmp')
+        with open(temporary, 'w') as handle:
+            json.dump(meta, handle)
+        os.replace(temporary, self._path('meta.json'))
+        self._meta = meta
+
+    def _open(self, capacity: int, mode: str = 'r+', suffix: str = ''):
+        self._vectors = np.memmap(self._path('vectors.f32' + suffix), dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+        self._ids = np.memmap(self._path('ids.u8' + suffix), dtype=np.uint8, mode=mode, shape=(capacity, 16))
+        self._lists = np.memmap(self._path('lists.i32' + suffix), dtype=np.int32, mode=mode, shape=(capacity,))
+
+    def _create(self, capacity: int):
+        """
+        Map new, empty data files; _publish() moves them into place
+        """
+        self._open(capacity, mode='w+', suffix='.tmp')
+
+    def _publish(self):
+        # New files replace the old ones atomically; processes still mapping the old
+        # files keep a valid (unlinked) copy until they reload
+        self._flush()
+        for name in DATA_FILES:
+            os.replace(self._path(name + '.tmp'), self._path(name))
+
+    def _load(self, meta: Dict):
+        """
+        Map the files and rebuild the in-memory id -> row and list -> rows lookups
+        """
+        self._meta = meta
+        self._centroids = np.load(self._path('centroids.npy'))
+        self._open(meta['capacity'])
+        self._rows = {}
+        self._members = {cluster: set() for cluster in range(len(self._centroids))}
+        count = meta['count']
+        for row in np.flatnonzero(self._lists[:count] >= 0):
+            row = int(row)
+            self._rows[uuid.UUID(bytes=self._ids[row].tobytes())] = row
+            self._members[int(self._lists[row])].add(row)
+
+    def _catch_up(self, meta: Dict) -> bool:
+        """
+        Apply the mutations other processes made since the loaded version, from the log in
+        meta.json. False when that isn't possible (rebuilt since, or the log doesn't reach
+        back far enough) and a full _load is needed.
+        """
+        loaded = self._meta
+        if loaded is None or meta.get('generation') != loaded.get('generation'):
+            return False
+        log = [entry for entry in meta.get('log', []) if entry[0] > loaded['version']]
+        if len(log) != meta['version'] - loaded['version']:
+            return False
+        if meta['capacity'] != loaded['capacity']:
+            self._open(meta['capacity'])  # Grown: the data files were replaced
+        for _, row, cluster in log:
+            if row is None:
+                continue
+            professor_id = uuid.UUID(bytes=self._ids[row].tobytes())
+            if self._rows.get(professor_id) == row:
+                del self._rows[professor_id]
+            self._members[cluster].discard(row)
+        # Rows are only appended; ones deleted again within the gap are marked -1
+        for row in range(loaded['count'], meta['count']):
+            cluster = int(self._lists[row])
+            if cluster >= 0:
+                self._rows[uuid.UUID(bytes=self._ids[row].tobytes())] = row
+                self._members[cluster].add(row)
+        self._meta = meta
+        return True
+
+    def _refresh(self, meta: Dict):
+        if self._meta is None or meta['version'] != self._meta['version']:
+            if not self._catch_up(meta):
+                self._load(meta)
+
+    def _fingerprint_stale(self, meta: Dict) -> bool:
+        now = time.monotonic()
+        if (self._fingerprint_checked_at is not None and
+                now - self._fingerprint_checked_at < settings.ANN_FINGERPRINT_INTERVAL):
+            return False
+        self._fingerprint_checked_at = now
+        return meta.get('fingerprint') != self._current_fingerprint()
+
+    def _current_fingerprint(self) -> List:
+        stats = ProfessorProfile.objects.aggregate(total=Count('id'), updated=Max('updatedAt'))
+        return [stats['total'], stats['updated'].isoformat() if stats['updated'] else None]
+
+    # Building
+
+    def build(self, ids: Sequence, vectors: np.ndarray, fingerprint=None):
+        """
+        Write a fresh index for these professor ids and unit-norm vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        with self._lock, self._file_lock():
+            n_lists = max(1, min(len(ids), int(round(np.sqrt(len(ids))))))
+            centroids = spherical_kmeans(vectors, n_lists) if len(ids) else np.zeros((1, self.dim), np.float32)
+            capacity = max(MIN_CAPACITY, 2 * len(ids))
+            self._create(capacity)
+            if len(ids):
+                self._vectors[:len(ids)] = vectors
+                self._ids[:len(ids)] = np.frombuffer(b''.join(uuid.UUID(str(i)).bytes for i in ids), np.uint8).reshape(-1, 16)
+                self._lists[:len(ids)] = np.argmax(vectors @ centroids.T, axis=1)
+            self._publish()
+            with open(self._path('centroids.npy.tmp'), 'wb') as handle:
+                np.save(handle, centroids)
+            os.replace(self._path('centroids.npy.tmp'), self._path('centroids.npy'))
+            previous = self._read_meta() or {}
+            meta = {'dim': self.dim, 'capacity': capacity, 'count': len(ids), 'trained': len(ids),
+                    'fingerprint': fingerprint, 'version': previous.get('version', 0) + 1,
+                    'generation': previous.get('generation', 0) + 1, 'log': []}
+            self._write_meta(meta)
+            self._load(meta)
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from the database (retrains the centroids)
+        """
+        vectorizer = HashingVectorizer(self.dim)
+        fingerprint = self._current_fingerprint()
+        self._fingerprint_checked_at = time.monotonic()
+        professors = ProfessorProfile.objects.filter(acceptingStudents=True).only('id', 'textVector', *PROFESSOR_TEXT_FIELDS)
+        ids, vectors = [], []
+        for professor in professors.iterator(chunk_size=2000):
+            ids.append(professor.id)
+            vectors.append(profile_vector(professor, vectorizer))
+        self.build(ids, np.array(vectors, dtype=np.float32).reshape(len(ids), self.dim), fingerprint)
+
+    def _ensure_fresh(self):
+        with self._lock:
+            meta = self._read_meta()
+            if meta is None or meta.get('dim') != self.dim or meta.get('stale') or self._fingerprint_stale(meta):
+                self.rebuild()
+            elif meta['count'] > RETRAIN_GROWTH * max(meta['trained'], MIN_CAPACITY):
+                self.rebuild()  # Mostly inserted after training; the lists are unbalanced
+            else:
+                self._refresh(meta)
+
+    def _flush(self):
+        for array in (self._vectors, self._ids, self._lists):
+            array.flush()
+
+    # Incremental updates
+
+    def _grow(self):
+        meta = dict(self._meta)
+        count, capacity = meta['count'], meta['capacity'] * 2
+        old = (self._vectors[:count], self._ids[:count], self._lists[:count])
+        self._create(capacity)
+        self._vectors[:count], self._ids[:count], self._lists[:count] = old
+        self._publish()
+        meta['capacity'] = capacity
+        self._meta = meta
+
+    def _delete_row(self, professor_id) -> Tuple[Optional[int], Optional[int]]:
+        row = self._rows.pop(professor_id, None)
+        if row is None:
+            return None, None
+        cluster = int(self._lists[row])
+        self._members[cluster].discard(row)
+        self._lists[row] = -1
+        return row, cluster
+
+    def _mutate(self, professor_id, vector: Optional[np.ndarray], expect: Optional[Callable] = None):
+        """
+        Apply one edit. `expect` maps the stored fingerprint to the one this edit alone leads
+        to (None if unknown); without it the stored fingerprint is kept.
+        """
+        with self._lock, self._file_lock():
+            meta = self._read_meta()
+            if meta is None or meta.get('dim') != self.dim:
+                return  # Not built yet; the first lookup builds it from the database
+            self._refresh(meta)
+
+            professor_id = uuid.UUID(str(professor_id))
+            deleted_row, deleted_cluster = self._delete_row(professor_id)
+            if vector is not None:
+                if self._meta['count'] >= self._meta['capacity']:
+                    self._grow()
+                row = self._meta['count']
+                cluster = int(np.argmax(self._centroids @ vector))
+                self._vectors[row] = vector
+                self._ids[row] = np.frombuffer(professor_id.bytes, np.uint8)
+                self._lists[row] = cluster
+                self._rows[professor_id] = row
+                self._members[cluster].add(row)
+                self._meta = dict(self._meta, count=row + 1)
+            self._flush()
+            version = meta['version'] + 1
+            log = (meta.get('log', []) + [[version, deleted_row, deleted_cluster]])[-MUTATION_LOG_SIZE:]
+            fingerprint, stale = meta['fingerprint'], meta.get('stale', False)
+            if expect is not None:
+                # Other hosts' edits may be in the database too; only a match proves they aren't
+                expected = expect(fingerprint) if fingerprint else None
+                fingerprint = self._current_fingerprint()
+                stale = stale or expected != fingerprint
+            self._write_meta(dict(self._meta, version=version, log=log, fingerprint=fingerprint, stale=stale))
+
+    def add(self, professor_id, vector: np.ndarray, expect: Optional[Callable] = None):
+        """
+        Insert or replace one professor's vector
+        """
+        self._mutate(professor_id, vector, expect)
+
+    def discard(self, professor_id, expect: Optional[Callable] = None):
+        self._mutate(professor_id, None, expect)
+
+    def update_professor(self, professor: ProfessorProfile, created: bool = False):
+        """
+        Re-index one professor after it was saved (removed if no longer accepting students)
+        """
+        def expect(fingerprint):
+            total, updated = fingerprint
+            latest = max(datetime.fromisoformat(updated), professor.updatedAt) if updated else professor.updatedAt
+            return [total + 1 if created else total, latest.isoformat()]
+
+        if professor.acceptingStudents:
+            self.add(professor.id, profile_vector(professor, HashingVectorizer(self.dim)), expect)
+        else:
+            self.discard(professor.id, expect)
+
+    def remove_professor(self, professor_id, updated_at: Optional[datetime] = None):
+        """
+        Drop a deleted professor from the index
+        """
+        def expect(fingerprint):
+            total, updated = fingerprint
+            # The latest update is only known to survive if the deleted row wasn't the latest
+            if updated_at is None or updated is None or updated_at >= datetime.fromisoformat(updated):
+                return None
+            return [total - 1, updated]
+
+        self.discard(professor_id, expect)
+
+    # Queries
+
+    def search(self, vector: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[uuid.UUID, float]]:
+        """
+        Approximate k most similar professors as (id, cosine similarity), best first
+        """
+        with self._lock:
+            if self._meta is None or not self._rows or k <= 0:
+                return []
+            probes = np.argsort(-(self._centroids @ vector))[:nprobe or self.nprobe]
+            rows = np.fromiter(
+                (row for cluster in probes for row in self._members.get(int(cluster), ())), dtype=np.int64
+            )
+            if len(rows) == 0:
+                return []
+            scores = self._vectors[rows] @ vector
+            best = np.argpartition(-scores, min(k, len(rows)) - 1)[:k]
+            best = best[np.argsort(-scores[best], kind='stable')]
+            return [(uuid.UUID(bytes=self._ids[rows[i]].tobytes()), float(scores[i])) for i in best]
+
+    def top_k(self, student: StudentProfile, k: int) -> List[Tuple[uuid.UUID, float]]:
+        """
+        Professors whose descriptions are most similar to the student's, best first
+        """
+        self._ensure_fresh()
+        return self.search(profile_vector(student, HashingVectorizer(self.dim)), k)
+
+
+professor_vector_index = ProfessorVectorIndex()
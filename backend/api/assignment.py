@@ -0,0 +1,109 @@
+import heapq
+import time
+from typing import Dict
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+import numpy as np
+from .models import ProfessorProfile, Match
+
+ASSIGNMENT_WRITE_CHUNK_SIZE = 5000
+
+
+def deferred_acceptance(students: np.ndarray, professors: np.ndarray, scores: np.ndarray,
+                        capacities: np.ndarray) -> np.ndarray:
+    """
+    Student-proposing deferred acceptance on a sparse bipartite graph given as edge arrays
+    (student index, professor index, pair score). Both sides rank by the pair score; ties
+    go to the lower professor index for students and the lower student index for
+    professors, so preferences are strict and the result is a stable assignment that no
+    professor exceeds. Returns the indices of the chosen edges, sorted.
+    """
+    if len(students) == 0:
+        return np.zeros(0, dtype=np.int64)
+    n_students = int(students.max()) + 1
+
+    # CSR layout: each student's edges contiguous, best first
+    order = np.lexsort((professors, -scores, students))
+    indptr = np.searchsorted(students[order], np.arange(n_students + 1))
+    order, indptr = order.tolist(), indptr.tolist()
+    next_edge = indptr[:-1]
+    edge_professors, edge_scores, capacities = professors.tolist(), scores.tolist(), capacities.tolist()
+
+    # Per professor, a min-heap of held proposals; the root is the one to reject first
+    held = [[] for _ in range(len(capacities))]
+    free = list(range(n_students - 1, -1, -1))
+    while free:
+        student = free.pop()
+        while next_edge[student] < indptr[student + 1]:
+            edge = order[next_edge[student]]
+            next_edge[student] += 1
+            professor = edge_professors[edge]
+            capacity = capacities[professor]
+            if capacity <= 0:
+                continue
+            proposal = (edge_scores[edge], -student, edge)
+            heap = held[professor]
+            if len(heap) < capacity:
+                heapq.heappush(heap, proposal)
+                break
+            if proposal > heap[0]:
+                rejected = heapq.heapreplace(heap, proposal)
+                free.append(-rejected[1])
+                break
+    return np.array(sorted(edge for heap in held for _, _, edge in heap), dtype=np.int64)
+
+
+def assignment_edges():
+    """
+    The matches of professors accepting students: the edges of the assignment
+    """
+    return Match.objects.filter(professor__acceptingStudents=True, professor__capacity__gt=0)
+
+
+def assign_students() -> Dict[str, float]:
+    """
+    Compute the global assignment over the existing matches of professors accepting
+    students and store it in Match.assigned. The AI score is the preference where there
+    is one, the basic score otherwise.
+    """
+    started = time.monotonic()
+    professor_index: Dict = {}
+    capacities = []
+    for professor_id, capacity in ProfessorProfile.objects.filter(
+        acceptingStudents=True, capacity__gt=0
+    ).values_list('id', 'capacity').iterator(chunk_size=5000):
+        professor_index[professor_id] = len(capacities)
+        capacities.append(capacity)
+
+    student_index: Dict = {}
+    match_ids, students, professors, scores = [], [], [], []
+    edges = assignment_edges().values_list('id', 'student_id', 'professor_id', Coalesce(F('aiScore'), F('score')))
+    for match_id, student_id, professor_id, score in edges.iterator(chunk_size=5000):
+        # Professors opened or created after the capacities were read wait for the next run
+        if professor_id not in professor_index:
+            continue
+        match_ids.append(match_id)
+        students.append(student_index.setdefault(student_id, len(student_index)))
+        professors.append(professor_index[professor_id])
+        scores.append(float(score))
+
+    chosen = deferred_acceptance(
+        np.array(students, dtype=np.int64),
+        np.array(professors, dtype=np.int64),
+        np.array(scores, dtype=np.float64),
+        np.array(capacities, dtype=np.int64),
+    )
+    assigned_ids = [match_ids[edge] for edge in chosen]
+
+    with transaction.atomic():
+        Match.objects.filter(assigned=True).update(assigned=False)
+        for start in range(0, len(assigned_ids), ASSIGNMENT_WRITE_CHUNK_SIZE):
+            Match.objects.filter(id__in=assigned_ids[start:start + ASSIGNMENT_WRITE_CHUNK_SIZE]).update(assigned=True)
+
+    return {
+        'students': len(student_index),
+        'assigned': len(assigned_ids),
+        'professors': len({professors[edge] for edge in chosen}),
+        'seconds': round(time.monotonic() - started, 2),
+    }
@@ -0,0 +1,246 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+import numpy as np
+from .models import StudentProfile, ProfessorProfile, Match
+from .matching_service import MatchingService, text_similarity_score, upsert_matches
+from .rematch import REMATCH_UPDATE_FIELDS, STUDENT_MATCHING_FIELDS
+from .scoring_engine import BasicScoringEngine
+from .text_vectors import HashingVectorizer, profile_vector
+
+# Text similarity only breaks ties between equal basic scores (which move in steps of 5)
+SIMILARITY_TIE_BREAK = 0.5
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    'i/n' -> (i, n) with 0 <= i < n
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected i/n")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{value}', expected 0 <= i < n")
+    return index, count
+
+
+def shard_slice(total: int, index: int, count: int) -> slice:
+    """
+    Contiguous, near-equal share of `total` ordered rows for shard `index` of `count`
+    """
+    return slice(total * index // count, total * (index + 1) // count)
+
+
+class BlockScorer:
+    """
+    Scores blocks of encoded students against the whole professor catalog and keeps the
+    top-K professors of each student. Holds only numpy arrays, so worker processes can
+    run it without touching the database.
+    """
+
+    def __init__(self, engine: BasicScoringEngine, professor_vectors: np.ndarray, top_k: int):
+        self.engine = engine
+        self.professor_vectors = professor_vectors
+        self.top_k = top_k
+
+    def __call__(self, encoded: Tuple[np.ndarray, ...], student_vectors: np.ndarray):
+        """
+        (professor indices, scores, similarities), each students x K; index -1 marks an empty slot
+        """
+        n_professors = len(self.engine)
+        k = min(self.top_k, n_professors)
+        if k == 0:
+            empty = np.zeros((len(student_vectors), 0))
+            return empty.astype(np.int64), empty.astype(np.int64), empty.astype(np.float32)
+
+        scores = self.engine.score_encoded(encoded)
+        similarities = student_vectors @ self.professor_vectors.T
+        ranking = scores + SIMILARITY_TIE_BREAK * np.clip(similarities, -1, 1)
+        best = np.argpartition(-ranking, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(ranking, best, axis=1), axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        best_similarities = np.take_along_axis(similarities, best, axis=1)
+        # Nothing in common at all: not worth a match row
+        best[(best_scores <= 0) & (best_similarities <= 0)] = -1
+        return best, best_scores, best_similarities
+
+
+_scorer: Optional[BlockScorer] = None
+
+
+def _init_worker(scorer: BlockScorer):
+    global _scorer
+    _scorer = scorer
+
+
+def _score_block(encoded: Tuple[np.ndarray, ...], student_vectors: np.ndarray):
+    return _scorer(encoded, student_vectors)
+
+
+def _worker_started() -> bool:
+    return _scorer is not None
+
+
+def _close_connections_before_fork():
+    """
+    Forked workers must not inherit open database sockets: a child closing its copy would
+    end the parent's session. Connections inside a transaction (a test case) belong to
+    the caller and stay open; the workers never use them.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+class AllPairsMatcher:
+    """
+    Recompute the students x professors match matrix: students are streamed in blocks,
+    scored against the encoded professor catalog (basic score, text similarity as the
+    tie-break) across a process pool, and each student's top-K professors are upserted.
+    AI fields of existing matches are kept. With prune=True, a student's other matches
+    (including those of professors no longer accepting students) are deleted.
+    """
+
+    def __init__(self, top_k: Optional[int] = None, block_size: int = 256, workers: int = 1,
+                 shard: Tuple[int, int] = (0, 1), prune: bool = False):
+        self.top_k = top_k or settings.MATCHING_CANDIDATE_TOP_K
+        self.block_size = max(1, block_size)
+        self.workers = max(1, workers)
+        self.shard = shard
+        self.prune = prune
+        self.vectorizer = HashingVectorizer()
+
+    def _load_catalog(self) -> BlockScorer:
+        self.professors: List[ProfessorProfile] = list(
+            ProfessorProfile.objects.filter(acceptingStudents=True).order_by('id')
+        )
+        vectors = np.zeros((len(self.professors), self.vectorizer.dim), dtype=np.float32)
+        for row, professor in enumerate(self.professors):
+            vectors[row] = profile_vector(professor, self.vectorizer)
+        return BlockScorer(BasicScoringEngine(self.professors), vectors, self.top_k)
+
+    def _student_blocks(self) -> List[List]:
+        ids = list(StudentProfile.objects.order_by('id').values_list('id', flat=True))
+        ids = ids[shard_slice(len(ids), *self.shard)]
+        return [ids[start:start + self.block_size] for start in range(0, len(ids), self.block_size)]
+
+    def _load_block(self, scorer: BlockScorer, ids: Sequence):
+        students = list(StudentProfile.objects.filter(id__in=ids).only(*STUDENT_MATCHING_FIELDS).order_by('id'))
+        vectors = np.zeros((len(students), self.vectorizer.dim), dtype=np.float32)
+        for row, student in enumerate(students):
+            vectors[row] = profile_vector(student, self.vectorizer)
+        return students, (scorer.engine.encode_students(students), vectors)
+
+    def run(self, progress: Optional[Callable[[int, int, int], None]] = None) -> Dict[str, int]:
+        """
+        Match every student of the shard; progress(students_done, students_total, matches_written)
+        is called after each block
+        """
+        scorer = self._load_catalog()
+        blocks = self._student_blocks()
+        total = sum(len(block) for block in blocks)
+        stats = {'students': 0, 'matches': 0, 'pruned': 0}
+
+        def finish(students, result):
+            written, pruned = self._write_block(students, *result)
+            stats['students'] += len(students)
+            stats['matches'] += written
+            stats['pruned'] += pruned
+            if progress:
+                progress(stats['students'], total, stats['matches'])
+
+        if self.workers == 1 or len(blocks) <= 1:
+            for ids in blocks:
+                students, args = self._load_block(scorer, ids)
+                finish(students, scorer(*args))
+            return stats
+
+        # Forked workers inherit the catalog arrays instead of receiving a pickled copy,
+        # and never use the database
+        context = multiprocessing.get_context('fork')
+        _close_connections_before_fork()
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(scorer,)) as pool:
+            # Fork every worker now, before loading the first block reopens a connection
+            pool.submit(_worker_started).result()
+            pending = {}
+            queue = iter(blocks)
+            # A couple of blocks in flight per worker keeps them busy while bounding memory
+            for ids in queue:
+                students, args = self._load_block(scorer, ids)
+                pending[pool.submit(_score_block, *args)] = students
+                if len(pending) >= 2 * self.workers:
+                    break
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(pending.pop(future), future.result())
+                    ids = next(queue, None)
+                    if ids is not None:
+                        students, args = self._load_block(scorer, ids)
+                        pending[pool.submit(_score_block, *args)] = students
+        return stats
+
+    def _write_block(self, students: List[StudentProfile], best: np.ndarray, scores: np.ndarray,
+                     similarities: np.ndarray) -> Tuple[int, int]:
+        """
+        Upsert the kept pairs of a block (one prefetch, chunked upserts); returns (written, pruned)
+        """
+        kept: Dict = {}
+        for row, student in enumerate(students):
+            kept[student.id] = [
+                (self.professors[index], int(scores[row, column]), float(similarities[row, column]))
+                for column, index in enumerate(best[row]) if index >= 0
+            ]
+
+        pairs = Q(pk__in=[])
+        for student_id, entries in kept.items():
+            pairs |= Q(student_id=student_id, professor_id__in=[professor.id for professor, _, _ in entries])
+        existing = {
+            (student_id, professor_id): detailed
+            for student_id, professor_id, detailed in Match.objects.filter(pairs).values_list(
+                'student_id', 'professor_id', 'detailedScores'
+            )
+        }
+
+        matches = []
+        for student in students:
+            for professor, score, similarity in kept[student.id]:
+                detailed_scores = {**(existing.get((student.id, professor.id)) or {}),
+                                   'textSimilarity': text_similarity_score(similarity)}
+                matches.append(Match(
+                    student=student,
+                    professor=professor,
+                    score=score,
+                    aiScore=score,
+                    detailedScores=detailed_scores,
+                    highlights=MatchingService._generate_highlights(student, professor),
+                    studentInterests=student.primaryInterests,
+                    professorInterests=professor.researchAreas,
+                ))
+        upsert_matches(matches, REMATCH_UPDATE_FIELDS)
+
+        pruned = 0
+        if self.prune:
+            stale = Q(pk__in=[])
+            for student_id, entries in kept.items():
+                stale |= Q(student_id=student_id) & ~Q(professor_id__in=[professor.id for professor, _, _ in entries])
+            pruned, _ = Match.objects.filter(stale).delete()
+        return len(matches), pruned
+
+
+def rematch_all(progress: Optional[Callable[[int, int, int], None]] = None, **options) -> Dict[str, float]:
+    """
+    Recompute every student's top-K matches (see AllPairsMatcher for the options)
+    """
+    started = time.monotonic()
+    stats = AllPairsMatcher(**options).run(progress)
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    return stats
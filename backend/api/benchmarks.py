@@ -0,0 +1,164 @@
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from .models import StudentProfile, ProfessorProfile, Match, ProfileAnalysis
+from .analysis_cache import profile_analysis_cache
+from .gemini_executor import GeminiRequestExecutor
+from .llm_backends import FakeGeminiModel
+from .matching_service import MatchingService, upsert_matches
+from .scoring_engine import BasicScoringEngine
+from .synthetic import SyntheticCatalog
+
+# Matches written per student by the bulk write benchmark
+UPSERT_MATCHES_PER_STUDENT = 20
+
+
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> List[float]:
+    """
+    Wall-clock seconds of `repeat` calls of fn; setup (untimed) runs before each call
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def result(name: str, students: int, professors: int, operations: int, timings: List[float]) -> Dict[str, Any]:
+    best = min(timings)
+    return {
+        'benchmark': name,
+        'students': students,
+        'professors': professors,
+        'operations': operations,
+        'seconds': round(best, 6),
+        'median_seconds': round(statistics.median(timings), 6),
+        'operations_per_second': round(operations / best, 1) if best > 0 else None,
+        'repeat': len(timings),
+    }
+
+
+class MatchingBenchmark:
+    """
+    Benchmarks of the matching hot paths on synthetic catalogs: the per-pair basic score,
+    the batched scoring engine and highlight generation in memory, and with database=True
+    the bulk match upsert and a full _run_matching_process per student with the fake model
+    backend (no latency). Database benchmarks run in a throwaway test database.
+    """
+
+    def __init__(self, catalog: SyntheticCatalog, repeat: int = 3, end_to_end_students: int = 3):
+        self.catalog = catalog
+        self.repeat = repeat
+        self.end_to_end_students = end_to_end_students
+        self.service = MatchingService()
+
+    def in_memory(self, n_students: int, n_professors: int) -> List[Dict[str, Any]]:
+        students, professors = self.catalog.students(n_students), self.catalog.professors(n_professors)
+        pairs = n_students * n_professors
+        score, highlights = self.service._calculate_basic_score, MatchingService._generate_highlights
+
+        def per_pair():
+            for student in students:
+                for professor in professors:
+                    score(student, professor)
+
+        def batched():
+            engine = BasicScoringEngine(professors)
+            for student in students:
+                engine.score(student)
+
+        def all_highlights():
+            for student in students:
+                for professor in professors:
+                    highlights(student, professor)
+
+        return [
+            result('basic_score_per_pair', n_students, n_professors, pairs, measure(per_pair, self.repeat)),
+            result('basic_score_batched', n_students, n_professors, pairs, measure(batched, self.repeat)),
+            result('highlights', n_students, n_professors, pairs, measure(all_highlights, self.repeat)),
+        ]
+
+    def with_database(self, n_students: int, n_professors: int) -> List[Dict[str, Any]]:
+        Match.objects.all().delete()
+        StudentProfile.objects.all().delete()
+        ProfessorProfile.objects.all().delete()
+        students = StudentProfile.objects.bulk_create(self.catalog.students(n_students), batch_size=1000)
+        professors = ProfessorProfile.objects.bulk_create(self.catalog.professors(n_professors), batch_size=1000)
+        per_student = min(UPSERT_MATCHES_PER_STUDENT, n_professors)
+        matches = [
+            Match(student=student, professor=professor, score=50, aiScore=50)
+            for student in students for professor in professors[:per_student]
+        ]
+        results = [
+            result('match_upsert_insert', n_students, n_professors, len(matches),
+                   measure(lambda: upsert_matches(matches), self.repeat, setup=lambda: Match.objects.all().delete())),
+            result('match_upsert_update', n_students, n_professors, len(matches),
+                   measure(lambda: upsert_matches(matches), self.repeat)),
+        ]
+
+        self.service.gemini_service.model = FakeGeminiModel()
+        self.service.gemini_service.executor = GeminiRequestExecutor(
+            max_in_flight=settings.GEMINI_MAX_IN_FLIGHT, requests_per_minute=1e9
+        )
+        sample = students[:self.end_to_end_students]
+
+        def reset():
+            Match.objects.all().delete()
+            ProfileAnalysis.objects.all().delete()
+            profile_analysis_cache.clear()
+
+        def run():
+            # The service logs every model response; keep them out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                for student in sample:
+                    self.service._run_matching_process(student.id)
+
+        if sample:
+            results.append(result('run_matching_process', n_students, n_professors, len(sample),
+                                  measure(run, self.repeat, setup=reset)))
+        return results
+
+    def run(self, scales: List[tuple], database: bool = True) -> List[Dict[str, Any]]:
+        results = []
+        for n_students, n_professors in scales:
+            results.extend(self.in_memory(n_students, n_professors))
+        if database:
+            with isolated_database():
+                for n_students, n_professors in scales:
+                    results.extend(self.with_database(n_students, n_professors))
+        return results
+
+
+@contextlib.contextmanager
+def isolated_database():
+    """
+    Run against a fresh, migrated test database (and a temporary ANN index directory)
+    that is destroyed afterwards
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with tempfile.TemporaryDirectory() as directory, override_settings(ANN_INDEX_DIR=directory):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def parse_scale(value: str) -> tuple:
+    """
+    'STUDENTSxPROFESSORS' -> (students, professors)
+    """
+    try:
+        n_students, n_professors = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Invalid scale '{value}', expected STUDENTSxPROFESSORS")
+    return n_students, n_professors
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Set
+import psycopg2
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from .progress import PROGRESS_CHANNEL, aget_matching_status
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ('completed', 'failed')
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class ProgressListener:
+    """
+    One LISTEN connection per event loop, shared by all of its streams. A notification on
+    PROGRESS_CHANNEL wakes only the streams of the student it names; the connection is
+    opened by the first subscriber and closed when the last one leaves.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.connection = None
+        self.subscribers: Dict[str, Set[asyncio.Event]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, student_id) -> asyncio.Event:
+        """
+        Event set whenever the student's status is written. Without a listener connection
+        it is never set and streams fall back to polling.
+        """
+        changed = asyncio.Event()
+        self.subscribers[str(student_id)].add(changed)
+        async with self._lock:
+            if self.connection is None:
+                try:
+                    connection = await asyncio.to_thread(self._connect)
+                except psycopg2.Error:
+                    logger.exception("Matching progress listener failed to connect; streams fall back to polling")
+                else:
+                    self.connection = connection
+                    self.loop.add_reader(connection.fileno(), self._dispatch)
+        return changed
+
+    def unsubscribe(self, student_id, changed: asyncio.Event):
+        key = str(student_id)
+        self.subscribers[key].discard(changed)
+        if not self.subscribers[key]:
+            del self.subscribers[key]
+        if not self.subscribers and self.connection is not None:
+            self._close()
+
+    def _connect(self):
+        connection = psycopg2.connect(**connections['default'].get_connection_params())
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {PROGRESS_CHANNEL}')
+        return connection
+
+    def _dispatch(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            logger.exception("Matching progress listener lost its connection; streams fall back to polling")
+            self._close()
+            return
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            for changed in self.subscribers.get(notify.payload, ()):
+                changed.set()
+
+    def _close(self):
+        self.loop.remove_reader(self.connection.fileno())
+        self.connection.close()
+        self.connection = None
+
+
+# Listeners by event loop (one under ASGI; tests run each async test in a loop of its own)
+_listeners = weakref.WeakKeyDictionary()
+
+
+def progress_listener() -> ProgressListener:
+    loop = asyncio.get_running_loop()
+    listener = _listeners.get(loop)
+    if listener is None:
+        listener = _listeners[loop] = ProgressListener(loop)
+    return listener
+
+
+async def matching_status_events(student_id) -> AsyncIterator[str]:
+    """
+    Yield a `progress` event whenever the status changes, then a final `completed` or
+    `failed` event. The status is re-read when the progress listener is notified of a
+    write, and at most every MATCHING_EVENTS_POLL_INTERVAL otherwise (a fallback for
+    writes made without a notification). Comment lines keep idle connections alive; the
+    stream ends after MATCHING_EVENTS_MAX_SECONDS so clients reconnect periodically.
+    """
+    poll_interval = settings.MATCHING_EVENTS_POLL_INTERVAL
+    keepalive = settings.MATCHING_EVENTS_KEEPALIVE
+    deadline = time.monotonic() + settings.MATCHING_EVENTS_MAX_SECONDS
+    last_status = None
+    last_sent = time.monotonic()
+    next_poll = 0.0
+
+    listener = progress_listener()
+    changed = await listener.subscribe(student_id)
+    try:
+        while True:
+            if changed.is_set() or time.monotonic() >= next_poll:
+                # Cleared before reading, so a write during the read wakes the next wait
+                changed.clear()
+                next_poll = time.monotonic() + poll_interval
+                status = await aget_matching_status(student_id)
+                if status != last_status:
+                    event = status['status'] if status['status'] in FINAL_STATUSES else 'progress'
+                    yield format_event(event, status)
+                    last_status = status
+                    last_sent = time.monotonic()
+                    if event in FINAL_STATUSES:
+                        return
+            if time.monotonic() - last_sent >= keepalive:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), min(next_poll, last_sent + keepalive, deadline) - now)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        listener.unsubscribe(student_id, changed)
+
+
+async def matching_events(request, pk):
+    """
+    Server-sent events stream of a student's matching progress.
+    Serve the project through ASGI (grad_matcher.asgi) so the stream is not buffered.
+    """
+    status = await aget_matching_status(pk)
+    if status['status'] == 'not_found':
+        return JsonResponse({'success': False, 'error': 'Student not found'}, status=404)
+
+    response = StreamingHttpResponse(matching_status_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
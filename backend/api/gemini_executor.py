@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+from django.conf import settings
+from django.db import connections
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    google.api_core exceptions expose the HTTP status as `code`; other clients use `status_code`
+    """
+    for attribute in ('code', 'status_code'):
+        code = getattr(error, attribute, None)
+        if isinstance(code, int):
+            return code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `capacity` stored
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+
+class GeminiRequestExecutor:
+    """
+    Bounded-concurrency scheduler for Gemini requests.
+
+    Every request goes through a token-bucket rate limiter and a semaphore capping the
+    number of requests in flight, and is retried with full-jitter exponential backoff on
+    429/5xx errors. `as_completed` fans work out over a thread pool of the same size, so a
+    matching run takes time proportional to professors / max_in_flight.
+    requests_per_minute=0 disables the rate limit (the cap on requests in flight remains).
+    """
+
+    def __init__(self, max_in_flight: int = 4, requests_per_minute: float = 60, max_retries: int = 4,
+                 retry_base_delay: float = 1.0, retry_max_delay: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        if requests_per_minute < 0:
+            raise ValueError(f"requests_per_minute must be 0 (unlimited) or positive, got {requests_per_minute}")
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.rate_limiter = (
+            TokenBucket(requests_per_minute / 60.0, capacity=self.max_in_flight, sleep=sleep)
+            if requests_per_minute else None
+        )
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._sleep = sleep
+
+    @classmethod
+    def from_settings(cls) -> 'GeminiRequestExecutor':
+        return cls(
+            max_in_flight=settings.GEMINI_MAX_IN_FLIGHT,
+            requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+            max_retries=settings.GEMINI_MAX_RETRIES,
+            retry_base_delay=settings.GEMINI_RETRY_BASE_DELAY,
+        )
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run one request under the rate limit and concurrency cap, retrying transient errors
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            with self._in_flight:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+            self._sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def generate(self, model, prompt: str):
+        return self.call(model.generate_content, prompt)
+
+    def as_completed(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Run fn over items on a pool of max_in_flight threads, yielding (item, result) as each
+        finishes. fn is expected to handle its own errors.
+        """
+        def run(item):
+            try:
+                return fn(item)
+            finally:
+                # Worker threads get their own DB connections (e.g. for the analysis cache)
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='gemini') as pool:
+            futures = {pool.submit(run, item): item for item in items}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+_executor: Optional[GeminiRequestExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_gemini_executor() -> GeminiRequestExecutor:
+    """
+    Process-wide executor, so the rate limit and in-flight cap apply across all matching runs
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = GeminiRequestExecutor.from_settings()
+    return _executor
@@ -1,17 +1,77 @@
-import google.generativeai as genai
 from django.conf import settings
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import json
+import logging
+from .analysis_cache import content_hash, profile_analysis_cache
+from .gemini_executor import GeminiRequestExecutor, get_gemini_executor
+from .llm_backends import get_shared_model
+from .metrics import GEMINI_ERRORS, GEMINI_FALLBACKS, GEMINI_REQUEST_DURATION, record_usage
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analysis prompts change so cached analyses are regenerated
+ANALYSIS_PROMPT_VERSION = 1
+
+# Profile fields used by the analysis prompts; the cache key is a hash of these
+STUDENT_ANALYSIS_FIELDS = [
+    'firstName', 'lastName', 'university', 'department', 'degreeLevel', 'primaryInterests', 'methods',
+    'programmingSkills', 'labSkills', 'statisticalSkills', 'hoursPerWeek', 'compensation', 'remotePreference',
+]
+PROFESSOR_ANALYSIS_FIELDS = [
+    'name', 'title', 'institution', 'department', 'researchAreas', 'researchDescription', 'methods',
+    'acceptingStudents', 'preferredDegreeLevels', 'prerequisites',
+]
 
 class GeminiMatchingService:
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+    """
+    Cheap to construct: the model and executor are process-wide and resolved on the first
+    request, so code paths that never call the LLM never import or configure a client
+    """
+
+    def __init__(self, executor: GeminiRequestExecutor = None, model=None):
+        self._executor = executor
+        self._model = model
+    
+    @property
+    def model(self):
+        return self._model if self._model is not None else get_shared_model()
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    @property
+    def executor(self) -> GeminiRequestExecutor:
+        return self._executor if self._executor is not None else get_gemini_executor()
+    
+    @executor.setter
+    def executor(self, executor: Optional[GeminiRequestExecutor]):
+        self._executor = executor
+    
+    def _generate(self, prompt: str, prompt_type: str):
+        """
+        Send a prompt through the shared executor (rate limit, concurrency cap, retries),
+        recording its duration, errors and token usage under the prompt type
+        """
+        try:
+            with GEMINI_REQUEST_DURATION.time(prompt=prompt_type):
+                response = self.executor.generate(self.model, prompt)
+        except Exception as e:
+            GEMINI_ERRORS.inc(prompt=prompt_type, error=type(e).__name__)
+            raise
+        record_usage(prompt_type, response)
+        return response
     
     def analyze_student_profile(self, student_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Analyze a student profile using Gemini AI to extract key insights
+        Analyze a student profile using Gemini AI to extract key insights.
+        Results are cached per profile revision.
         """
+        digest = content_hash(student_data, STUDENT_ANALYSIS_FIELDS, ANALYSIS_PROMPT_VERSION)
+        cached = profile_analysis_cache.get('student', student_data.get('id'), digest)
+        if cached is not None:
+            return cached
+        
         prompt = f"""
         Analyze this student profile and provide insights for matching:
         
@@ -40,11 +100,12 @@ class GeminiMatchingService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, 'student_analysis')
             print(response.text)
-            return json.loads(response.text)
+            analysis = json.loads(response.text)
         except Exception as e:
             print(f"Error analyzing student profile: {e}")
+            GEMINI_FALLBACKS.inc(prompt='student_analysis')
             return {
                 "strengths": student_data.get('primaryInterests', []),
                 "interests_summary": "Research interests analysis unavailable",
@@ -52,11 +113,19 @@ class GeminiMatchingService:
                 "ideal_professor": "Professor preferences analysis unavailable",
                 "priorities": ["research_alignment", "skill_match"]
             }
+        self._store_analysis('student', student_data.get('id'), digest, analysis)
+        return analysis
     
     def analyze_professor_profile(self, professor_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Analyze a professor profile using Gemini AI to extract key insights
+        Analyze a professor profile using Gemini AI to extract key insights.
+        Results are cached per profile revision.
         """
+        digest = content_hash(professor_data, PROFESSOR_ANALYSIS_FIELDS, ANALYSIS_PROMPT_VERSION)
+        cached = profile_analysis_cache.get('professor', professor_data.get('id'), digest)
+        if cached is not None:
+            return cached
+        
         prompt = f"""
         Analyze this professor profile and provide insights for matching:
         
@@ -83,11 +152,12 @@ class GeminiMatchingService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, 'professor_analysis')
             print(response.text)
-            return json.loads(response.text)
+            analysis = json.loads(response.text)
         except Exception as e:
             print(f"Error analyzing professor profile: {e}")
+            GEMINI_FALLBACKS.inc(prompt='professor_analysis')
             return {
                 "research_focus": professor_data.get('researchAreas', []),
                 "ideal_student": "Student preferences analysis unavailable",
@@ -95,6 +165,18 @@ class GeminiMatchingService:
                 "mentoring_style": "Mentoring style analysis unavailable",
                 "collaboration_preferences": ["research_alignment", "skill_match"]
             }
+        self._store_analysis('professor', professor_data.get('id'), digest, analysis)
+        return analysis
+
+    def _store_analysis(self, kind: str, profile_id, digest: str, analysis: Dict[str, Any]):
+        """
+        Cache a parsed analysis. A failure here (the database is down) only costs a repeat
+        request later; the analysis itself is still returned.
+        """
+        try:
+            profile_analysis_cache.store(kind, profile_id, digest, analysis)
+        except Exception:
+            logger.exception("Caching the %s analysis of %s failed", kind, profile_id)
     
 
     
@@ -132,7 +214,7 @@ class GeminiMatchingService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, 'pair_score')
             print(response.text)
             match_result = json.loads(response.text)
             
@@ -143,6 +225,7 @@ class GeminiMatchingService:
             )
         except Exception as e:
             print(f"Error calculating AI match score: {e}")
+            GEMINI_FALLBACKS.inc(prompt='pair_score')
             # Fallback to basic matching
             return self._calculate_basic_match_score(student_data, professor_data)
     
@@ -182,10 +265,11 @@ class GeminiMatchingService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, 'explanation')
             return response.text.strip()
         except Exception as e:
             print(f"Error generating match explanation: {e}")
+            GEMINI_FALLBACKS.inc(prompt='explanation')
             return f"This match has a score of {round(match_score, 2)}/100 based on research area alignment and skill compatibility."
 
     def analyze_match(self, student_data: Dict[str, Any], professor_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -200,6 +284,7 @@ class GeminiMatchingService:
                 'score': round(score, 2),
                 'explanation': explanation,
                 'highlights': highlights,
+                'detailed_scores': self._detailed_scores(detailed_analysis),
                 'analysis': detailed_analysis
             }
         except Exception as e:
@@ -212,3 +297,97 @@ class GeminiMatchingService:
                 'highlights': highlights,
                 'analysis': {'overall_score': round(score, 2), 'highlights': highlights}
             }
+
+    def analyze_matches_batch(self, student_data: Dict[str, Any], professors_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score a student against a chunk of professors with a single prompt.
+        Returns one analyze_match-shaped result per professor, in order; professors whose
+        entry is missing or invalid fall back to a per-pair analyze_match call.
+        """
+        student_analysis = self.analyze_student_profile(student_data)
+        keys = [str(professor_data.get('id') or index) for index, professor_data in enumerate(professors_data)]
+        professors_block = [
+            {'professor_id': key, 'analysis': self.analyze_professor_profile(professor_data)}
+            for key, professor_data in zip(keys, professors_data)
+        ]
+        
+        prompt = f"""
+        Calculate match scores between this student and each of the professors below:
+        
+        Student Analysis:
+        {json.dumps(student_analysis, indent=2)}
+        
+        Professors:
+        {json.dumps(professors_block, indent=2)}
+        
+        For each professor consider:
+        1. Research area alignment (0-100)
+        2. Skill compatibility (0-100)
+        3. Academic level fit (0-100)
+        4. Availability and commitment match (0-100)
+        5. Learning and growth potential (0-100)
+        
+        Return a JSON array with one object per professor containing:
+        - professor_id: the professor_id given above
+        - overall_score: weighted average (0-100)
+        - highlights: list of key matching points
+        - detailed_scores: object with individual scores
+        - reasoning: explanation of the match
+        - explanation: 2-3 friendly sentences explaining the match to the student
+        """
+        
+        entries = {}
+        try:
+            response = self._generate(prompt, 'batch_score')
+            logger.debug("Batch score response: %s", response.text)
+            batch_result = json.loads(response.text)
+            if not isinstance(batch_result, list):
+                raise ValueError("Batch response is not a JSON array")
+            for entry in batch_result:
+                if self._is_valid_batch_entry(entry, keys):
+                    entries[entry['professor_id']] = entry
+        except Exception:
+            logger.exception("Error calculating batch match scores for %s professors", len(keys))
+        
+        results = []
+        for key, professor_data in zip(keys, professors_data):
+            entry = entries.get(key)
+            if entry is None:
+                # Fall back to a per-pair prompt for entries that failed to parse
+                GEMINI_FALLBACKS.inc(prompt='batch_score')
+                results.append(self.analyze_match(student_data, professor_data))
+                continue
+            
+            score = round(float(entry['overall_score']), 2)
+            results.append({
+                'score': score,
+                'explanation': entry.get('explanation') or entry.get('reasoning') or
+                    f"This match has a score of {score}/100 based on research area alignment and skill compatibility.",
+                'highlights': entry.get('highlights', []),
+                'detailed_scores': self._detailed_scores(entry),
+                'analysis': entry
+            })
+        return results
+
+    @staticmethod
+    def _is_score(value: Any) -> bool:
+        return not isinstance(value, bool) and isinstance(value, (int, float)) and 0 <= value <= 100
+
+    def _detailed_scores(self, result: Dict[str, Any]) -> Dict[str, float]:
+        """
+        The per-criterion 0-100 scores of a model result; malformed entries are dropped
+        """
+        scores = result.get('detailed_scores')
+        if not isinstance(scores, dict):
+            return {}
+        return {str(name): round(float(value), 2) for name, value in scores.items() if self._is_score(value)}
+
+    def _is_valid_batch_entry(self, entry: Any, keys: List[str]) -> bool:
+        """
+        A batch entry must name one of the requested professors and carry a 0-100 score
+        """
+        if not isinstance(entry, dict) or entry.get('professor_id') not in keys:
+            return False
+        if not self._is_score(entry.get('overall_score')):
+            return False
+        return isinstance(entry.get('highlights', []), list)
@@ -0,0 +1,206 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.utils import timezone
+from .models import StudentProfile, MatchingJob
+from .metrics import MATCHING_ERRORS, MATCHING_QUEUE_WAIT, MATCHING_RUN_DURATION
+from .progress import notify_progress
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_matching_job(student_id) -> MatchingJob:
+    """
+    Queue a matching run for a student. Repeated triggers while a run is still queued
+    return the existing job instead of creating a duplicate.
+    """
+    existing = MatchingJob.objects.filter(student_id=student_id, status='queued').first()
+    if existing:
+        return existing
+    try:
+        with transaction.atomic():
+            return MatchingJob.objects.create(student_id=student_id)
+    except IntegrityError:
+        # Another request queued the same student concurrently
+        return MatchingJob.objects.get(student_id=student_id, status='queued')
+
+
+def enqueue_professor_rematch(professor_id) -> MatchingJob:
+    """
+    Queue a re-match of one professor's column of matches (after a matching field changed).
+    Deduplicated like student jobs: a queued re-match already covers the newest edit.
+    """
+    existing = MatchingJob.objects.filter(professor_id=professor_id, status='queued').first()
+    if existing:
+        return existing
+    try:
+        with transaction.atomic():
+            return MatchingJob.objects.create(professor_id=professor_id)
+    except IntegrityError:
+        return MatchingJob.objects.get(professor_id=professor_id, status='queued')
+
+
+def job_kind(job: MatchingJob) -> str:
+    return 'professor' if job.professor_id else 'student'
+
+
+def claim_next_job(worker_id: str) -> Optional[MatchingJob]:
+    """
+    Claim the oldest queued job. Rows locked by other workers are skipped (SKIP LOCKED),
+    as are students (or professors) that already have a run in progress, so the same
+    target never runs twice at once.
+    """
+    with transaction.atomic():
+        running = MatchingJob.objects.filter(status='in_progress')
+        job = (
+            MatchingJob.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .exclude(student_id__in=running.filter(student__isnull=False).values('student_id'))
+            .exclude(professor_id__in=running.filter(professor__isnull=False).values('professor_id'))
+            .order_by('createdAt')
+            .first()
+        )
+        if job is None:
+            return None
+
+        now = timezone.now()
+        job.status = 'in_progress'
+        job.attempts += 1
+        job.workerId = worker_id
+        job.startedAt = now
+        job.heartbeatAt = now
+        job.save(update_fields=['status', 'attempts', 'workerId', 'startedAt', 'heartbeatAt'])
+        MATCHING_QUEUE_WAIT.observe((now - job.createdAt).total_seconds(), kind=job_kind(job))
+        return job
+
+
+def recover_stale_jobs(stale_after: timedelta, max_attempts: int) -> int:
+    """
+    Requeue in-progress jobs whose worker stopped sending heartbeats (crash, restart).
+    Jobs that already used max_attempts are marked failed. Returns the number of jobs recovered.
+    """
+    cutoff = timezone.now() - stale_after
+    recovered = 0
+    for job in MatchingJob.objects.filter(status='in_progress', heartbeatAt__lt=cutoff):
+        with transaction.atomic():
+            # Another worker may have recovered the job, or its own worker resumed heartbeats
+            claimed = MatchingJob.objects.filter(id=job.id, status='in_progress', heartbeatAt__lt=cutoff)
+            target = {'student_id': job.student_id} if job.student_id else {'professor_id': job.professor_id}
+            superseded = MatchingJob.objects.filter(status='queued', **target).exists()
+            if job.attempts >= max_attempts or superseded:
+                error = 'Worker stopped responding' if not superseded else 'Superseded by a newer job'
+                updated = claimed.update(status='failed', error=error, completedAt=timezone.now())
+                if updated and not superseded and job.student_id:
+                    StudentProfile.objects.filter(id=job.student_id).update(matchingStatus='failed', matchingError=error)
+                    notify_progress(job.student_id)
+            else:
+                updated = claimed.update(status='queued', workerId=None)
+        recovered += updated
+    return recovered
+
+
+class MatchingWorker:
+    """
+    Pulls matching jobs from the queue and runs them. Several workers (threads, processes or
+    hosts) can share the queue; each job is claimed by exactly one of them.
+    """
+
+    def __init__(self, worker_id: Optional[str] = None, stale_after: Optional[timedelta] = None,
+                 max_attempts: Optional[int] = None, matching_service=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.stale_after = stale_after or timedelta(seconds=settings.MATCHING_JOB_STALE_SECONDS)
+        self.max_attempts = max_attempts or settings.MATCHING_JOB_MAX_ATTEMPTS
+        self._matching_service = matching_service
+
+    @property
+    def matching_service(self):
+        if self._matching_service is None:
+            from .matching_service import MatchingService
+            self._matching_service = MatchingService()
+        return self._matching_service
+
+    def process_next(self) -> Optional[MatchingJob]:
+        """
+        Claim and run one job; returns it, or None when the queue is empty
+        """
+        job = claim_next_job(self.worker_id)
+        if job is None:
+            return None
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job.id, stop), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            if job.professor_id:
+                self._run_professor_rematch(job)
+            else:
+                self._run_student_matching(job)
+        finally:
+            stop.set()
+            heartbeat.join()
+            MATCHING_RUN_DURATION.observe(time.perf_counter() - started, kind=job_kind(job), status=job.status)
+        return job
+
+    def _run_student_matching(self, job: MatchingJob):
+        self.matching_service._run_matching_process(job.student_id)
+
+        status, error = StudentProfile.objects.filter(id=job.student_id).values_list(
+            'matchingStatus', 'matchingError'
+        ).first() or ('failed', 'Student not found')
+        job.status = 'completed' if status == 'completed' else 'failed'
+        job.error = error if job.status == 'failed' else None
+        job.completedAt = timezone.now()
+        job.save(update_fields=['status', 'error', 'completedAt'])
+
+    def _run_professor_rematch(self, job: MatchingJob):
+        from .rematch import rematch_professor
+        try:
+            rematch_professor(job.professor_id)
+            job.status, job.error = 'completed', None
+        except Exception as e:
+            logger.exception("Re-matching professor %s failed", job.professor_id)
+            MATCHING_ERRORS.inc(stage='professor_rematch')
+            job.status, job.error = 'failed', str(e)
+        job.completedAt = timezone.now()
+        job.save(update_fields=['status', 'error', 'completedAt'])
+
+    def _heartbeat(self, job_id, stop: threading.Event):
+        interval = self.stale_after.total_seconds() / 3
+        try:
+            while not stop.wait(interval):
+                MatchingJob.objects.filter(id=job_id).update(heartbeatAt=timezone.now())
+        finally:
+            connections.close_all()
+
+    def run(self, stop: threading.Event, poll_interval: float, once: bool = False):
+        """
+        Process jobs until stopped. With once=True, exit as soon as the queue is drained.
+        Errors outside a job run (a dropped connection, a serialization failure) are logged
+        and retried after poll_interval; a job left in progress is recovered as stale. With
+        once=True they propagate instead.
+        """
+        try:
+            while not stop.is_set():
+                try:
+                    recover_stale_jobs(self.stale_after, self.max_attempts)
+                    job = self.process_next()
+                except Exception:
+                    if once:
+                        raise
+                    logger.exception("Matching worker %s failed; retrying in %ss", self.worker_id, poll_interval)
+                    close_old_connections()
+                    stop.wait(poll_interval)
+                    continue
+                if job is None:
+                    if once:
+                        return
+                    stop.wait(poll_interval)
+        finally:
+            connections.close_all()
@@ -0,0 +1,218 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+# Default rough size of a token, for the usage metadata of fake responses
+CHARS_PER_TOKEN = 4
+
+
+def get_generative_model():
+    """
+    Model object for GeminiMatchingService, chosen by GEMINI_BACKEND. Anything with a
+    generate_content(prompt) method returning an object with `.text` works as a backend.
+    """
+    backend = settings.GEMINI_BACKEND
+    if backend == 'fake':
+        return FakeGeminiModel.from_settings()
+    if backend == 'gemini':
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        return genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
+    raise ValueError(f"Unknown GEMINI_BACKEND '{backend}' (expected 'gemini' or 'fake')")
+
+
+_shared_model: Optional[Any] = None
+_shared_model_lock = threading.Lock()
+
+
+def get_shared_model():
+    """
+    Process-wide model, built on first use. The genai import, configure() and the client
+    (with its connection pool) are paid once per process, and only by code that calls the model.
+    """
+    global _shared_model
+    if _shared_model is None:
+        with _shared_model_lock:
+            if _shared_model is None:
+                _shared_model = get_generative_model()
+    return _shared_model
+
+
+def reset_shared_model():
+    global _shared_model
+    with _shared_model_lock:
+        _shared_model = None
+
+
+@receiver(setting_changed)
+def _reset_on_backend_change(setting, **kwargs):
+    if setting.startswith('GEMINI_'):
+        reset_shared_model()
+
+
+class FakeModelError(Exception):
+    """
+    Injected API error; `code` is the HTTP status, like google.api_core exceptions
+    """
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeGeminiResponse:
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+
+class FakeGeminiModel:
+    """
+    Local, deterministic stand-in for genai.GenerativeModel.
+
+    Each prompt type of GeminiMatchingService (student/professor analysis, pair score,
+    batch score, explanation) gets schema-correct JSON whose scores derive from a hash of
+    the prompt. Latency follows a fixed, uniform or mean-preserving lognormal distribution
+    plus an optional per-output-token cost; a configurable fraction of calls fails with 429
+    or 500 (FakeModelError, retryable like the real API errors) or returns truncated JSON.
+    Token usage is the text length over chars_per_token, or a fixed count per prompt
+    and per output when prompt_tokens/output_tokens are set.
+    The random draws are seeded by (seed, prompt, how often that prompt was sent), so a
+    run is reproducible regardless of thread interleaving, and retries of a failed prompt
+    can succeed.
+    """
+
+    _PROFESSOR_ID = re.compile(r'"professor_id": "([^"]+)"')
+
+    def __init__(self, latency_ms: float = 0.0, distribution: str = 'fixed', sigma: float = 0.5,
+                 ms_per_output_token: float = 0.0, rate_limit_rate: float = 0.0, server_error_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0, chars_per_token: float = CHARS_PER_TOKEN,
+                 prompt_tokens: int = 0, output_tokens: int = 0, sleep: Callable[[float], None] = time.sleep):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        if chars_per_token <= 0:
+            raise ValueError(f"chars_per_token must be positive, got {chars_per_token}")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.sigma = sigma
+        self.ms_per_output_token = ms_per_output_token
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.chars_per_token = chars_per_token
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._sent: Counter = Counter()
+        self._stats: Counter = Counter()
+
+    @classmethod
+    def from_settings(cls) -> 'FakeGeminiModel':
+        return cls(
+            latency_ms=settings.GEMINI_FAKE_LATENCY_MS,
+            distribution=settings.GEMINI_FAKE_LATENCY_DISTRIBUTION,
+            sigma=settings.GEMINI_FAKE_LATENCY_SIGMA,
+            ms_per_output_token=settings.GEMINI_FAKE_MS_PER_OUTPUT_TOKEN,
+            rate_limit_rate=settings.GEMINI_FAKE_RATE_LIMIT_RATE,
+            server_error_rate=settings.GEMINI_FAKE_SERVER_ERROR_RATE,
+            malformed_rate=settings.GEMINI_FAKE_MALFORMED_RATE,
+            seed=settings.GEMINI_FAKE_SEED,
+            chars_per_token=settings.GEMINI_FAKE_CHARS_PER_TOKEN,
+            prompt_tokens=settings.GEMINI_FAKE_PROMPT_TOKENS,
+            output_tokens=settings.GEMINI_FAKE_OUTPUT_TOKENS,
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Calls, injected faults and token totals so far
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _draw(self, prompt: str) -> random.Random:
+        digest = zlib.crc32(prompt.encode('utf-8'))
+        with self._lock:
+            occurrence = self._sent[digest]
+            self._sent[digest] += 1
+            self._stats['calls'] += 1
+        return random.Random(f'{self.seed}:{digest}:{occurrence}')
+
+    def _latency(self, rng: random.Random) -> float:
+        if self.distribution == 'uniform':
+            return rng.uniform(0, 2 * self.latency_ms)
+        if self.distribution == 'lognormal':
+            return self.latency_ms * math.exp(rng.gauss(0, self.sigma) - self.sigma ** 2 / 2)
+        return self.latency_ms
+
+    def _tokens(self, text: str, fixed: int) -> int:
+        return fixed if fixed > 0 else max(1, int(len(text) / self.chars_per_token))
+
+    def _count(self, **increments: int):
+        with self._lock:
+            self._stats.update(increments)
+
+    def generate_content(self, prompt: str) -> FakeGeminiResponse:
+        rng = self._draw(prompt)
+        fault = rng.random()
+        if fault < self.rate_limit_rate:
+            self._count(rate_limited=1)
+            raise FakeModelError(429, 'Resource has been exhausted (fake backend)')
+
+        text = self.respond(prompt)
+        if rng.random() < self.malformed_rate:
+            text = text[:len(text) // 2]
+            self._count(malformed=1)
+        response = FakeGeminiResponse(text, self._tokens(prompt, self.prompt_tokens),
+                                      self._tokens(text, self.output_tokens))
+        delay_ms = self._latency(rng) + self.ms_per_output_token * response.usage_metadata.candidates_token_count
+        if delay_ms > 0:
+            self._sleep(delay_ms / 1000)
+
+        if fault < self.rate_limit_rate + self.server_error_rate:
+            self._count(server_errors=1)
+            raise FakeModelError(500, 'Internal error (fake backend)')
+        self._count(prompt_tokens=response.usage_metadata.prompt_token_count,
+                    output_tokens=response.usage_metadata.candidates_token_count)
+        return response
+
+    def respond(self, prompt: str) -> str:
+        """
+        Well-formed answer to a GeminiMatchingService prompt
+        """
+        score = zlib.crc32(prompt.encode('utf-8')) % 101
+        if 'each of the professors' in prompt:
+            payload: Any = [
+                {'professor_id': professor_id, 'overall_score': (score + 7 * i) % 101, 'highlights': ['Shared research interests'],
+                 'detailed_scores': {'research_alignment': score}, 'reasoning': 'Fake backend.',
+                 'explanation': 'A good fit according to the fake backend.'}
+                for i, professor_id in enumerate(self._PROFESSOR_ID.findall(prompt))
+            ]
+        elif 'Analyze this student profile' in prompt:
+            payload = {'strengths': [], 'interests_summary': 'Fake backend summary', 'technical_skills': [],
+                       'ideal_professor': 'Fake backend', 'priorities': []}
+        elif 'Analyze this professor profile' in prompt:
+            payload = {'research_focus': [], 'ideal_student': 'Fake backend', 'research_requirements': '',
+                       'mentoring_style': 'Fake backend', 'collaboration_preferences': []}
+        elif 'Calculate a match score' in prompt:
+            payload = {'overall_score': score, 'highlights': ['Shared research interests'],
+                       'detailed_scores': {'research_alignment': score}, 'reasoning': 'Fake backend.'}
+        else:
+            return 'This student and professor share research interests (fake backend).'
+        return json.dumps(payload)
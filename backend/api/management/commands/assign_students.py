@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.assignment import assign_students
+
+class Command(BaseCommand):
+    help = 'Assign students to professor slots (capacity-constrained, stable) from the existing match scores'
+
+    def handle(self, *args, **options):
+        stats = assign_students()
+        self.stdout.write(self.style.SUCCESS(
+            f"Assigned {stats['assigned']} of {stats['students']} students to {stats['professors']} professors "
+            f"in {stats['seconds']}s"
+        ))
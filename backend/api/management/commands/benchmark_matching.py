@@ -0,0 +1,55 @@
+import json
+import platform
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.benchmarks import MatchingBenchmark, parse_scale
+from api.synthetic import SyntheticCatalog
+
+class Command(BaseCommand):
+    help = 'Benchmark the matching hot paths on synthetic catalogs and report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', default=[], metavar='STUDENTSxPROFESSORS',
+                            help='Catalog size to benchmark (repeatable; default 50x200, 200x1000, 500x4000)')
+        parser.add_argument('--vocabulary', type=int, default=200,
+                            help='Number of distinct research area/method tags')
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='Zipf exponent of tag popularity (0 = uniform)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the synthetic catalog')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per benchmark (the fastest is reported)')
+        parser.add_argument('--end-to-end-students', type=int, default=3,
+                            help='Students put through a full matching run at each scale')
+        parser.add_argument('--no-db', action='store_true',
+                            help='Only run the in-memory benchmarks')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [parse_scale(value) for value in options['scale'] or ['50x200', '200x1000', '500x4000']]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        catalog = SyntheticCatalog(vocabulary_size=options['vocabulary'], skew=options['skew'], seed=options['seed'])
+        benchmark = MatchingBenchmark(catalog, repeat=options['repeat'], end_to_end_students=options['end_to_end_students'])
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'vocabulary': options['vocabulary'],
+                'skew': options['skew'],
+                'seed': options['seed'],
+            },
+            'results': benchmark.run(scales, database=not options['no_db']),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(f"Wrote {len(report['results'])} results to {options['output']}")
+        else:
+            self.stdout.write(output)
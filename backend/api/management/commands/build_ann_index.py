@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from api.ann_index import professor_vector_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the approximate nearest-neighbor index of professor text vectors'
+
+    def handle(self, *args, **options):
+        professor_vector_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(professor_vector_index)} professors in {professor_vector_index.directory}'
+        ))
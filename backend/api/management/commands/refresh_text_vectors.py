@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from api.models import StudentProfile, ProfessorProfile
+from api.text_vectors import refresh_text_vector
+
+class Command(BaseCommand):
+    help = 'Recompute the stored text vectors of professor and student profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['professors', 'students', 'all'], default='all',
+                            help='Which profiles to refresh')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Profiles updated per bulk UPDATE')
+
+    def handle(self, *args, **options):
+        models = {'professors': [ProfessorProfile], 'students': [StudentProfile],
+                  'all': [ProfessorProfile, StudentProfile]}[options['model']]
+        batch_size = max(1, options['batch_size'])
+
+        for model in models:
+            refreshed = 0
+            batch = []
+            # bulk_update doesn't send save signals, so only textVector is written
+            for profile in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+                refresh_text_vector(profile)
+                batch.append(profile)
+                if len(batch) >= batch_size:
+                    model.objects.bulk_update(batch, ['textVector'])
+                    refreshed += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, ['textVector'])
+                refreshed += len(batch)
+            self.stdout.write(f'Refreshed {refreshed} {model._meta.verbose_name_plural}')
+
+        self.stdout.write(self.style.SUCCESS('Text vectors are up to date'))
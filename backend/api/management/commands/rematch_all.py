@@ -0,0 +1,46 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.batch_matching import parse_shard, rematch_all
+
+class Command(BaseCommand):
+    help = "Recompute every student's top-K professor matches with batched scoring across processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.MATCHING_CANDIDATE_TOP_K,
+                            help='Matches kept per student')
+        parser.add_argument('--block-size', type=int, default=256,
+                            help='Students scored per block (a block scores against the whole catalog at once)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes')
+        parser.add_argument('--shard', default='0/1', metavar='I/N',
+                            help='Only match shard I of N (contiguous ranges of students by id)')
+        parser.add_argument('--prune', action='store_true',
+                            help="Delete each student's matches outside the new top-K")
+
+    def handle(self, *args, **options):
+        try:
+            shard = parse_shard(options['shard'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+
+        def progress(done, total, written):
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'{done}/{total} students ({100 * done / max(total, 1):.1f}%), '
+                              f'{written} matches, {rate:.0f} students/s')
+
+        stats = rematch_all(
+            progress=progress,
+            top_k=options['top_k'],
+            block_size=options['block_size'],
+            workers=options['workers'],
+            shard=shard,
+            prune=options['prune'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {stats['students']} students: {stats['matches']} matches written, "
+            f"{stats['pruned']} pruned in {stats['seconds']}s"
+        ))
@@ -0,0 +1,59 @@
+import os
+import socket
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.job_queue import MatchingWorker
+from api.metrics import start_metrics_server
+
+class Command(BaseCommand):
+    help = 'Run matching workers that process queued matching jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.MATCHING_WORKERS,
+                            help='Number of worker threads in this process')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=settings.MATCHING_JOB_STALE_SECONDS,
+                            help='Seconds without heartbeat before an in-progress job is recovered')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained')
+        parser.add_argument('--metrics-port', type=int, default=settings.MATCHING_WORKER_METRICS_PORT,
+                            help='Serve Prometheus metrics on this port (0 disables)')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        host = f"{socket.gethostname()}:{os.getpid()}"
+        threads = []
+        
+        if options['metrics_port']:
+            start_metrics_server(options['metrics_port'])
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}")
+        
+        for n in range(max(1, options['workers'])):
+            worker = MatchingWorker(
+                worker_id=f"{host}:{n}",
+                stale_after=timedelta(seconds=options['stale_after'])
+            )
+            thread = threading.Thread(
+                target=worker.run,
+                args=(stop, options['poll_interval'], options['once']),
+                name=f"matching-worker-{n}"
+            )
+            thread.start()
+            threads.append(thread)
+        
+        self.stdout.write(f'Started {len(threads)} matching worker(s) on {host}')
+        
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping matching workers after their current job...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+        
+        self.stdout.write(self.style.SUCCESS('Matching workers stopped'))
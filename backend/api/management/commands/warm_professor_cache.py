@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+from api.models import ProfessorProfile
+from api.views import ProfessorProfileViewSet
+
+class Command(BaseCommand):
+    help = 'Pre-populate the professor response cache (list pages, details, common searches)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost:8000',
+                            help='Host the API is served under (part of the cache key and of pagination links)')
+        parser.add_argument('--pages', type=int, default=5,
+                            help='Number of professor list pages to cache')
+        parser.add_argument('--details', type=int, default=200,
+                            help='Number of professor detail responses to cache (most recently updated first)')
+        parser.add_argument('--search', action='append', default=[], metavar='QUERY',
+                            help='Search query to cache (repeatable)')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory(HTTP_HOST=options['host'])
+        list_view = ProfessorProfileViewSet.as_view({'get': 'list'})
+        detail_view = ProfessorProfileViewSet.as_view({'get': 'retrieve'})
+        search_view = ProfessorProfileViewSet.as_view({'get': 'search'})
+        warmed = 0
+
+        # Unfiltered list pages, stopping at the last page
+        for page in range(1, options['pages'] + 1):
+            params = {'page': page} if page > 1 else {}
+            response = list_view(factory.get('/api/professors/', params))
+            if response.status_code != 200:
+                break
+            warmed += 1
+            if not response.data.get('next'):
+                break
+
+        # Details of the most recently updated professors
+        ids = ProfessorProfile.objects.order_by('-updatedAt').values_list('id', flat=True)[:options['details']]
+        for professor_id in ids:
+            response = detail_view(factory.get(f'/api/professors/{professor_id}/'), pk=str(professor_id))
+            warmed += response.status_code == 200
+
+        # Accepting-students filter used by the search page, plus any requested queries
+        searches = [{'accepting_students': 'true'}] + [{'query': query} for query in options['search']]
+        for params in searches:
+            response = search_view(factory.get('/api/professors/search/', params))
+            warmed += response.status_code == 200
+
+        self.stdout.write(self.style.SUCCESS(f'Cached {warmed} professor responses for {options["host"]}'))
@@ -1,36 +1,68 @@
 import asyncio
-import threading
+import logging
 from datetime import datetime
-from typing import List, Dict, Any
-from django.utils import timezone
+from typing import Any, Collection, Dict, List, Optional
+from django.conf import settings
+import numpy as np
 from .models import StudentProfile, ProfessorProfile, Match
 from .gemini_service import GeminiMatchingService
+from .job_queue import enqueue_matching_job
+from .metrics import MATCHING_ERRORS, MATCHING_STAGE_DURATION
+from .ann_index import professor_vector_index
+from .progress import MatchingProgressReporter, get_matching_status
+from .scoring_engine import BasicScoringEngine
+from .tag_index import professor_tag_index
+from .text_vectors import SemanticSimilarityEngine
+
+logger = logging.getLogger(__name__)
+
+# Columns refreshed when a match for the same student/professor pair already exists
+MATCH_UPDATE_FIELDS = [
+    'score', 'aiScore', 'aiExplanation', 'aiAnalysis', 'detailedScores',
+    'highlights', 'studentInterests', 'professorInterests',
+]
+
+def upsert_matches(matches: List[Match], update_fields: List[str] = MATCH_UPDATE_FIELDS, chunk_size: Optional[int] = None) -> List[Match]:
+    """
+    Insert or update matches with one INSERT ... ON CONFLICT (student, professor) per chunk
+    """
+    chunk_size = chunk_size or settings.MATCH_WRITE_CHUNK_SIZE
+    # bulk_create stamps createdAt on every object; rows that already exist keep theirs
+    created_at = [(match, match.createdAt) for match in matches if match.createdAt is not None]
+    for start in range(0, len(matches), chunk_size):
+        Match.objects.bulk_create(
+            matches[start:start + chunk_size],
+            update_conflicts=True,
+            unique_fields=['student', 'professor'],
+            update_fields=update_fields
+        )
+    for match, value in created_at:
+        match.createdAt = value
+    return matches
+
+def text_similarity_score(similarity: float) -> float:
+    """
+    Description similarity on the 0-100 scale of the other detailed scores
+    """
+    return round(max(0.0, similarity) * 100, 1)
 
 class MatchingService:
     def __init__(self):
         self.gemini_service = GeminiMatchingService()
     
-    def start_matching_for_student(self, student_id: str) -> bool:
+    def start_matching_for_student(self, student_id: str, student: Optional[StudentProfile] = None) -> bool:
         """
-        Start the matching process for a student in a background thread
+        Queue the matching process for a student; a run_matching_worker process picks it up.
+        Callers that already hold the profile pass it as `student` to skip reading it back.
         """
         try:
-            student = StudentProfile.objects.get(id=student_id)
+            if student is None:
+                student = StudentProfile.objects.get(id=student_id)
             
             # Update status to in progress
-            student.matchingStatus = 'in_progress'
-            student.matchingProgress = 0
-            student.matchingStartedAt = timezone.now()
-            student.matchingError = None
-            student.save()
+            MatchingProgressReporter(student).start()
             
-            # Start background thread
-            thread = threading.Thread(
-                target=self._run_matching_process,
-                args=(student_id,),
-                daemon=True
-            )
-            thread.start()
+            enqueue_matching_job(student.id)
             
             return True
         except StudentProfile.DoesNotExist:
@@ -39,9 +71,7 @@ class MatchingService:
             # Update status to failed
             try:
                 student = StudentProfile.objects.get(id=student_id)
-                student.matchingStatus = 'failed'
-                student.matchingError = str(e)
-                student.save()
+                MatchingProgressReporter(student).finish('failed', str(e))
             except:
                 pass
             return False
@@ -51,136 +81,189 @@ class MatchingService:
         Run the matching process in background
         """
         try:
-            student = StudentProfile.objects.get(id=student_id)
-            professors = ProfessorProfile.objects.filter(acceptingStudents=True)
-            total_professors = professors.count()
+            with MATCHING_STAGE_DURATION.time(stage='db_load'):
+                student = StudentProfile.objects.get(id=student_id)
+                progress = MatchingProgressReporter(student)
+                professors = list(ProfessorProfile.objects.filter(acceptingStudents=True))
+            
+            # Score the student against every professor in one batched pass,
+            # then drop professors with nothing in common before the AI analysis
+            with MATCHING_STAGE_DURATION.time(stage='basic_scoring'):
+                scores = BasicScoringEngine(professors).score(student)
+                candidates = self.select_candidates(student, professors, scores, self.similar_professor_ids(student))
+            total_professors = len(candidates)
             
             if total_professors == 0:
                 # No professors available
-                student.matchingStatus = 'completed'
-                student.matchingProgress = 100
-                student.matchingCompletedAt = timezone.now()
-                student.save()
+                progress.finish('completed')
                 return
             
             # Calculate progress increment
             progress_increment = 100 / total_professors
             
-            for i, professor in enumerate(professors):
+            # Analyze the student once up front so the parallel pair analyses share the cached result
+            student_data = dict(student.__dict__)
+            self.gemini_service.analyze_student_profile(student_data)
+            
+            # Run the AI analyses concurrently, one chunk of professors per prompt;
+            # matches are written here as each chunk completes
+            candidate_scores = {professors[index].id: int(scores[index]) for index in candidates}
+            candidate_professors = [professors[index] for index in candidates]
+            # Description similarity from the local text vectors (no LLM round trip)
+            with MATCHING_STAGE_DURATION.time(stage='text_similarity'):
+                similarities = SemanticSimilarityEngine(candidate_professors).similarities(student)
+            candidate_similarities = {professor.id: float(value) for professor, value in zip(candidate_professors, similarities)}
+            batch_size = max(1, settings.GEMINI_BATCH_SIZE)
+            chunks = [candidate_professors[i:i + batch_size] for i in range(0, total_professors, batch_size)]
+            analyses = self.gemini_service.executor.as_completed(
+                lambda chunk: self._analyze_chunk(student_data, chunk),
+                chunks
+            )
+            results = (
+                (professor, ai_result)
+                for chunk, ai_results in analyses
+                for professor, ai_result in zip(chunk, ai_results)
+            )
+            
+            # One prefetch of the AI fields of existing matches, kept when a new analysis fails
+            existing = {
+                professor_id: fields
+                for professor_id, *fields in Match.objects.filter(
+                    student=student,
+                    professor_id__in=candidate_scores
+                ).values_list('professor_id', 'aiExplanation', 'aiAnalysis', 'detailedScores')
+            }
+            
+            # Matches are collected in memory and upserted one chunk at a time
+            pending = []
+            for i, (professor, ai_result) in enumerate(results):
+                score = candidate_scores[professor.id]
                 try:
-                    # Check if match already exists
-                    existing_match = Match.objects.filter(
-                        student=student,
-                        professor=professor
-                    ).first()
-                    
-                    if existing_match:
-                        # Update existing match with new analysis
-                        self._update_match(existing_match, student, professor)
-                    else:
-                        # Create new match
-                        self._create_match(student, professor)
+                    pending.append(self._build_match(student, professor, score, ai_result, existing.get(professor.id),
+                                                     candidate_similarities[professor.id]))
+                    if len(pending) >= settings.MATCH_WRITE_CHUNK_SIZE:
+                        self._write_matches(pending)
+                        pending = []
                     
-                    # Update progress
-                    progress = min(100, int((i + 1) * progress_increment))
-                    student.matchingProgress = progress
-                    student.save()
+                    # Update progress (coalesced, status columns only)
+                    progress.update(min(100, int((i + 1) * progress_increment)))
                     
-                except Exception as e:
-                    print(f"Error matching student {student_id} with professor {professor.id}: {e}")
+                except Exception:
+                    logger.exception("Error matching student %s with professor %s", student_id, professor.id)
+                    MATCHING_ERRORS.inc(stage='pair')
                     continue
             
+            self._write_matches(pending)
+            
             # Mark as completed
-            student.matchingStatus = 'completed'
-            student.matchingProgress = 100
-            student.matchingCompletedAt = timezone.now()
-            student.save()
+            progress.finish('completed')
             
         except Exception as e:
             # Mark as failed
             try:
                 student = StudentProfile.objects.get(id=student_id)
-                student.matchingStatus = 'failed'
-                student.matchingError = str(e)
-                student.save()
+                MatchingProgressReporter(student).finish('failed', str(e))
             except:
                 pass
     
-    def _create_match(self, student: StudentProfile, professor: ProfessorProfile):
+    @staticmethod
+    def similar_professor_ids(student: StudentProfile) -> List:
         """
-        Create a new match between student and professor
+        Top-K professors by description similarity, from the approximate nearest-neighbor index
         """
         try:
-            # Basic scoring
-            score = self._calculate_basic_score(student, professor)
-            
-            # AI-enhanced analysis
-            ai_score = None
-            ai_explanation = ""
-            ai_analysis = {}
-            detailed_scores = {}
-            
-            try:
-                ai_result = self.gemini_service.analyze_match(student.__dict__, professor.__dict__)
-                ai_score = ai_result.get('score', score)
-                ai_explanation = ai_result.get('explanation', '')
-                ai_analysis = ai_result.get('analysis', {})
-                detailed_scores = ai_result.get('detailed_scores', {})
-            except Exception as e:
-                print(f"AI analysis failed: {e}")
-                ai_score = score
-            
-            # Create match
-            match = Match.objects.create(
-                student=student,
-                professor=professor,
-                score=round(score, 2),
-                aiScore=round(ai_score, 2) if ai_score is not None else None,
-                aiExplanation=ai_explanation,
-                aiAnalysis=ai_analysis,
-                detailedScores=detailed_scores,
-                highlights=self._generate_highlights(student, professor),
-                studentInterests=student.primaryInterests,
-                professorInterests=professor.researchAreas
-            )
-            
-        except Exception as e:
-            print(f"Error creating match: {e}")
-            raise
+            similar = professor_vector_index.top_k(student, settings.MATCHING_CANDIDATE_TOP_K)
+        except Exception:
+            logger.exception("Similarity shortlist unavailable; matching on tags and basic scores only")
+            MATCHING_ERRORS.inc(stage='similarity_shortlist')
+            return []
+        return [professor_id for professor_id, similarity in similar if similarity > 0]
     
-    def _update_match(self, match: Match, student: StudentProfile, professor: ProfessorProfile):
+    @staticmethod
+    def select_candidates(student: StudentProfile, professors: List[ProfessorProfile], scores: np.ndarray,
+                          similar_ids: Collection = ()) -> List[int]:
+        """
+        Indices of the professors worth a full analysis: those sharing at least one
+        research area/method tag with the student, plus the top-K by basic score and
+        the given professors with similar descriptions
         """
-        Update an existing match with new analysis
+        tagged = professor_tag_index.candidates_for_student(student) | set(similar_ids)
+        top_k = np.argsort(-scores, kind='stable')[:settings.MATCHING_CANDIDATE_TOP_K]
+        selected = {i for i, professor in enumerate(professors) if professor.id in tagged}
+        selected.update(int(i) for i in top_k)
+        return sorted(selected)
+    
+    def _analyze_pair(self, student_data: Dict[str, Any], professor: ProfessorProfile) -> Optional[Dict[str, Any]]:
+        """
+        AI-enhanced analysis of one pair, or None if it failed
         """
         try:
-            # Recalculate basic score
-            score = self._calculate_basic_score(student, professor)
-            
-            # Update AI analysis
-            try:
-                ai_result = self.gemini_service.analyze_match(student.__dict__, professor.__dict__)
-                match.aiScore = round(ai_result.get('score', score), 2)
-                match.aiExplanation = ai_result.get('explanation', '')
-                match.aiAnalysis = ai_result.get('analysis', {})
-                match.detailedScores = ai_result.get('detailed_scores', {})
-            except Exception as e:
-                print(f"AI analysis failed: {e}")
-                match.aiScore = round(score, 2)
-            
-            # Update other fields
-            match.score = round(score, 2)
-            match.highlights = self._generate_highlights(student, professor)
-            match.studentInterests = student.primaryInterests
-            match.professorInterests = professor.researchAreas
-            match.save()
-            
-        except Exception as e:
-            print(f"Error updating match: {e}")
-            raise
+            return self.gemini_service.analyze_match(student_data, professor.__dict__)
+        except Exception:
+            logger.exception("AI analysis of professor %s failed", professor.id)
+            MATCHING_ERRORS.inc(stage='pair_analysis')
+            return None
+    
+    def _analyze_chunk(self, student_data: Dict[str, Any], professors: List[ProfessorProfile]) -> List[Optional[Dict[str, Any]]]:
+        """
+        AI-enhanced analysis of a chunk of professors with one batched prompt
+        """
+        if len(professors) == 1:
+            return [self._analyze_pair(student_data, professors[0])]
+        try:
+            return self.gemini_service.analyze_matches_batch(student_data, [professor.__dict__ for professor in professors])
+        except Exception:
+            logger.exception("Batch AI analysis of %s professors failed; analyzing them one by one", len(professors))
+            MATCHING_ERRORS.inc(stage='batch_analysis')
+            return [self._analyze_pair(student_data, professor) for professor in professors]
+    
+    def _build_match(self, student: StudentProfile, professor: ProfessorProfile, score: float,
+                     ai_result: Optional[Dict[str, Any]], existing_ai_fields: Optional[List[Any]] = None,
+                     similarity: Optional[float] = None) -> Match:
+        """
+        Build the (unsaved) match between student and professor
+        """
+        # AI-enhanced analysis, falling back to the basic score
+        ai_score = score
+        ai_explanation, ai_analysis, detailed_scores = existing_ai_fields or ("", {}, {})
+        
+        if ai_result is not None:
+            ai_score = ai_result.get('score', score)
+            ai_explanation = ai_result.get('explanation', '')
+            ai_analysis = ai_result.get('analysis', {})
+            detailed_scores = ai_result.get('detailed_scores', {})
+        
+        if similarity is not None:
+            detailed_scores = {**detailed_scores, 'textSimilarity': text_similarity_score(similarity)}
+        
+        return Match(
+            student=student,
+            professor=professor,
+            score=round(score, 2),
+            aiScore=round(ai_score, 2) if ai_score is not None else None,
+            aiExplanation=ai_explanation,
+            aiAnalysis=ai_analysis,
+            detailedScores=detailed_scores,
+            highlights=self._generate_highlights(student, professor),
+            studentInterests=student.primaryInterests,
+            professorInterests=professor.researchAreas
+        )
+    
+    def _write_matches(self, matches: List[Match]):
+        """
+        Upsert a chunk of matches, logging instead of aborting the run on failure
+        """
+        try:
+            with MATCHING_STAGE_DURATION.time(stage='match_write'):
+                upsert_matches(matches)
+        except Exception:
+            logger.exception("Error writing %s matches", len(matches))
+            MATCHING_ERRORS.inc(stage='match_write')
     
     def _calculate_basic_score(self, student: StudentProfile, professor: ProfessorProfile) -> float:
         """
-        Calculate basic compatibility score
+        Calculate basic compatibility score for a single pair.
+        BasicScoringEngine applies the same rule to a whole catalog at once.
         """
         score = 0
         
@@ -204,7 +287,8 @@ class MatchingService:
         
         return min(score, 100)
     
-    def _generate_highlights(self, student: StudentProfile, professor: ProfessorProfile) -> List[str]:
+    @staticmethod
+    def _generate_highlights(student: StudentProfile, professor: ProfessorProfile) -> List[str]:
         """
         Generate match highlights
         """
@@ -227,20 +311,4 @@ class MatchingService:
         """
         Get the current matching status for a student
         """
-        try:
-            student = StudentProfile.objects.get(id=student_id)
-            return {
-                'status': student.matchingStatus,
-                'progress': student.matchingProgress,
-                'started_at': student.matchingStartedAt,
-                'completed_at': student.matchingCompletedAt,
-                'error': student.matchingError
-            }
-        except StudentProfile.DoesNotExist:
-            return {
-                'status': 'not_found',
-                'progress': 0,
-                'started_at': None,
-                'completed_at': None,
-                'error': 'Student not found'
-            }
+        return get_matching_status(student_id)
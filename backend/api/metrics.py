@@ -0,0 +1,215 @@
+import bisect
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+from django.conf import settings
+from django.http import HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Seconds; spans a cached DB read up to a multi-minute matching run
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Metric:
+    """
+    Base of the in-process metrics: one lock per metric and a dict from label values to
+    the series, so recording costs a dict lookup and an addition
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+    def _labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{self._escape(value)}"' for name, value in pairs) + '}'
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [f'{self.name}{self._labels(key)} {value}' for key, value in sorted(self._series.items())]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-1] if series else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{self._labels(key, (("le", le),))} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels(key)} {series[-2]}')
+            lines.append(f'{self.name}_count{self._labels(key)} {series[-1]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+MATCHING_QUEUE_WAIT = registry.register(Histogram(
+    'matching_queue_wait_seconds', 'Time matching jobs spent queued before a worker claimed them', ['kind']))
+MATCHING_RUN_DURATION = registry.register(Histogram(
+    'matching_run_duration_seconds', 'Duration of matching jobs', ['kind', 'status']))
+MATCHING_STAGE_DURATION = registry.register(Histogram(
+    'matching_stage_duration_seconds', 'Time spent per matching pipeline stage', ['stage']))
+GEMINI_REQUEST_DURATION = registry.register(Histogram(
+    'gemini_request_duration_seconds', 'Gemini requests by prompt type, including retries', ['prompt']))
+GEMINI_ERRORS = registry.register(Counter(
+    'gemini_errors_total', 'Failed Gemini requests by prompt type and error', ['prompt', 'error']))
+GEMINI_FALLBACKS = registry.register(Counter(
+    'gemini_fallbacks_total', 'Results produced by a non-AI fallback instead of a model response', ['prompt']))
+GEMINI_TOKENS = registry.register(Counter(
+    'gemini_tokens_total', 'Tokens reported by the model, by prompt type and direction', ['prompt', 'direction']))
+MATCHING_ERRORS = registry.register(Counter(
+    'matching_errors_total', 'Errors a matching run logged and recovered from, by stage', ['stage']))
+MATCHING_PROGRESS_WRITES = registry.register(Counter(
+    'matching_progress_writes_total', 'Matching progress writes by target (row or cache)', ['target']))
+
+
+def record_usage(prompt: str, response):
+    """
+    Count the tokens of a model response, when the backend reports them
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    tokens_in = getattr(usage, 'prompt_token_count', 0) or 0
+    tokens_out = getattr(usage, 'candidates_token_count', 0) or 0
+    if tokens_in:
+        GEMINI_TOKENS.inc(tokens_in, prompt=prompt, direction='in')
+    if tokens_out:
+        GEMINI_TOKENS.inc(tokens_out, prompt=prompt, direction='out')
+
+
+def _authorized(header: str) -> bool:
+    token = settings.METRICS_TOKEN
+    return not token or hmac.compare_digest(header or '', f'Bearer {token}')
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of this process's metrics (bearer token when METRICS_TOKEN is set)
+    """
+    if not _authorized(request.headers.get('Authorization')):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not _authorized(self.headers.get('Authorization')):
+            self.send_response(401)
+            self.end_headers()
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the worker log
+
+
+def start_metrics_server(port: int, address: str = '') -> ThreadingHTTPServer:
+    """
+    Serve /metrics from a background thread, for processes without the Django server (workers)
+    """
+    server = ThreadingHTTPServer((address, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
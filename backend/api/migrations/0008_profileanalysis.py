@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:25
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_studentprofile_matchingcompletedat_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileAnalysis',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('profileType', models.CharField(choices=[('student', 'Student'), ('professor', 'Professor')], max_length=20)),
+                ('profileId', models.UUIDField()),
+                ('contentHash', models.CharField(max_length=64)),
+                ('analysis', models.JSONField(default=dict)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('updatedAt', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'profile_analyses',
+                'unique_together': {('profileType', 'profileId')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:29
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_profileanalysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchingJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('workerId', models.CharField(blank=True, max_length=200, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('startedAt', models.DateTimeField(blank=True, null=True)),
+                ('heartbeatAt', models.DateTimeField(blank=True, null=True)),
+                ('completedAt', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matching_jobs', to='api.studentprofile')),
+            ],
+            options={
+                'db_table': 'matching_jobs',
+                'indexes': [models.Index(fields=['status', 'createdAt'], name='matching_jo_status_d83a5a_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('student',), name='unique_queued_matching_job')],
+            },
+        ),
+    ]
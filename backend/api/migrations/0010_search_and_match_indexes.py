@@ -0,0 +1,73 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:36
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_matchingjob'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['student', '-score'], name='match_student_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['professor', '-score'], name='match_professor_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['-score'], name='match_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=models.Index(fields=['acceptingStudents'], name='professor_accepting_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['researchAreas'], name='professor_areas_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['methods'], name='professor_methods_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='professor_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('department'), name='gin_trgm_ops'), name='professor_department_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('institution'), name='gin_trgm_ops'), name='professor_institution_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['primaryInterests'], name='student_interests_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('firstName'), name='gin_trgm_ops'), name='student_first_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('lastName'), name='gin_trgm_ops'), name='student_last_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('university'), name='gin_trgm_ops'), name='student_university_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('department'), name='gin_trgm_ops'), name='student_department_trgm'),
+        ),
+    ]
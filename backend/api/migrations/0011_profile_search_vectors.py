@@ -0,0 +1,88 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Weights: A = names, B = research areas / interests, C = department and institution,
+# D = free-text statements. Triggers only fire when a searched column is written, so
+# status-only updates (matching progress) don't rebuild the document.
+STUDENT_TRIGGER_SQL = """
+CREATE FUNCTION student_profiles_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW."searchVector" :=
+        setweight(to_tsvector('english', coalesce(NEW."firstName", '') || ' ' || coalesce(NEW."lastName", '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(array_to_string(NEW."primaryInterests", ' '), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW."department", '') || ' ' || coalesce(NEW."university", '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW."interestStatement", '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER student_profiles_search_vector_update
+BEFORE INSERT OR UPDATE OF "firstName", "lastName", "primaryInterests", "department", "university", "interestStatement"
+ON student_profiles FOR EACH ROW EXECUTE FUNCTION student_profiles_search_vector();
+
+UPDATE student_profiles SET "firstName" = "firstName";
+"""
+
+PROFESSOR_TRIGGER_SQL = """
+CREATE FUNCTION professor_profiles_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW."searchVector" :=
+        setweight(to_tsvector('english', coalesce(NEW."name", '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(array_to_string(NEW."researchAreas", ' '), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW."department", '') || ' ' || coalesce(NEW."institution", '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW."researchDescription", '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER professor_profiles_search_vector_update
+BEFORE INSERT OR UPDATE OF "name", "researchAreas", "department", "institution", "researchDescription"
+ON professor_profiles FOR EACH ROW EXECUTE FUNCTION professor_profiles_search_vector();
+
+UPDATE professor_profiles SET "name" = "name";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_search_and_match_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professorprofile',
+            name='searchVector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='searchVector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='professorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['searchVector'], name='professor_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['searchVector'], name='student_search_vector_gin'),
+        ),
+        migrations.RunSQL(
+            STUDENT_TRIGGER_SQL,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS student_profiles_search_vector_update ON student_profiles;
+            DROP FUNCTION IF EXISTS student_profiles_search_vector();
+            """,
+        ),
+        migrations.RunSQL(
+            PROFESSOR_TRIGGER_SQL,
+            reverse_sql="""
+            DROP TRIGGER IF EXISTS professor_profiles_search_vector_update ON professor_profiles;
+            DROP FUNCTION IF EXISTS professor_profiles_search_vector();
+            """,
+        ),
+    ]
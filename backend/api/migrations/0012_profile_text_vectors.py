@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_profile_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='professorprofile',
+            name='textVector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='textVector',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_profile_text_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingjob',
+            name='professor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matching_jobs', to='api.professorprofile'),
+        ),
+        migrations.AlterField(
+            model_name='matchingjob',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matching_jobs', to='api.studentprofile'),
+        ),
+        migrations.AddConstraint(
+            model_name='matchingjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('professor',), name='unique_queued_professor_job'),
+        ),
+        migrations.AddConstraint(
+            model_name='matchingjob',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('professor__isnull', True), ('student__isnull', False)), models.Q(('professor__isnull', False), ('student__isnull', True)), _connector='OR'), name='matching_job_single_target'),
+        ),
+    ]
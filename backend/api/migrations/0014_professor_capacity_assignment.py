@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_professor_matching_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='assigned',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='professorprofile',
+            name='capacity',
+            field=models.PositiveIntegerField(default=3),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('assigned', True)), fields=['professor'], name='match_assigned_idx'),
+        ),
+    ]
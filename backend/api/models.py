@@ -1,5 +1,9 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+import copy
 import uuid
 
 class StudentProfile(models.Model):
@@ -93,11 +97,25 @@ class StudentProfile(models.Model):
     matchingCompletedAt = models.DateTimeField(blank=True, null=True)
     matchingError = models.TextField(blank=True, null=True)
     
+    # Full-text search document, maintained by a database trigger (see migration 0011)
+    searchVector = SearchVectorField(blank=True, null=True, editable=False)
+    # float32 hashed text vector of the profile's descriptions (see text_vectors.py)
+    textVector = models.BinaryField(blank=True, null=True, editable=False)
+    
     createdAt = models.DateTimeField(auto_now_add=True)
     updatedAt = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'student_profiles'
+        indexes = [
+            GinIndex(fields=['searchVector'], name='student_search_vector_gin'),
+            GinIndex(fields=['primaryInterests'], name='student_interests_gin'),
+            # icontains compiles to UPPER(col) LIKE UPPER(%q%), so the trigram indexes are on UPPER(col)
+            GinIndex(OpClass(Upper('firstName'), name='gin_trgm_ops'), name='student_first_name_trgm'),
+            GinIndex(OpClass(Upper('lastName'), name='gin_trgm_ops'), name='student_last_name_trgm'),
+            GinIndex(OpClass(Upper('university'), name='gin_trgm_ops'), name='student_university_trgm'),
+            GinIndex(OpClass(Upper('department'), name='gin_trgm_ops'), name='student_department_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.firstName} {self.lastName} - {self.university}"
@@ -119,14 +137,54 @@ class ProfessorProfile(models.Model):
     preferredDegreeLevels = ArrayField(models.CharField(max_length=10), default=list)
     prerequisites = models.TextField(blank=True, null=True)
     contactPreferences = ArrayField(models.CharField(max_length=20), default=list)
+    # Student slots in the global assignment (see assignment.py)
+    capacity = models.PositiveIntegerField(default=3)
     
     # Metadata
     profileCompleteness = models.IntegerField(default=0)
+    
+    # Full-text search document, maintained by a database trigger (see migration 0011)
+    searchVector = SearchVectorField(blank=True, null=True, editable=False)
+    # float32 hashed text vector of the profile's descriptions (see text_vectors.py)
+    textVector = models.BinaryField(blank=True, null=True, editable=False)
+    
     createdAt = models.DateTimeField(auto_now_add=True)
     updatedAt = models.DateTimeField(auto_now=True)
     
+    # Fields the basic match score depends on; changing one re-matches the professor's column
+    MATCHING_FIELDS = ('researchAreas', 'methods', 'preferredDegreeLevels', 'acceptingStudents')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_matching_fields()
+        return instance
+    
+    def remember_matching_fields(self):
+        self._loaded_matching_fields = {
+            name: copy.copy(self.__dict__[name]) for name in self.MATCHING_FIELDS if name in self.__dict__
+        }
+    
+    def matching_fields_changed(self) -> bool:
+        """
+        Whether a matching field differs from the values loaded from (or last saved to) the database
+        """
+        loaded = getattr(self, '_loaded_matching_fields', None)
+        if loaded is None:
+            return True
+        return any(getattr(self, name) != value for name, value in loaded.items())
+    
     class Meta:
         db_table = 'professor_profiles'
+        indexes = [
+            GinIndex(fields=['searchVector'], name='professor_search_vector_gin'),
+            models.Index(fields=['acceptingStudents'], name='professor_accepting_idx'),
+            GinIndex(fields=['researchAreas'], name='professor_areas_gin'),
+            GinIndex(fields=['methods'], name='professor_methods_gin'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='professor_name_trgm'),
+            GinIndex(OpClass(Upper('department'), name='gin_trgm_ops'), name='professor_department_trgm'),
+            GinIndex(OpClass(Upper('institution'), name='gin_trgm_ops'), name='professor_institution_trgm'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.name} - {self.institution}"
@@ -149,11 +207,93 @@ class Match(models.Model):
     aiAnalysis = models.JSONField(default=dict)  # Store detailed AI analysis
     detailedScores = models.JSONField(default=dict)  # Store individual score breakdowns
     
+    # Part of the latest capacity-constrained global assignment
+    assigned = models.BooleanField(default=False)
+    
     createdAt = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'matches'
         unique_together = ['student', 'professor']  # Prevent duplicate matches
+        indexes = [
+            models.Index(fields=['student', '-score'], name='match_student_score_idx'),
+            models.Index(fields=['professor', '-score'], name='match_professor_score_idx'),
+            models.Index(fields=['-score'], name='match_score_idx'),
+            models.Index(fields=['professor'], condition=models.Q(assigned=True), name='match_assigned_idx'),
+        ]
     
     def __str__(self):
         return f"Match: {self.student.firstName} {self.student.lastName} - {self.professor.name}"
+
+class ProfileAnalysis(models.Model):
+    PROFILE_TYPE_CHOICES = [
+        ('student', 'Student'),
+        ('professor', 'Professor'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    profileType = models.CharField(max_length=20, choices=PROFILE_TYPE_CHOICES)
+    profileId = models.UUIDField()
+    contentHash = models.CharField(max_length=64)  # Hash of the profile fields the prompt uses
+    analysis = models.JSONField(default=dict)  # Gemini analysis of that profile revision
+    
+    createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'profile_analyses'
+        unique_together = ['profileType', 'profileId']  # One cached revision per profile
+    
+    def __str__(self):
+        return f"Analysis: {self.profileType} {self.profileId}"
+
+class MatchingJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('in_progress', 'In Progress'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # A job re-matches either one student against all professors, or one professor's
+    # column of matches against all students (after a matching field changed)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='matching_jobs', blank=True, null=True)
+    professor = models.ForeignKey('ProfessorProfile', on_delete=models.CASCADE, related_name='matching_jobs', blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    workerId = models.CharField(max_length=200, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    
+    createdAt = models.DateTimeField(auto_now_add=True)
+    startedAt = models.DateTimeField(blank=True, null=True)
+    heartbeatAt = models.DateTimeField(blank=True, null=True)  # Refreshed while a worker runs the job
+    completedAt = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'matching_jobs'
+        indexes = [
+            models.Index(fields=['status', 'createdAt']),
+        ]
+        constraints = [
+            # At most one queued job per student; repeated triggers reuse it
+            models.UniqueConstraint(
+                fields=['student'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_matching_job'
+            ),
+            models.UniqueConstraint(
+                fields=['professor'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_professor_job'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(student__isnull=False, professor__isnull=True) |
+                          models.Q(student__isnull=True, professor__isnull=False),
+                name='matching_job_single_target'
+            ),
+        ]
+    
+    def __str__(self):
+        target = f"student {self.student_id}" if self.student_id else f"professor {self.professor_id}"
+        return f"Matching job: {target} ({self.status})"
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Sequence
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    # str() keeps full precision for Decimal, UUID and datetime keys
+    payload = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list):
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def estimated_count(queryset) -> int:
+    """
+    Row estimate from the query planner; no rows are counted
+    """
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination on a stable, unique ordering such as ('-score', 'id').
+
+    The cursor encodes the key values of the last row of the page, and the next page is
+    fetched with a lexicographic "after this row" filter instead of an OFFSET, so every page
+    costs the same index range scan no matter how deep it is. Keys may be annotations
+    (e.g. a search rank); floating point keys must be double precision so they round-trip
+    exactly through the cursor. The last key must be unique.
+
+    A planner estimate of the total is included only when the client passes ?count=approximate.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    max_page_size = 100
+    ordering: Sequence[str] = ('id',)
+
+    def __init__(self, ordering: Optional[Sequence[str]] = None, cursor_query_param: Optional[str] = None,
+                 page_size: Optional[int] = None):
+        self.ordering = list(ordering or self.ordering)
+        if cursor_query_param:
+            self.cursor_query_param = cursor_query_param
+        self.page_size = page_size or settings.REST_FRAMEWORK['PAGE_SIZE']
+        self.next_cursor = None
+        self.count = None
+        self.request = None
+
+    def _keys(self):
+        return [(key.lstrip('-'), key.startswith('-')) for key in self.ordering]
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def _key_field(queryset, name: str):
+        annotation = queryset.query.annotations.get(name)
+        return annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+
+    def _after(self, values: Sequence[Any], queryset: QuerySet) -> QuerySet:
+        """
+        Filter for the rows after the cursor. Each value goes through its key field's
+        to_python, so a cursor of the wrong shape is rejected here and not when the
+        queryset runs.
+        """
+        keys = self._keys()
+        if len(values) != len(keys):
+            raise NotFound('Invalid cursor')
+        try:
+            values = [self._key_field(queryset, field).to_python(value) for (field, _), value in zip(keys, values)]
+            condition = Q(pk__in=[])
+            for index, (field, descending) in enumerate(keys):
+                step = Q(**{f'{field}__lt' if descending else f'{field}__gt': values[index]})
+                for previous in range(index):
+                    step &= Q(**{keys[previous][0]: values[previous]})
+                condition |= step
+            return queryset.filter(condition)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.count = estimated_count(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self._after(decode_cursor(cursor), queryset)
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset.order_by(*self.ordering)[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = None
+        if len(rows) > page_size:
+            last = page[-1]
+            self.next_cursor = encode_cursor([getattr(last, field) for field, _ in self._keys()])
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data) -> dict:
+        payload = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            payload['count'] = self.count
+        return payload
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['next', 'results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Planner estimate, only with ?count=approximate'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Cursor from the previous page', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': f'Page size (max {self.max_page_size})', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'description': "Pass 'approximate' to include a planner row estimate", 'schema': {'type': 'string'}},
+        ]
+
+
+class MatchPagination(KeysetPagination):
+    ordering = ('-score', 'id')
@@ -0,0 +1,244 @@
+import cProfile
+import contextvars
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, List
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.urls import reverse
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_QUERY_PARAM = 'profile_token'
+# Functions listed in the text summary of an artifact
+PROFILE_SUMMARY_LINES = 40
+# Long parameter lists (vectors, id batches) are cut in the query log
+MAX_PARAMS_CHARS = 300
+_ARTIFACT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+logger = logging.getLogger(__name__)
+
+_session: contextvars.ContextVar = contextvars.ContextVar('profiling_session', default=None)
+
+
+def _token_matches(candidate: str) -> bool:
+    token = settings.PROFILING_TOKEN
+    return bool(token and candidate) and hmac.compare_digest(candidate, token)
+
+
+def _request_token(request) -> str:
+    return request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM) or ''
+
+
+class ProfilingSession:
+    """
+    Everything captured for one profiled request: a cProfile profile, every ORM query with
+    its duration and the time spent in serializers
+    """
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex
+        self.method = request.method
+        query = request.GET.copy()
+        query.pop(PROFILE_QUERY_PARAM, None)
+        self.path = request.path + (f'?{query.urlencode()}' if query else '')
+        self.queries: List[Dict[str, Any]] = []
+        self.serializers: Dict[str, Dict[str, float]] = defaultdict(lambda: {'calls': 0, 'seconds': 0.0})
+        self.profiler = cProfile.Profile()
+        self.profiled = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': repr(params)[:MAX_PARAMS_CHARS],
+                'many': many,
+                'seconds': round(time.perf_counter() - started, 6),
+            })
+
+    @contextmanager
+    def time_serializer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.serializers[name]
+            entry['calls'] += 1
+            entry['seconds'] += time.perf_counter() - started
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            token = _session.set(self)
+            stack.callback(_session.reset, token)
+            stack.enter_context(_serializer_timing())
+            try:
+                self.profiler.enable()
+                self.profiled = True
+            except ValueError:
+                # Another profiler (a debugger, coverage) owns this thread; keep queries and serializers
+                pass
+            try:
+                yield
+            finally:
+                if self.profiled:
+                    self.profiler.disable()
+
+    def report(self, status: int, seconds: float) -> Dict[str, Any]:
+        summary = io.StringIO()
+        if self.profiled:
+            pstats.Stats(self.profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_SUMMARY_LINES)
+        serializers = {
+            name: {'calls': entry['calls'], 'seconds': round(entry['seconds'], 6)}
+            for name, entry in sorted(self.serializers.items(), key=lambda item: -item[1]['seconds'])
+        }
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'seconds': round(seconds, 6),
+            'query_count': len(self.queries),
+            'query_seconds': round(sum(query['seconds'] for query in self.queries), 6),
+            'serializer_seconds': round(sum(entry['seconds'] for entry in serializers.values()), 6),
+            'serializers': serializers,
+            'queries': self.queries,
+            'profile': summary.getvalue(),
+        }
+
+
+_timing_lock = threading.Lock()
+_timing_sessions = 0
+_untimed: Dict[str, Any] = {}
+
+
+@contextmanager
+def _serializer_timing():
+    """
+    Time BaseSerializer.data and is_valid while a profiled request runs. The first active
+    session patches BaseSerializer and the last restores it; unprofiled requests running
+    in between pay one context variable lookup per call.
+    """
+    global _timing_sessions
+    from rest_framework.serializers import BaseSerializer
+    with _timing_lock:
+        _timing_sessions += 1
+        if _timing_sessions == 1:
+            _untimed.update(data=BaseSerializer.__dict__['data'], is_valid=BaseSerializer.__dict__['is_valid'])
+            data, is_valid = _untimed['data'].fget, _untimed['is_valid']
+
+            def timed_data(self):
+                session = _session.get()
+                if session is None:
+                    return data(self)
+                with session.time_serializer(f'{type(self).__name__}.data'):
+                    return data(self)
+
+            def timed_is_valid(self, *args, **kwargs):
+                session = _session.get()
+                if session is None:
+                    return is_valid(self, *args, **kwargs)
+                with session.time_serializer(f'{type(self).__name__}.is_valid'):
+                    return is_valid(self, *args, **kwargs)
+
+            BaseSerializer.data = property(timed_data)
+            BaseSerializer.is_valid = timed_is_valid
+    try:
+        yield
+    finally:
+        with _timing_lock:
+            _timing_sessions -= 1
+            if _timing_sessions == 0:
+                BaseSerializer.data = _untimed.pop('data')
+                BaseSerializer.is_valid = _untimed.pop('is_valid')
+
+
+def _artifact_prefix() -> str:
+    return reverse('profile-artifact', args=['0' * 32])[:-32]
+
+
+def _artifact_dir() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def _store(session: ProfilingSession, report: Dict[str, Any]):
+    directory = _artifact_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    if session.profiled:
+        session.profiler.dump_stats(directory / f'{session.id}.prof')
+    with open(directory / f'{session.id}.json', 'w') as handle:
+        json.dump(report, handle, indent=2)
+
+    artifacts = sorted(directory.glob('*.json'), key=os.path.getmtime)
+    for stale in artifacts[:max(0, len(artifacts) - settings.PROFILING_MAX_ARTIFACTS)]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix('.prof').unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in profiling of single requests. A request carrying the PROFILING_TOKEN in the
+    X-Profile-Token header (or the profile_token query parameter) is run under cProfile
+    with its ORM queries and serializer time recorded; the artifact is stored under
+    PROFILING_DIR and its download URL returned in the X-Profile-Url header. Without a
+    token configured the middleware removes itself from the stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_TOKEN:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Downloads of artifacts carry the token too; don't profile those
+        if not _token_matches(_request_token(request)) or request.path.startswith(_artifact_prefix()):
+            return self.get_response(request)
+
+        session = ProfilingSession(request)
+        started = time.perf_counter()
+        with session.capture():
+            response = self.get_response(request)
+        _store(session, session.report(response.status_code, time.perf_counter() - started))
+
+        response['X-Profile-Id'] = session.id
+        response['X-Profile-Url'] = request.build_absolute_uri(reverse('profile-artifact', args=[session.id]))
+        logger.info("Profiled %s %s: %s queries, artifact %s", session.method, session.path, len(session.queries), session.id)
+        return response
+
+
+def profile_artifact_view(request, profile_id):
+    """
+    Download a profiling artifact: the JSON report, or the raw cProfile stats with
+    ?format=prof (for pstats/snakeviz). Requires the profiling token.
+    """
+    if not _token_matches(_request_token(request)):
+        return HttpResponse('Not found', status=404, content_type='text/plain')
+    if not _ARTIFACT_ID.match(profile_id):
+        return HttpResponse('Not found', status=404, content_type='text/plain')
+
+    suffix = '.prof' if request.GET.get('format') == 'prof' else '.json'
+    path = _artifact_dir() / f'{profile_id}{suffix}'
+    if not path.exists():
+        return HttpResponse('Not found', status=404, content_type='text/plain')
+    if suffix == '.prof':
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+    with open(path) as handle:
+        return JsonResponse(json.load(handle))
@@ -0,0 +1,145 @@
+import time
+from typing import Any, Callable, Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils import timezone
+from .models import StudentProfile
+from .metrics import MATCHING_PROGRESS_WRITES
+
+# Columns touched by progress reporting; nothing else on the student row is rewritten
+STATUS_FIELDS = ['matchingStatus', 'matchingProgress', 'matchingStartedAt', 'matchingCompletedAt', 'matchingError']
+
+PROGRESS_CACHE_TIMEOUT = 60 * 60 * 24
+# Postgres NOTIFY channel carrying the id of each student whose status was written
+PROGRESS_CHANNEL = 'matching_progress'
+
+
+def progress_cache_key(student_id) -> str:
+    return f'matching-progress:{student_id}'
+
+
+def notify_progress(student_id):
+    """
+    Wake the event streams of a student; delivered once the surrounding transaction commits
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [PROGRESS_CHANNEL, str(student_id)])
+
+
+def status_snapshot(student: StudentProfile) -> Dict[str, Any]:
+    return {
+        'status': student.matchingStatus,
+        'progress': student.matchingProgress,
+        'started_at': student.matchingStartedAt,
+        'completed_at': student.matchingCompletedAt,
+        'error': student.matchingError
+    }
+
+
+def get_published_status(student_id) -> Optional[Dict[str, Any]]:
+    """
+    Latest status published to the progress channel, if the channel is enabled
+    """
+    if settings.MATCHING_PROGRESS_BACKEND != 'cache':
+        return None
+    return cache.get(progress_cache_key(student_id))
+
+
+NOT_FOUND_STATUS = {
+    'status': 'not_found',
+    'progress': 0,
+    'started_at': None,
+    'completed_at': None,
+    'error': 'Student not found'
+}
+
+
+def get_matching_status(student_id) -> Dict[str, Any]:
+    """
+    Current matching status: the progress channel if enabled, otherwise only the status columns
+    """
+    published = get_published_status(student_id)
+    if published is not None:
+        return published
+    try:
+        student = StudentProfile.objects.only(*STATUS_FIELDS).get(id=student_id)
+    except (StudentProfile.DoesNotExist, ValidationError):
+        return dict(NOT_FOUND_STATUS)
+    return status_snapshot(student)
+
+
+async def aget_matching_status(student_id) -> Dict[str, Any]:
+    """
+    Async variant of get_matching_status for streaming views
+    """
+    if settings.MATCHING_PROGRESS_BACKEND == 'cache':
+        published = await cache.aget(progress_cache_key(student_id))
+        if published is not None:
+            return published
+    try:
+        student = await StudentProfile.objects.only(*STATUS_FIELDS).aget(id=student_id)
+    except (StudentProfile.DoesNotExist, ValidationError):
+        return dict(NOT_FOUND_STATUS)
+    return status_snapshot(student)
+
+
+class MatchingProgressReporter:
+    """
+    Reports matching progress for one student.
+
+    Intermediate progress is coalesced: it is written only when it moved by at least
+    `min_step` points or `min_interval` seconds have passed, and only the status columns
+    are updated. With backend='cache' every update is published to the cache channel and
+    intermediate progress skips the row entirely; start and finish are always written to
+    the row. The cache backend must then be shared between web and worker processes.
+    Every write is announced on PROGRESS_CHANNEL for the event streams.
+    """
+
+    def __init__(self, student: StudentProfile, backend: Optional[str] = None, min_interval: Optional[float] = None,
+                 min_step: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        self.student = student
+        self.backend = backend or settings.MATCHING_PROGRESS_BACKEND
+        self.min_interval = settings.MATCHING_PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self.min_step = settings.MATCHING_PROGRESS_MIN_STEP if min_step is None else min_step
+        self._clock = clock
+        self._reported_progress = student.matchingProgress
+        self._reported_at = clock()
+
+    def start(self):
+        self.student.matchingStatus = 'in_progress'
+        self.student.matchingProgress = 0
+        self.student.matchingStartedAt = timezone.now()
+        self.student.matchingCompletedAt = None
+        self.student.matchingError = None
+        self._write(to_row=True)
+
+    def update(self, progress: int):
+        """
+        Record progress (0-100); written only once the step or interval threshold is reached
+        """
+        self.student.matchingProgress = progress
+        if (progress - self._reported_progress >= self.min_step or
+                self._clock() - self._reported_at >= self.min_interval):
+            self._write(to_row=self.backend == 'db')
+
+    def finish(self, status: str, error: Optional[str] = None):
+        self.student.matchingStatus = status
+        if status == 'completed':
+            self.student.matchingProgress = 100
+            self.student.matchingCompletedAt = timezone.now()
+        else:
+            self.student.matchingError = error
+        self._write(to_row=True)
+
+    def _write(self, to_row: bool):
+        if to_row:
+            self.student.save(update_fields=STATUS_FIELDS)
+            MATCHING_PROGRESS_WRITES.inc(target='row')
+        if self.backend == 'cache':
+            MATCHING_PROGRESS_WRITES.inc(target='cache')
+            cache.set(progress_cache_key(self.student.id), status_snapshot(self.student), PROGRESS_CACHE_TIMEOUT)
+        notify_progress(self.student.id)
+        self._reported_progress = self.student.matchingProgress
+        self._reported_at = self._clock()
@@ -0,0 +1,87 @@
+from typing import Dict, List
+from django.conf import settings
+from django.db.models import Q
+import numpy as np
+from .models import StudentProfile, ProfessorProfile, Match
+from .matching_service import MatchingService, text_similarity_score, upsert_matches
+from .scoring_engine import BasicScoringEngine
+from .tag_index import ProfessorTagIndex
+from .text_vectors import STUDENT_TEXT_FIELDS, HashingVectorizer, profile_vector
+
+# Columns a column re-match refreshes; the AI score and explanation of existing matches are kept
+REMATCH_UPDATE_FIELDS = ['score', 'detailedScores', 'highlights', 'studentInterests', 'professorInterests']
+
+STUDENT_MATCHING_FIELDS = ('id', 'degreeLevel', 'hoursPerWeek', 'textVector', *STUDENT_TEXT_FIELDS)
+
+
+def rematch_professor(professor_id) -> int:
+    """
+    Recompute one professor's column of matches in one batched pass: students that already
+    have a match with the professor, plus students sharing a research area/method tag whose
+    matching has completed (students yet to run matching get the professor from their own
+    run). Matches are deleted when the professor stops accepting students. Returns the
+    number of matches written (or deleted).
+    """
+    professor = ProfessorProfile.objects.filter(id=professor_id).first()
+    if professor is None:
+        return 0
+    if not professor.acceptingStudents:
+        deleted, _ = Match.objects.filter(professor_id=professor_id).delete()
+        return deleted
+
+    tags = list(ProfessorTagIndex.professor_tags(professor))
+    matched = Match.objects.filter(professor_id=professor_id).values('student_id')
+    students = (
+        StudentProfile.objects.filter(
+            (Q(primaryInterests__overlap=tags) | Q(methods__overlap=tags)) & Q(matchingStatus='completed')
+            | Q(id__in=matched)
+        )
+        .only(*STUDENT_MATCHING_FIELDS)
+        .order_by('id')
+    )
+
+    engine = BasicScoringEngine([professor])
+    vectorizer = HashingVectorizer()
+    professor_vector = profile_vector(professor, vectorizer)
+    chunk_size = settings.MATCH_WRITE_CHUNK_SIZE
+    written = 0
+    chunk: List[StudentProfile] = []
+    for student in students.iterator(chunk_size=chunk_size):
+        chunk.append(student)
+        if len(chunk) >= chunk_size:
+            written += _rematch_chunk(professor, chunk, engine, vectorizer, professor_vector)
+            chunk = []
+    if chunk:
+        written += _rematch_chunk(professor, chunk, engine, vectorizer, professor_vector)
+    return written
+
+
+def _rematch_chunk(professor: ProfessorProfile, students: List[StudentProfile], engine: BasicScoringEngine,
+                   vectorizer: HashingVectorizer, professor_vector: np.ndarray) -> int:
+    """
+    Score a chunk of students against the professor and upsert their matches
+    """
+    scores = engine.score_students(students)
+    student_vectors = np.vstack([profile_vector(student, vectorizer) for student in students])
+    similarities = student_vectors @ professor_vector
+
+    # Existing detailed scores are kept, with the text similarity refreshed
+    existing: Dict = dict(
+        Match.objects.filter(professor=professor, student_id__in=[student.id for student in students])
+        .values_list('student_id', 'detailedScores')
+    )
+    matches = []
+    for student, score, similarity in zip(students, scores, similarities):
+        detailed_scores = {**(existing.get(student.id) or {}), 'textSimilarity': text_similarity_score(float(similarity))}
+        matches.append(Match(
+            student=student,
+            professor=professor,
+            score=int(score),
+            aiScore=int(score),
+            detailedScores=detailed_scores,
+            highlights=MatchingService._generate_highlights(student, professor),
+            studentInterests=student.primaryInterests,
+            professorInterests=professor.researchAreas,
+        ))
+    upsert_matches(matches, REMATCH_UPDATE_FIELDS)
+    return len(matches)
@@ -0,0 +1,60 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'professor-catalog-version'
+
+
+def get_catalog_version() -> int:
+    """
+    Current professor catalog version. It starts from a timestamp, so a version lost to
+    eviction or a cache restart never reuses a number that older entries were stored under.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached professor response in O(1): entries keyed by the old version
+    are never read again and simply expire
+    """
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def response_cache_key(request, version: int) -> str:
+    """
+    Key for a GET request: host and path plus the query parameters, normalized so that
+    parameter order and repeated values don't produce separate entries
+    """
+    params = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+    normalized = repr((request.get_host(), request.path, params))
+    digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    return f'professor-response:{version}:{digest}'
+
+
+def cached_catalog_response(view_method):
+    """
+    Cache successful responses of a professor viewset GET action under the catalog version
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = response_cache_key(request, get_catalog_version())
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.PROFESSOR_CACHE_TIMEOUT)
+        return response
+    return wrapper
@@ -0,0 +1,152 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from .models import StudentProfile, ProfessorProfile
+
+# Weights of the basic compatibility rule (see MatchingService._calculate_basic_score)
+AREA_WEIGHT = 20
+METHOD_WEIGHT = 15
+DEGREE_BONUS = 25
+AVAILABILITY_BONUS = 20
+MIN_HOURS_PER_WEEK = 10
+MAX_SCORE = 100
+
+_WORD_BITS = 64
+
+
+class TagVocabulary:
+    """
+    Shared tag -> bit position mapping used to encode profile tag lists as bitsets
+    """
+
+    def __init__(self):
+        self._positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def add(self, tag: str) -> int:
+        position = self._positions.get(tag)
+        if position is None:
+            position = len(self._positions)
+            self._positions[tag] = position
+        return position
+
+    def position(self, tag: str) -> Optional[int]:
+        return self._positions.get(tag)
+
+
+class BasicScoringEngine:
+    """
+    Score one student against a whole professor catalog in a single batched operation.
+
+    Research areas, methods and preferred degree levels of every professor are encoded
+    into packed uint64 bitsets over a shared vocabulary, so set intersections become a
+    bitwise AND followed by a popcount per row. Scores are identical to the per-pair rule.
+    """
+
+    def __init__(self, professors: Sequence[ProfessorProfile]):
+        self.professors: List[ProfessorProfile] = list(professors)
+        self.vocabulary = TagVocabulary()
+
+        for professor in self.professors:
+            for tag in (*professor.researchAreas, *professor.methods, *professor.preferredDegreeLevels):
+                self.vocabulary.add(tag)
+
+        self.n_words = max(1, -(-len(self.vocabulary) // _WORD_BITS))
+        self.area_bits = self._encode_rows(p.researchAreas for p in self.professors)
+        self.method_bits = self._encode_rows(p.methods for p in self.professors)
+        self.degree_bits = self._encode_rows(p.preferredDegreeLevels for p in self.professors)
+
+    @classmethod
+    def for_accepting_professors(cls) -> 'BasicScoringEngine':
+        """
+        Build an engine over every professor currently accepting students
+        """
+        return cls(ProfessorProfile.objects.filter(acceptingStudents=True))
+
+    def __len__(self) -> int:
+        return len(self.professors)
+
+    def encode(self, tags: Iterable[Optional[str]]) -> np.ndarray:
+        """
+        Encode a tag list as a bitset row; tags outside the vocabulary cannot match and are dropped
+        """
+        row = np.zeros(self.n_words, dtype=np.uint64)
+        for tag in tags:
+            position = self.vocabulary.position(tag) if tag is not None else None
+            if position is not None:
+                row[position // _WORD_BITS] |= np.uint64(1 << (position % _WORD_BITS))
+        return row
+
+    def _encode_rows(self, rows: Iterable[Iterable[str]]) -> np.ndarray:
+        encoded = [self.encode(tags) for tags in rows]
+        if not encoded:
+            return np.zeros((0, self.n_words), dtype=np.uint64)
+        return np.vstack(encoded)
+
+    def _overlap(self, matrix: np.ndarray, row: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(matrix & row).sum(axis=1, dtype=np.int64)
+
+    def score(self, student: StudentProfile) -> np.ndarray:
+        """
+        Basic compatibility score of the student against every professor, in catalog order
+        """
+        scores = AREA_WEIGHT * self._overlap(self.area_bits, self.encode(student.primaryInterests))
+        scores += METHOD_WEIGHT * self._overlap(self.method_bits, self.encode(student.methods))
+        scores += DEGREE_BONUS * (self._overlap(self.degree_bits, self.encode([student.degreeLevel])) > 0)
+
+        if student.hoursPerWeek and student.hoursPerWeek >= MIN_HOURS_PER_WEEK:
+            scores += AVAILABILITY_BONUS
+
+        return np.minimum(scores, MAX_SCORE)
+
+    def score_list(self, student: StudentProfile) -> List[int]:
+        """
+        Same as score() but as plain Python ints, ready to be stored on Match rows
+        """
+        return self.score(student).tolist()
+
+    def encode_students(self, students: Sequence[StudentProfile]) -> Tuple[np.ndarray, ...]:
+        """
+        Students as bitset matrices over the catalog vocabulary (interests, methods, degree)
+        plus their availability flags; plain arrays, so they can be shipped to worker processes
+        """
+        students = list(students)
+        return (
+            self._encode_rows(s.primaryInterests for s in students),
+            self._encode_rows(s.methods for s in students),
+            self._encode_rows([s.degreeLevel] for s in students),
+            np.fromiter(((s.hoursPerWeek or 0) >= MIN_HOURS_PER_WEEK for s in students), dtype=bool, count=len(students)),
+        )
+
+    @staticmethod
+    def _overlap_matrix(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        # One word column at a time keeps the temporaries at students x professors
+        counts = np.zeros((len(left), len(right)), dtype=np.int64)
+        for word in range(left.shape[1]):
+            counts += np.bitwise_count(left[:, word, None] & right[None, :, word])
+        return counts
+
+    def score_encoded(self, encoded: Tuple[np.ndarray, ...], professors: slice = slice(None)) -> np.ndarray:
+        """
+        Basic scores of encoded students (rows) against the catalog professors (columns)
+        """
+        areas, methods, degrees, available = encoded
+        scores = AREA_WEIGHT * self._overlap_matrix(areas, self.area_bits[professors])
+        scores += METHOD_WEIGHT * self._overlap_matrix(methods, self.method_bits[professors])
+        scores += DEGREE_BONUS * (self._overlap_matrix(degrees, self.degree_bits[professors]) > 0)
+        scores += AVAILABILITY_BONUS * available[:, None]
+        return np.minimum(scores, MAX_SCORE)
+
+    def score_matrix(self, students: Sequence[StudentProfile]) -> np.ndarray:
+        """
+        Basic scores of a block of students against every professor (students x catalog)
+        """
+        return self.score_encoded(self.encode_students(students))
+
+    def score_students(self, students: Sequence[StudentProfile], professor_index: int = 0) -> np.ndarray:
+        """
+        Basic score of one professor of the catalog against many students, in student order
+        """
+        professors = slice(professor_index, professor_index + 1)
+        return self.score_encoded(self.encode_students(students), professors)[:, 0]
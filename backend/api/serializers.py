@@ -8,29 +8,40 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 class StudentProfileSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    
     class Meta:
         model = StudentProfile
-        fields = '__all__'
+        exclude = ['searchVector', 'textVector']
         read_only_fields = ['id', 'createdAt', 'updatedAt', 'profileCompleteness']
 
 class ProfessorProfileSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    
     class Meta:
         model = ProfessorProfile
-        fields = '__all__'
+        exclude = ['searchVector', 'textVector']
         read_only_fields = ['id', 'createdAt', 'updatedAt', 'profileCompleteness']
 
 class MatchSerializer(serializers.ModelSerializer):
     student = StudentProfileSerializer(read_only=True)
     professor = ProfessorProfileSerializer(read_only=True)
+    # Required on create only, so updates keep accepting bodies without them
+    student_id = serializers.PrimaryKeyRelatedField(source='student', queryset=StudentProfile.objects.all(),
+                                                    write_only=True, required=False)
+    professor_id = serializers.PrimaryKeyRelatedField(source='professor', queryset=ProfessorProfile.objects.all(),
+                                                      write_only=True, required=False)
     
     class Meta:
         model = Match
         fields = '__all__'
-        read_only_fields = ['id', 'createdAt', 'aiScore', 'aiExplanation', 'aiAnalysis', 'detailedScores']
+        read_only_fields = ['id', 'createdAt', 'aiScore', 'aiExplanation', 'aiAnalysis', 'detailedScores', 'assigned']
+
+    def validate(self, attrs):
+        if self.instance is None:
+            missing = {
+                field: ['This field is required.']
+                for field, source in (('student_id', 'student'), ('professor_id', 'professor')) if source not in attrs
+            }
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
 
 # Simplified serializers for list views
 class StudentProfileListSerializer(serializers.ModelSerializer):
@@ -42,3 +53,30 @@ class ProfessorProfileListSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProfessorProfile
         fields = ['id', 'name', 'title', 'institution', 'department', 'researchAreas', 'acceptingStudents', 'profileCompleteness']
+
+# Summary serializers for match lists; the columns must stay in sync with
+# MATCH_LIST_FIELDS, which projects them in the joined query
+class StudentMatchSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StudentProfile
+        fields = ['id', 'firstName', 'lastName', 'university', 'department', 'degreeLevel']
+
+class ProfessorMatchSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProfessorProfile
+        fields = ['id', 'name', 'title', 'institution', 'department', 'researchAreas', 'acceptingStudents']
+
+class MatchListSerializer(serializers.ModelSerializer):
+    student = StudentMatchSummarySerializer(read_only=True)
+    professor = ProfessorMatchSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Match
+        fields = ['id', 'student', 'professor', 'score', 'aiScore', 'aiExplanation', 'highlights', 'detailedScores', 'assigned', 'createdAt']
+        read_only_fields = fields
+
+MATCH_LIST_FIELDS = (
+    [field for field in MatchListSerializer.Meta.fields if field not in ('student', 'professor')] +
+    [f'student__{field}' for field in StudentMatchSummarySerializer.Meta.fields] +
+    [f'professor__{field}' for field in ProfessorMatchSummarySerializer.Meta.fields]
+)
@@ -0,0 +1,74 @@
+import logging
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+from .models import StudentProfile, ProfessorProfile
+from .analysis_cache import profile_analysis_cache
+from .ann_index import professor_vector_index
+from .job_queue import enqueue_professor_rematch
+from .response_cache import bump_catalog_version
+from .tag_index import professor_tag_index
+from .text_vectors import PROFESSOR_TEXT_FIELDS, STUDENT_TEXT_FIELDS, refresh_text_vector, text_vector_stale
+
+logger = logging.getLogger(__name__)
+
+
+def _update_vector_index(update, *args):
+    """
+    Apply a vector index update after commit. A failure (unwritable ANN_INDEX_DIR, full disk)
+    must not fail the professor write: the index fingerprint no longer matches the catalog,
+    so the next lookup rebuilds it.
+    """
+    def apply():
+        try:
+            update(*args)
+        except Exception:
+            logger.exception("Professor vector index update failed; it will be rebuilt on next use")
+    transaction.on_commit(apply)
+
+
+def _text_fields(sender):
+    return PROFESSOR_TEXT_FIELDS if sender is ProfessorProfile else STUDENT_TEXT_FIELDS
+
+
+@receiver(pre_save, sender=ProfessorProfile)
+@receiver(pre_save, sender=StudentProfile)
+def refresh_profile_text_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'textVector' in update_fields:
+        refresh_text_vector(instance)
+
+
+@receiver(post_save, sender=ProfessorProfile)
+@receiver(post_save, sender=StudentProfile)
+def refresh_partial_text_vector(sender, instance, update_fields=None, **kwargs):
+    # Partial saves of text fields don't write textVector; store the refreshed vector separately
+    if update_fields is not None and 'textVector' not in update_fields and text_vector_stale(update_fields, _text_fields(sender)):
+        refresh_text_vector(instance)
+        sender.objects.filter(pk=instance.pk).update(textVector=instance.textVector)
+
+
+@receiver(post_save, sender=ProfessorProfile)
+def professor_saved(sender, instance, created=False, **kwargs):
+    professor_tag_index.update_professor(instance, created=created)
+    _update_vector_index(professor_vector_index.update_professor, instance, created)
+    # After commit, so a concurrent request can't re-cache the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+    # An edit to a field the match score depends on re-matches only this professor's column;
+    # new professors are picked up by the next student runs
+    if not created and instance.matching_fields_changed():
+        professor_id = instance.id
+        transaction.on_commit(lambda: enqueue_professor_rematch(professor_id))
+    instance.remember_matching_fields()
+
+
+@receiver(post_delete, sender=ProfessorProfile)
+def professor_deleted(sender, instance, **kwargs):
+    professor_tag_index.remove_professor(instance.id, instance.updatedAt)
+    _update_vector_index(professor_vector_index.remove_professor, instance.id, instance.updatedAt)
+    profile_analysis_cache.forget('professor', instance.id)
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=StudentProfile)
+def student_deleted(sender, instance, **kwargs):
+    profile_analysis_cache.forget('student', instance.id)
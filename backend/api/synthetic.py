@@ -0,0 +1,66 @@
+import random
+from typing import List, Sequence
+import numpy as np
+from .models import StudentProfile, ProfessorProfile
+
+DEGREE_LEVELS = ['BS', 'MS', 'PhD']
+WORDS = ['learning', 'systems', 'analysis', 'models', 'networks', 'cells', 'climate', 'signals', 'materials',
+         'language', 'markets', 'imaging', 'genomes', 'robots', 'policy', 'energy', 'proteins', 'sensors']
+
+
+class SyntheticCatalog:
+    """
+    Deterministic synthetic students and professors for benchmarks. Tags are drawn from a
+    vocabulary of `vocabulary_size` tags with Zipf-like popularity: tag i has weight
+    1 / (i + 1) ** skew, so skew=0 is uniform and larger values crowd everyone onto the
+    few popular tags (larger candidate sets). The same seed always yields the same profiles.
+    """
+
+    def __init__(self, vocabulary_size: int = 200, skew: float = 1.0, seed: int = 0):
+        self.vocabulary = [f'Tag {i}' for i in range(vocabulary_size)]
+        weights = 1.0 / np.arange(1, vocabulary_size + 1) ** skew
+        self.weights = weights / weights.sum()
+        self.seed = seed
+
+    def _tags(self, rng: np.random.Generator, low: int, high: int) -> List[str]:
+        count = min(int(rng.integers(low, high + 1)), len(self.vocabulary))
+        return [self.vocabulary[i] for i in rng.choice(len(self.vocabulary), size=count, replace=False, p=self.weights)]
+
+    @staticmethod
+    def _text(rng: random.Random, tags: Sequence[str]) -> str:
+        return ' '.join([*tags, *rng.sample(WORDS, 6)])
+
+    def students(self, count: int) -> List[StudentProfile]:
+        """
+        `count` unsaved student profiles
+        """
+        rng, text_rng = np.random.default_rng([self.seed, 1]), random.Random(self.seed * 2 + 1)
+        students = []
+        for i in range(count):
+            interests, methods = self._tags(rng, 1, 6), self._tags(rng, 0, 4)
+            students.append(StudentProfile(
+                firstName=f'Student{i}', lastName='Synthetic', email=f'student{i}@synthetic.test',
+                university='Synthetic University', department='Synthetic Studies',
+                degreeLevel=DEGREE_LEVELS[int(rng.integers(len(DEGREE_LEVELS)))],
+                primaryInterests=interests, methods=methods,
+                hoursPerWeek=int(rng.choice([0, 5, 10, 20, 40])),
+                interestStatement=self._text(text_rng, interests),
+            ))
+        return students
+
+    def professors(self, count: int) -> List[ProfessorProfile]:
+        """
+        `count` unsaved professor profiles, all accepting students
+        """
+        rng, text_rng = np.random.default_rng([self.seed, 2]), random.Random(self.seed * 2 + 2)
+        professors = []
+        for i in range(count):
+            areas, methods = self._tags(rng, 1, 8), self._tags(rng, 0, 5)
+            levels = rng.choice(DEGREE_LEVELS, size=int(rng.integers(1, 4)), replace=False)
+            professors.append(ProfessorProfile(
+                name=f'Professor {i}', title='Professor', department='Synthetic Studies',
+                institution='Synthetic University', researchAreas=areas, methods=methods,
+                preferredDegreeLevels=[str(level) for level in levels],
+                researchDescription=self._text(text_rng, areas),
+            ))
+        return professors
@@ -0,0 +1,121 @@
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+from django.db.models import Count, Max
+from .models import StudentProfile, ProfessorProfile
+
+
+class ProfessorTagIndex:
+    """
+    In-memory inverted index of tag -> ids of professors accepting students.
+
+    Tags are the union of a professor's researchAreas and methods. The index is kept current
+    by the ProfessorProfile save/delete signals, and is rebuilt from the database when its
+    fingerprint (row count + latest update) no longer matches, so edits made by other
+    processes are picked up as well. A local edit only advances the fingerprint when the
+    database matches what that edit alone leads to; otherwise the index is marked dirty.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set] = defaultdict(set)
+        self._tags: Dict[object, Set[str]] = {}
+        self._fingerprint: Optional[Tuple] = None
+
+    @staticmethod
+    def professor_tags(professor: ProfessorProfile) -> Set[str]:
+        return set(professor.researchAreas) | set(professor.methods)
+
+    @staticmethod
+    def student_tags(student: StudentProfile) -> Set[str]:
+        return set(student.primaryInterests) | set(student.methods)
+
+    def _current_fingerprint(self) -> Tuple:
+        stats = ProfessorProfile.objects.aggregate(total=Count('id'), updated=Max('updatedAt'))
+        return stats['total'], stats['updated']
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from the database
+        """
+        with self._lock:
+            fingerprint = self._current_fingerprint()
+            self._postings = defaultdict(set)
+            self._tags = {}
+            professors = ProfessorProfile.objects.filter(acceptingStudents=True).values_list(
+                'id', 'researchAreas', 'methods'
+            )
+            for professor_id, areas, methods in professors:
+                self._add(professor_id, set(areas) | set(methods))
+            self._fingerprint = fingerprint
+
+    def _ensure_fresh(self):
+        if self._fingerprint is None or self._fingerprint != self._current_fingerprint():
+            self.rebuild()
+
+    def _add(self, professor_id, tags: Set[str]):
+        self._tags[professor_id] = tags
+        for tag in tags:
+            self._postings[tag].add(professor_id)
+
+    def _remove(self, professor_id):
+        for tag in self._tags.pop(professor_id, ()):
+            posting = self._postings.get(tag)
+            if posting is not None:
+                posting.discard(professor_id)
+                if not posting:
+                    del self._postings[tag]
+
+    def _advance(self, expected: Optional[Tuple]):
+        """
+        Adopt the database fingerprint if it is the one the local edit leads to. Anything else
+        means other processes changed professors this index never saw: mark it dirty, so the
+        next lookup rebuilds it.
+        """
+        current = self._current_fingerprint()
+        self._fingerprint = current if expected is not None and current == expected else None
+
+    def update_professor(self, professor: ProfessorProfile, created: bool = False):
+        """
+        Re-index a single professor after it was saved
+        """
+        with self._lock:
+            if self._fingerprint is None:
+                return  # Not built yet (or dirty); the first lookup will load everything
+            self._remove(professor.id)
+            if professor.acceptingStudents:
+                self._add(professor.id, self.professor_tags(professor))
+            total, updated = self._fingerprint
+            latest = max(updated, professor.updatedAt) if updated else professor.updatedAt
+            self._advance((total + 1 if created else total, latest))
+
+    def remove_professor(self, professor_id, updated_at: Optional[datetime] = None):
+        """
+        Drop a deleted professor from the index
+        """
+        with self._lock:
+            if self._fingerprint is None:
+                return
+            self._remove(professor_id)
+            total, updated = self._fingerprint
+            # The latest update is only known to survive if the deleted row wasn't the latest
+            still_latest = updated_at is not None and updated is not None and updated_at < updated
+            self._advance((total - 1, updated) if still_latest else None)
+
+    def candidates(self, tags: Iterable[str]) -> Set:
+        """
+        Ids of accepting professors that share at least one tag
+        """
+        self._ensure_fresh()
+        with self._lock:
+            result = set()
+            for tag in set(tags):
+                result |= self._postings.get(tag, set())
+            return result
+
+    def candidates_for_student(self, student: StudentProfile) -> Set:
+        return self.candidates(self.student_tags(student))
+
+
+professor_tag_index = ProfessorTagIndex()
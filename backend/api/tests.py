@@ -1,3 +1,1615 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+from .models import StudentProfile, ProfessorProfile, Match, MatchingJob, ProfileAnalysis
+from . import llm_backends
+from .analysis_cache import profile_analysis_cache
+from .batch_matching import AllPairsMatcher, parse_shard
+from .ann_index import ProfessorVectorIndex, professor_vector_index
+from .assignment import assign_students, assignment_edges, deferred_acceptance
+from .gemini_executor import GeminiRequestExecutor, TokenBucket
+from .gemini_service import GeminiMatchingService
+from .llm_backends import FakeGeminiModel, FakeModelError, get_generative_model
+from .events import matching_status_events
+from .progress import MatchingProgressReporter
+from .job_queue import MatchingWorker, claim_next_job, enqueue_matching_job, enqueue_professor_rematch, recover_stale_jobs
+from .matching_service import MatchingService
+from .pagination import encode_cursor
+from .metrics import MATCHING_ERRORS, Counter, Histogram, registry
+from .scoring_engine import BasicScoringEngine
+from .synthetic import SyntheticCatalog
+from .tag_index import professor_tag_index
+from .text_vectors import HashingVectorizer, SemanticSimilarityEngine
+from .urls import router
 
-# Create your tests here.
+TAGS = ['Machine Learning', 'Robotics', 'Genomics', 'Statistics', 'Ecology', 'Deep Learning',
+        'Python', 'Fieldwork', 'Microscopy', 'Surveys', 'Simulation', 'Optimization']
+TAGS += [f'Topic {i}' for i in range(80)]  # spill the vocabulary over several bitset words
+DEGREES = ['BS', 'MS', 'PhD', 'Other']
+
+_index_directory = None
+_index_override = None
+
+
+def setUpModule():
+    # Professor saves and matching runs maintain the ANN index on disk; keep it out of backend/var
+    global _index_directory, _index_override
+    _index_directory = tempfile.TemporaryDirectory()
+    # Check the index fingerprint on every lookup, so edits that bypass the signals are seen at once
+    _index_override = override_settings(ANN_INDEX_DIR=_index_directory.name, ANN_FINGERPRINT_INTERVAL=0)
+    _index_override.enable()
+
+
+def tearDownModule():
+    _index_override.disable()
+    _index_directory.cleanup()
+
+
+def make_student(rng, **overrides):
+    fields = {
+        'firstName': 'Test',
+        'lastName': 'Student',
+        'degreeLevel': rng.choice(DEGREES),
+        'primaryInterests': rng.sample(TAGS, rng.randint(0, 8)),
+        'methods': rng.sample(TAGS, rng.randint(0, 8)),
+        'hoursPerWeek': rng.choice([None, 0, 5, 10, 20]),
+    }
+    fields.update(overrides)
+    return StudentProfile(**fields)
+
+
+def make_professor(rng, **overrides):
+    fields = {
+        'name': 'Test Professor',
+        'researchAreas': rng.sample(TAGS, rng.randint(0, 10)),
+        'methods': rng.sample(TAGS, rng.randint(0, 10)),
+        'preferredDegreeLevels': rng.sample(DEGREES, rng.randint(0, 3)),
+    }
+    fields.update(overrides)
+    return ProfessorProfile(**fields)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Local stand-in for genai.GenerativeModel that answers every prompt with the same JSON
+    """
+
+    def __init__(self, payload=None):
+        self.payload = payload or {'overall_score': 50, 'highlights': []}
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return FakeResponse(json.dumps(self.payload))
+
+
+def fake_gemini_service(model=None, executor=None):
+    # A private executor: the process-wide one would rate limit (and sleep) across tests
+    executor = executor or GeminiRequestExecutor(requests_per_minute=60000, retry_base_delay=0, sleep=lambda s: None)
+    return GeminiMatchingService(executor=executor, model=model or FakeModel())
+
+
+class BasicScoringEngineTests(SimpleTestCase):
+    def test_matches_per_pair_rule(self):
+        rng = random.Random(7)
+        professors = [make_professor(rng) for _ in range(150)]
+        students = [make_student(rng) for _ in range(40)]
+        students.append(make_student(rng, primaryInterests=['Unknown Tag'], methods=[], degreeLevel=None))
+
+        engine = BasicScoringEngine(professors)
+        service = MatchingService()
+        for student in students:
+            expected = [service._calculate_basic_score(student, professor) for professor in professors]
+            self.assertEqual(engine.score_list(student), expected)
+
+    def test_empty_catalog(self):
+        engine = BasicScoringEngine([])
+        self.assertEqual(engine.score_list(make_student(random.Random(1))), [])
+
+    def test_professor_column_matches_per_pair_rule(self):
+        rng = random.Random(11)
+        professors = [make_professor(rng) for _ in range(5)]
+        students = [make_student(rng) for _ in range(60)]
+
+        engine = BasicScoringEngine(professors)
+        service = MatchingService()
+        for index, professor in enumerate(professors):
+            expected = [service._calculate_basic_score(student, professor) for student in students]
+            self.assertEqual(engine.score_students(students, index).tolist(), expected)
+
+
+class ProfessorTagIndexTests(TestCase):
+    def setUp(self):
+        professor_tag_index.rebuild()
+        self.vision = ProfessorProfile.objects.create(
+            name='Vision', title='Professor', department='CS', institution='U',
+            researchAreas=['Computer Vision'], methods=['Deep Learning'], preferredDegreeLevels=['PhD'],
+        )
+        self.ecology = ProfessorProfile.objects.create(
+            name='Ecology', title='Professor', department='Biology', institution='U',
+            researchAreas=['Ecology'], methods=['Fieldwork'], preferredDegreeLevels=['MS'],
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(professor_tag_index.candidates(['Deep Learning']), {self.vision.id})
+
+        self.vision.methods = ['Fieldwork']
+        self.vision.save()
+        self.assertEqual(professor_tag_index.candidates(['Deep Learning']), set())
+        self.assertEqual(professor_tag_index.candidates(['Fieldwork']), {self.vision.id, self.ecology.id})
+
+        self.ecology.acceptingStudents = False
+        self.ecology.save()
+        self.assertEqual(professor_tag_index.candidates(['Fieldwork']), {self.vision.id})
+
+        self.vision.delete()
+        self.assertEqual(professor_tag_index.candidates(['Fieldwork', 'Computer Vision']), set())
+
+    def test_local_edit_does_not_adopt_unseen_changes(self):
+        self.assertEqual(professor_tag_index.candidates(['Genomics']), set())
+        # Written by another process: this process's signals never see it
+        other, = ProfessorProfile.objects.bulk_create([ProfessorProfile(
+            name='Genomics', title='Professor', department='Biology', institution='U', researchAreas=['Genomics'],
+        )])
+        self.vision.methods = ['Genomics']
+        self.vision.save()
+        self.assertEqual(professor_tag_index.candidates(['Genomics']), {self.vision.id, other.id})
+
+    def test_local_edits_keep_the_index_without_rebuilds(self):
+        professor_tag_index.candidates([])
+        self.vision.methods = ['Genomics']
+        self.vision.save()
+        self.ecology.delete()
+        with mock.patch.object(professor_tag_index, 'rebuild') as rebuild:
+            self.assertEqual(professor_tag_index.candidates(['Genomics']), {self.vision.id})
+        rebuild.assert_not_called()
+
+    def test_select_candidates_keeps_tag_overlap_and_top_k(self):
+        student = StudentProfile(primaryInterests=['Computer Vision'], methods=[], degreeLevel='MS', hoursPerWeek=0)
+        professors = [self.vision, self.ecology]
+        scores = BasicScoringEngine(professors).score(student)
+
+        with self.settings(MATCHING_CANDIDATE_TOP_K=0):
+            self.assertEqual(MatchingService.select_candidates(student, professors, scores), [0])
+        with self.settings(MATCHING_CANDIDATE_TOP_K=2):
+            self.assertEqual(MatchingService.select_candidates(student, professors, scores), [0, 1])
+
+
+class ProfileAnalysisCacheTests(TestCase):
+    def setUp(self):
+        profile_analysis_cache.clear()
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Machine Learning'],
+        )
+
+    def test_student_analyzed_once_per_revision(self):
+        service = fake_gemini_service()
+        for _ in range(3):
+            service.analyze_student_profile(dict(self.student.__dict__))
+        self.assertEqual(len(service.model.prompts), 1)
+        self.assertEqual(ProfileAnalysis.objects.filter(profileId=self.student.id).count(), 1)
+
+        # A fresh process (empty LRU) is served from the table
+        profile_analysis_cache.clear()
+        service.analyze_student_profile(dict(self.student.__dict__))
+        self.assertEqual(len(service.model.prompts), 1)
+
+        # Editing a prompt field invalidates the cached analysis
+        self.student.primaryInterests = ['Robotics']
+        self.student.save()
+        service.analyze_student_profile(dict(self.student.__dict__))
+        self.assertEqual(len(service.model.prompts), 2)
+        self.assertEqual(ProfileAnalysis.objects.filter(profileId=self.student.id).count(), 1)
+
+    def test_deleting_profile_drops_analysis(self):
+        fake_gemini_service().analyze_student_profile(dict(self.student.__dict__))
+        self.student.delete()
+        self.assertFalse(ProfileAnalysis.objects.exists())
+
+    def test_cache_failure_keeps_the_analysis(self):
+        service = fake_gemini_service(FakeModel({'strengths': ['Robotics'], 'interests_summary': 'From the model'}))
+        with mock.patch.object(profile_analysis_cache, 'store', side_effect=OperationalError('connection lost')), \
+                self.assertLogs('api.gemini_service', level='ERROR'):
+            analysis = service.analyze_student_profile(dict(self.student.__dict__))
+        self.assertEqual(analysis['interests_summary'], 'From the model')
+
+
+class RateLimitError(Exception):
+    code = 429
+
+
+class BadRequestError(Exception):
+    code = 400
+
+
+class SlowFakeModel(FakeModel):
+    """
+    Fake model with latency that records peak concurrency and can fail the first calls
+    """
+
+    def __init__(self, latency=0.05, failures=0, error=RateLimitError):
+        super().__init__()
+        self.latency = latency
+        self.failures = failures
+        self.error = error
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise self.error()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return super().generate_content(prompt)
+
+
+class GeminiRequestExecutorTests(SimpleTestCase):
+    def test_concurrency_is_bounded_and_parallel(self):
+        model = SlowFakeModel(latency=0.05)
+        executor = GeminiRequestExecutor(max_in_flight=4, requests_per_minute=60000)
+
+        started = time.monotonic()
+        results = list(executor.as_completed(lambda prompt: executor.generate(model, prompt), range(16)))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(len(results), 16)
+        self.assertEqual(model.peak_in_flight, 4)
+        self.assertLess(elapsed, 16 * 0.05 / 2)
+
+    def test_retries_rate_limit_errors(self):
+        model = SlowFakeModel(latency=0, failures=2)
+        executor = GeminiRequestExecutor(max_in_flight=1, requests_per_minute=60000, retry_base_delay=0)
+        self.assertEqual(json.loads(executor.generate(model, 'prompt').text)['overall_score'], 50)
+        self.assertEqual(model.calls, 3)
+
+    def test_does_not_retry_client_errors(self):
+        model = SlowFakeModel(latency=0, failures=1, error=BadRequestError)
+        executor = GeminiRequestExecutor(max_in_flight=1, requests_per_minute=60000, retry_base_delay=0)
+        with self.assertRaises(BadRequestError):
+            executor.generate(model, 'prompt')
+        self.assertEqual(model.calls, 1)
+
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEqual(waits, [0.5, 0.5])
+
+    def test_zero_rate_disables_the_limit(self):
+        executor = GeminiRequestExecutor(max_in_flight=1, requests_per_minute=0)
+        self.assertIsNone(executor.rate_limiter)
+        model = SlowFakeModel(latency=0)
+        for _ in range(10):
+            executor.generate(model, 'prompt')
+        self.assertEqual(model.calls, 10)
+
+        with self.assertRaises(ValueError):
+            GeminiRequestExecutor(requests_per_minute=-1)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0, capacity=1)
+
+
+class MatchingRunTests(TransactionTestCase):
+    def setUp(self):
+        profile_analysis_cache.clear()
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Machine Learning'], methods=['Python'], hoursPerWeek=20,
+        )
+        for i in range(6):
+            ProfessorProfile.objects.create(
+                name=f'Professor {i}', title='Professor', department='CS', institution='U',
+                researchAreas=['Machine Learning'], methods=['Python'], preferredDegreeLevels=['PhD'],
+            )
+
+    def test_queued_run_writes_all_matches_with_concurrent_analysis(self):
+        model = SlowFakeModel(latency=0.01)
+        service = MatchingService()
+        service.gemini_service = fake_gemini_service(model, GeminiRequestExecutor(max_in_flight=3, requests_per_minute=60000))
+
+        self.assertTrue(service.start_matching_for_student(self.student.id))
+        # The fake answers the batch prompt with an object, so every pair falls back to its own prompt
+        with self.assertLogs('api.gemini_service', level='ERROR'):
+            job = MatchingWorker(worker_id='test', matching_service=service).process_next()
+
+        self.assertEqual(job.status, 'completed')
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.matchingStatus, 'completed')
+        self.assertEqual(self.student.matchingProgress, 100)
+        self.assertEqual(Match.objects.filter(student=self.student).count(), 6)
+        self.assertLessEqual(model.peak_in_flight, 3)
+
+
+class BatchMatchScoringTests(TestCase):
+    def setUp(self):
+        profile_analysis_cache.clear()
+
+    def test_batch_results_with_per_pair_fallback(self):
+        ids = [uuid.uuid4() for _ in range(3)]
+        professors = [{'id': ids[i], 'name': f'Professor {i}', 'researchAreas': ['Robotics']} for i in range(3)]
+        batch_entries = [
+            {'professor_id': str(ids[0]), 'overall_score': 81, 'highlights': ['Robotics'], 'explanation': 'Great fit.',
+             'detailed_scores': {'research_alignment': 90, 'skill_compatibility': 'good', 'academic_fit': 120}},
+            {'professor_id': str(ids[1]), 'overall_score': 'high'},  # invalid score -> per-pair fallback
+            {'professor_id': str(ids[2]), 'overall_score': 40, 'highlights': []},
+            {'professor_id': 'unknown', 'overall_score': 99},
+        ]
+
+        class BatchModel(FakeModel):
+            def generate_content(self, prompt):
+                if 'each of the professors' in prompt:
+                    self.prompts.append(prompt)
+                    return FakeResponse(json.dumps(batch_entries))
+                return super().generate_content(prompt)
+
+        service = fake_gemini_service(BatchModel({'overall_score': 55, 'highlights': ['fallback']}))
+        results = service.analyze_matches_batch({'firstName': 'Ada', 'primaryInterests': ['Robotics']}, professors)
+
+        self.assertEqual([result['score'] for result in results], [81, 55, 40])
+        self.assertEqual(results[0]['explanation'], 'Great fit.')
+        self.assertEqual(results[0]['detailed_scores'], {'research_alignment': 90})
+        self.assertEqual(results[2]['detailed_scores'], {})
+        self.assertEqual(results[1]['highlights'], ['fallback'])
+        # 1 student + 3 professor analyses, 1 batch prompt, then score + explanation for the fallback pair
+        self.assertEqual(len(service.model.prompts), 7)
+
+    def test_non_array_response_falls_back_for_every_professor(self):
+        service = fake_gemini_service(FakeModel({'overall_score': 30, 'highlights': []}))
+        with self.assertLogs('api.gemini_service', level='ERROR'):
+            results = service.analyze_matches_batch({'firstName': 'Ada'}, [{'name': 'A'}, {'name': 'B'}])
+        self.assertEqual([result['score'] for result in results], [30, 30])
+
+
+class MatchingJobQueueTests(TestCase):
+    def setUp(self):
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD',
+        )
+
+    def test_enqueue_deduplicates_per_student(self):
+        job = enqueue_matching_job(self.student.id)
+        self.assertEqual(enqueue_matching_job(self.student.id), job)
+        self.assertEqual(MatchingJob.objects.count(), 1)
+
+    def test_student_never_runs_twice_at_once(self):
+        first = enqueue_matching_job(self.student.id)
+        self.assertEqual(claim_next_job('worker-1'), first)
+
+        # A new trigger while running is queued, but not claimable until the first run ends
+        second = enqueue_matching_job(self.student.id)
+        self.assertNotEqual(second, first)
+        self.assertIsNone(claim_next_job('worker-2'))
+
+        MatchingJob.objects.filter(id=first.id).update(status='completed')
+        self.assertEqual(claim_next_job('worker-2'), second)
+
+    def test_stale_jobs_are_requeued_then_failed(self):
+        job = enqueue_matching_job(self.student.id)
+        claim_next_job('worker-1')
+        MatchingJob.objects.filter(id=job.id).update(heartbeatAt=timezone.now() - timedelta(minutes=10))
+
+        self.assertEqual(recover_stale_jobs(timedelta(minutes=5), max_attempts=2), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+        claim_next_job('worker-1')
+        MatchingJob.objects.filter(id=job.id).update(heartbeatAt=timezone.now() - timedelta(minutes=10))
+        recover_stale_jobs(timedelta(minutes=5), max_attempts=2)
+        job.refresh_from_db()
+        self.student.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.student.matchingStatus, 'failed')
+
+    def test_jobs_recovered_elsewhere_are_not_counted(self):
+        job = enqueue_matching_job(self.student.id)
+        claim_next_job('worker-1')
+        MatchingJob.objects.filter(id=job.id).update(heartbeatAt=timezone.now() - timedelta(minutes=10))
+        atomic = transaction.atomic
+
+        @contextmanager
+        def recovered_concurrently(*args, **kwargs):
+            # Another worker requeues the job between the scan and the update
+            MatchingJob.objects.filter(id=job.id).update(status='queued', workerId=None)
+            with atomic(*args, **kwargs):
+                yield
+
+        with mock.patch('api.job_queue.transaction.atomic', recovered_concurrently):
+            self.assertEqual(recover_stale_jobs(timedelta(minutes=5), max_attempts=2), 0)
+
+    def test_worker_survives_database_errors(self):
+        worker = MatchingWorker(worker_id='test')
+        stop = threading.Event()
+        outcomes = [OperationalError('server closed the connection unexpectedly'), None]
+
+        def process_next():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            stop.set()
+            return outcome
+
+        # The test transaction's connection must stay open; the worker would drop a broken one
+        with mock.patch.object(worker, 'process_next', side_effect=process_next), \
+                mock.patch('api.job_queue.close_old_connections') as close_old_connections, \
+                mock.patch('api.job_queue.connections'), self.assertLogs('api.job_queue', level='ERROR'):
+            worker.run(stop, poll_interval=0)
+        self.assertEqual(outcomes, [])
+        close_old_connections.assert_called_once()
+
+
+class MatchUpsertTests(TestCase):
+    def setUp(self):
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Robotics'], hoursPerWeek=5,
+        )
+        self.professors = [
+            ProfessorProfile.objects.create(
+                name=f'Professor {i}', title='Professor', department='CS', institution='U',
+                researchAreas=['Robotics', 'Control'], methods=['Simulation'], preferredDegreeLevels=['PhD'],
+            )
+            for i in range(4)
+        ]
+
+    def generate(self):
+        return APIClient().post('/api/matches/generate/', {'student_id': str(self.student.id), 'use_ai': False}, format='json')
+
+    def test_generate_creates_then_updates_in_place(self):
+        response = self.generate()
+        self.assertEqual(response.status_code, 200)
+        ids = {match.professor_id: match.id for match in Match.objects.filter(student=self.student)}
+        self.assertEqual(len(ids), 4)
+        self.assertEqual({item['id'] for item in response.data}, {str(i) for i in ids.values()})
+
+        self.student.primaryInterests = ['Robotics', 'Control']
+        self.student.save()
+        response = self.generate()
+
+        matches = Match.objects.filter(student=self.student)
+        self.assertEqual({match.professor_id: match.id for match in matches}, ids)
+        self.assertTrue(all(match.score == 65 for match in matches))
+        self.assertEqual({item['id'] for item in response.data}, {str(i) for i in ids.values()})
+
+    def test_match_ids_are_required_on_create_only(self):
+        client = APIClient()
+        response = client.post('/api/matches/', {'score': 42}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'student_id', 'professor_id'})
+
+        match = Match.objects.create(student=self.student, professor=self.professors[0], score=10)
+        response = client.put(f'/api/matches/{match.id}/', {'score': 42}, format='json')
+        self.assertEqual(response.status_code, 200)
+        match.refresh_from_db()
+        self.assertEqual((match.score, match.student_id, match.professor_id), (42, self.student.id, self.professors[0].id))
+
+    def test_generate_with_ai_uses_the_model_scores(self):
+        model = FakeModel({'overall_score': 88, 'highlights': ['Robotics']})
+        with mock.patch('api.views.GeminiMatchingService', lambda: fake_gemini_service(model)):
+            response = APIClient().post(
+                '/api/matches/generate/', {'student_id': str(self.student.id), 'use_ai': True}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([match.aiScore for match in Match.objects.filter(student=self.student)], [88] * 4)
+        self.assertTrue(any('Calculate a match score' in prompt for prompt in model.prompts))
+
+
+class MatchListQueryTests(TestCase):
+    def setUp(self):
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Robotics'],
+        )
+
+    def add_matches(self, count):
+        start = ProfessorProfile.objects.count()
+        for i in range(start, start + count):
+            professor = ProfessorProfile.objects.create(
+                name=f'Professor {i}', title='Professor', department='CS', institution='U', researchAreas=['Robotics'],
+            )
+            Match.objects.create(student=self.student, professor=professor, score=i)
+
+    def list_matches(self):
+        response = APIClient().get('/api/matches/', {'student_id': str(self.student.id)})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_query_count_is_constant(self):
+        self.add_matches(2)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(len(self.list_matches().data['results']), 2)
+        self.add_matches(18)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(len(self.list_matches().data['results']), 20)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), 1)  # one joined select; keyset pages run no COUNT
+
+    def test_list_returns_summaries_and_detail_full_profiles(self):
+        self.add_matches(1)
+        item = self.list_matches().data['results'][0]
+        self.assertEqual(item['professor']['name'], 'Professor 0')
+        self.assertNotIn('aiAnalysis', item)
+        self.assertNotIn('methods', item['student'])
+
+        detail = APIClient().get(f"/api/matches/{item['id']}/").data
+        self.assertIn('aiAnalysis', detail)
+        self.assertIn('methods', detail['student'])
+
+
+class MatchingProgressReporterTests(TestCase):
+    def setUp(self):
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', interestStatement='x' * 5000,
+        )
+
+    def test_progress_writes_are_coalesced_to_status_columns(self):
+        now = [0.0]
+        reporter = MatchingProgressReporter(self.student, backend='db', min_interval=60, min_step=10, clock=lambda: now[0])
+        with CaptureQueriesContext(connection) as queries:
+            reporter.start()
+            for progress in range(1, 101):
+                reporter.update(progress)
+            now[0] += 61
+            reporter.update(100)
+            reporter.finish('completed')
+
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 13)  # start + 10 steps + 1 interval + finish
+        self.assertTrue(all('interestStatement' not in sql for sql in updates))
+
+        self.student.refresh_from_db()
+        self.assertEqual((self.student.matchingStatus, self.student.matchingProgress), ('completed', 100))
+
+    def test_cache_backend_skips_row_for_intermediate_progress(self):
+        reporter = MatchingProgressReporter(self.student, backend='cache', min_interval=0, min_step=1)
+        reporter.start()
+        with self.settings(MATCHING_PROGRESS_BACKEND='cache'), CaptureQueriesContext(connection) as queries:
+            reporter.update(40)
+            status = MatchingService().get_matching_status(self.student.id)
+        self.assertEqual((status['status'], status['progress']), ('in_progress', 40))
+        # Only the notification for the event streams reaches the database
+        self.assertEqual([query['sql'] for query in queries], ["SELECT pg_notify('matching_progress', '%s')" % self.student.id])
+
+
+class MatchingEventsTests(TestCase):
+    async def test_stream_ends_with_final_status(self):
+        student = await StudentProfile.objects.acreate(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', matchingStatus='completed', matchingProgress=100,
+        )
+        response = await self.async_client.get(f'/api/students/{student.id}/matching_events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0].startswith(b'event: completed\n'))
+        self.assertEqual(json.loads(events[0].split(b'data: ')[1])['progress'], 100)
+
+    async def test_unknown_student(self):
+        response = await self.async_client.get(f'/api/students/{uuid.uuid4()}/matching_events/')
+        self.assertEqual(response.status_code, 404)
+
+
+class MatchingEventsNotificationTests(TransactionTestCase):
+    async def test_progress_writes_wake_the_stream(self):
+        student = await StudentProfile.objects.acreate(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', matchingStatus='queued',
+        )
+        reporter = MatchingProgressReporter(student, backend='db', min_step=0)
+        # Only the notifications can deliver the updates in time
+        with override_settings(MATCHING_EVENTS_POLL_INTERVAL=60):
+            events = matching_status_events(student.id)
+            try:
+                self.assertTrue((await anext(events)).startswith('event: progress\n'))
+                await sync_to_async(reporter.start)()
+                started = await asyncio.wait_for(anext(events), 5)
+                self.assertEqual(json.loads(started.split('data: ')[1])['status'], 'in_progress')
+                await sync_to_async(reporter.finish)('completed')
+                self.assertTrue((await asyncio.wait_for(anext(events), 5)).startswith('event: completed\n'))
+            finally:
+                await events.aclose()
+
+
+class QueryPlanTests(TestCase):
+    """
+    Hot-path filters must be answerable from an index. Sequential scans are disabled so the
+    planner picks an index whenever a usable one exists, regardless of table size.
+    """
+
+    def setUp(self):
+        rng = random.Random(10)
+        self.student = make_student(rng, email='plan@example.com', university='U', department='CS')
+        self.student.save()
+        self.professor = make_professor(rng)
+        self.professor.save()
+        Match.objects.create(student=self.student, professor=self.professor, score=80)
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+
+    def test_match_queries(self):
+        self.assertUsesIndex(Match.objects.filter(student=self.student).order_by('-score'))
+        self.assertUsesIndex(Match.objects.filter(professor=self.professor).order_by('-score'))
+        self.assertUsesIndex(Match.objects.filter(score__gte=50))
+
+    def test_array_overlap(self):
+        self.assertUsesIndex(ProfessorProfile.objects.filter(researchAreas__overlap=['Machine Learning']))
+        self.assertUsesIndex(ProfessorProfile.objects.filter(methods__overlap=['Deep Learning']))
+        self.assertUsesIndex(StudentProfile.objects.filter(primaryInterests__overlap=['Machine Learning']))
+
+    def test_accepting_professors(self):
+        self.assertUsesIndex(ProfessorProfile.objects.filter(acceptingStudents=True))
+
+    def test_full_text_search(self):
+        query = SearchQuery('learning', search_type='websearch', config='english')
+        self.assertUsesIndex(ProfessorProfile.objects.filter(searchVector=query))
+        self.assertUsesIndex(StudentProfile.objects.filter(searchVector=query))
+
+    def test_icontains_search(self):
+        for field in ('name', 'department', 'institution'):
+            self.assertUsesIndex(ProfessorProfile.objects.filter(**{f'{field}__icontains': 'learn'}))
+        for field in ('firstName', 'lastName', 'university', 'department'):
+            self.assertUsesIndex(StudentProfile.objects.filter(**{f'{field}__icontains': 'learn'}))
+
+
+class GlobalSearchTests(TestCase):
+    def setUp(self):
+        def professor(name, areas, description=''):
+            return ProfessorProfile.objects.create(
+                name=name, title='Professor', department='Computer Science', institution='State University',
+                researchAreas=areas, researchDescription=description,
+            )
+        self.learning = professor('Grace Hopper', ['Machine Learning', 'Deep Learning'], 'Learning systems.')
+        self.robotics = professor('Alan Turing', ['Robotics'], 'Robots that keep learning on the job.')
+        self.ecology = professor('Rachel Carson', ['Ecology'])
+        StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='State University',
+            department='Mathematics', degreeLevel='PhD', primaryInterests=['Machine Learning'],
+        )
+
+    def search(self, query, entity_type='all'):
+        response = APIClient().get('/api/search/global_search/', {'query': query, 'type': entity_type})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_are_ranked(self):
+        results = self.search('learning', 'professors')
+        self.assertEqual([item['id'] for item in results['professors']], [str(self.learning.id), str(self.robotics.id)])
+
+    def test_websearch_syntax(self):
+        results = self.search('learning -robots')
+        self.assertEqual([item['id'] for item in results['professors']], [str(self.learning.id)])
+        self.assertEqual(len(results['students']), 1)
+        self.assertEqual(self.search('"rachel carson"')['professors'][0]['id'], str(self.ecology.id))
+
+    def test_vector_follows_updates(self):
+        self.ecology.researchAreas = ['Marine Biology']
+        self.ecology.save()
+        self.assertEqual(self.search('marine', 'professors')['professors'][0]['id'], str(self.ecology.id))
+        self.assertEqual(self.search('ecology', 'professors')['professors'], [])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD',
+        )
+        for i in range(7):
+            professor = ProfessorProfile.objects.create(
+                name=f'Professor {i}', title='Professor', department='CS', institution='U',
+                researchAreas=['Machine Learning'], researchDescription='learning ' * (i % 3 + 1),
+            )
+            Match.objects.create(student=self.student, professor=professor, score=50 + i % 3)  # tied scores
+
+    def walk(self, path, params, key='results', next_key=lambda data: data['next']):
+        client, seen, url = APIClient(), [], path
+        while url:
+            response = client.get(url, params if url == path else None)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.data[key])
+            url = next_key(response.data)
+        return seen
+
+    def test_match_pages_cover_every_row_once_in_order(self):
+        params = {'student_id': str(self.student.id), 'page_size': 2}
+        rows = self.walk('/api/matches/', params)
+        expected = Match.objects.order_by('-score', 'id').values_list('id', flat=True)
+        self.assertEqual([item['id'] for item in rows], [str(i) for i in expected])
+
+    def test_search_pages_follow_rank(self):
+        rows = self.walk('/api/search/global_search/', {'query': 'learning', 'type': 'professors', 'page_size': 3},
+                         key='professors', next_key=lambda data: data['next']['professors'])
+        self.assertEqual(len({item['id'] for item in rows}), 7)
+        self.assertIn(rows[0]['name'], {'Professor 2', 'Professor 5'})  # longest descriptions rank first
+
+    def test_profile_search_endpoints_paginate(self):
+        rows = self.walk('/api/professors/search/', {'tags': 'Machine Learning', 'page_size': 4})
+        self.assertEqual([item['name'] for item in rows], [f'Professor {i}' for i in range(7)])
+        response = APIClient().get('/api/students/search/', {'q': 'Ada', 'count': 'approximate'})
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertIn('total', response.data)
+
+    def test_approximate_count_only_on_request(self):
+        response = APIClient().get('/api/matches/', {'student_id': str(self.student.id)})
+        self.assertNotIn('count', response.data)
+        response = APIClient().get('/api/matches/', {'student_id': str(self.student.id), 'count': 'approximate'})
+        self.assertIsInstance(response.data['count'], int)
+
+    def test_invalid_cursor(self):
+        response = APIClient().get('/api/matches/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_values_of_the_wrong_type(self):
+        for values in (['high', str(uuid.uuid4())], [50, 'not-a-uuid'], [None, str(uuid.uuid4())], [[1], {}]):
+            with self.subTest(values=values):
+                response = APIClient().get('/api/matches/', {'cursor': encode_cursor(values)})
+                self.assertEqual(response.status_code, 404)
+        response = APIClient().get('/api/search/global_search/', {
+            'query': 'learning', 'type': 'professors', 'professors_cursor': encode_cursor(['high', str(uuid.uuid4())]),
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class ProfessorResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.professor = ProfessorProfile.objects.create(
+            name='Grace Hopper', title='Professor', department='CS', institution='U', researchAreas=['Compilers'],
+        )
+
+    def get(self, path, params=None):
+        response = APIClient().get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_repeat_requests_are_served_from_cache(self):
+        for path, params in [('/api/professors/', None), (f'/api/professors/{self.professor.id}/', None),
+                             ('/api/professors/search/', {'tags': 'Compilers', 'department': 'CS'})]:
+            first = self.get(path, params)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get(path, params), first)
+
+    def test_parameter_order_is_normalized(self):
+        self.get('/api/professors/search/?department=CS&tags=Compilers')
+        with self.assertNumQueries(0):
+            self.get('/api/professors/search/?tags=Compilers&department=CS')
+
+    def test_save_and_delete_invalidate(self):
+        path = f'/api/professors/{self.professor.id}/'
+        self.get(path)
+        self.get('/api/professors/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professor.name = 'Grace B. Hopper'
+            self.professor.save()
+        self.assertEqual(self.get(path)['name'], 'Grace B. Hopper')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professor.delete()
+        self.assertEqual(self.get('/api/professors/')['results'], [])
+
+    def test_warm_command_populates_cache(self):
+        call_command('warm_professor_cache', host='testserver', stdout=StringIO())
+        with self.assertNumQueries(0):
+            self.get('/api/professors/')
+            self.get(f'/api/professors/{self.professor.id}/')
+            self.get('/api/professors/search/', {'accepting_students': 'true'})
+
+
+class SemanticSimilarityTests(TestCase):
+    def setUp(self):
+        def professor(name, description, publications=()):
+            return ProfessorProfile.objects.create(
+                name=name, title='Professor', department='Science', institution='U', researchDescription=description,
+                publications=[{'title': title} for title in publications],
+            )
+        self.vision = professor('Vision', 'Computer vision and deep neural networks for image recognition.',
+                                ['Convolutional networks for image segmentation'])
+        self.ecology = professor('Ecology', 'Field ecology of wetland bird populations and habitat loss.')
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', interestStatement='I want to work on image recognition with neural networks.',
+            coursework=['Computer Vision'],
+        )
+
+    def test_vectors_are_stored_normalized_float32(self):
+        vector = HashingVectorizer().from_bytes(ProfessorProfile.objects.get(id=self.vision.id).textVector)
+        self.assertEqual(vector.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+
+    def test_similar_descriptions_rank_higher(self):
+        engine = SemanticSimilarityEngine(ProfessorProfile.objects.order_by('name'))
+        similarities = engine.similarities(self.student)
+        by_name = dict(zip([p.name for p in engine.professors], similarities))
+        self.assertGreater(by_name['Vision'], 0.2)
+        self.assertGreater(by_name['Vision'], by_name['Ecology'] + 0.2)
+
+    def test_vector_refreshes_on_text_changes_only(self):
+        before = bytes(self.ecology.textVector)
+        self.ecology.researchDescription = 'Image recognition for camera traps.'
+        self.ecology.save(update_fields=['researchDescription'])
+        self.assertNotEqual(bytes(ProfessorProfile.objects.get(id=self.ecology.id).textVector), before)
+
+        with self.assertNumQueries(1):
+            self.student.matchingProgress = 50
+            self.student.save(update_fields=['matchingProgress'])
+
+    def test_refresh_command_backfills(self):
+        ProfessorProfile.objects.update(textVector=None)
+        call_command('refresh_text_vectors', stdout=StringIO())
+        self.assertFalse(ProfessorProfile.objects.filter(textVector__isnull=True).exists())
+
+    def test_generate_stores_similarity(self):
+        cache.clear()
+        APIClient().post('/api/matches/generate/', {'student_id': str(self.student.id), 'use_ai': False}, format='json')
+        match = Match.objects.get(student=self.student, professor=self.vision)
+        self.assertGreater(match.detailedScores['textSimilarity'], 20)
+
+
+def clustered_vectors(rng, n, dim, n_clusters=40, noise=0.35):
+    centers = rng.standard_normal((n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + noise * rng.standard_normal((n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+class ProfessorVectorIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rng = np.random.default_rng(16)
+        self.dim = 64
+        self.ids = [uuid.UUID(int=i + 1) for i in range(3000)]
+        self.vectors = clustered_vectors(self.rng, len(self.ids), self.dim)
+        self.index = ProfessorVectorIndex(self.directory.name, dim=self.dim, nprobe=8)
+        self.index.build(self.ids, self.vectors)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_recall_at_10_against_brute_force(self):
+        queries = clustered_vectors(self.rng, 100, self.dim)
+        hits = 0
+        for query in queries:
+            exact = {self.ids[i] for i in np.argsort(-(self.vectors @ query))[:10]}
+            hits += len(exact & {professor_id for professor_id, _ in self.index.search(query, 10)})
+        self.assertGreaterEqual(hits / (10 * len(queries)), 0.9)
+
+    def test_probes_a_fraction_of_the_catalog(self):
+        probed = sum(len(self.index._members[int(c)]) for c in np.argsort(-(self.index._centroids @ self.vectors[0]))[:8])
+        self.assertLess(probed, len(self.ids) / 2)
+
+    def test_incremental_insert_delete_persist(self):
+        new_id, vector = uuid.uuid4(), self.vectors[5]
+        self.index.add(new_id, vector)
+        self.index.discard(self.ids[5])
+        reopened = ProfessorVectorIndex(self.directory.name, dim=self.dim, nprobe=8)
+        reopened._load(reopened._read_meta())
+        found = [professor_id for professor_id, _ in reopened.search(vector, 3)]
+        self.assertEqual(found[0], new_id)
+        self.assertNotIn(self.ids[5], found)
+        self.assertEqual(len(reopened), len(self.ids))
+
+    def test_other_processes_mutations_are_replayed_without_a_reload(self):
+        reader = ProfessorVectorIndex(self.directory.name, dim=self.dim, nprobe=8)
+        reader._load(reader._read_meta())
+        new_id, vector = uuid.uuid4(), self.vectors[5]
+        self.index.add(new_id, vector)
+        self.index.discard(self.ids[5])
+        self.index.add(self.ids[6], self.vectors[7])
+
+        with mock.patch.object(reader, '_load') as load:
+            reader._refresh(reader._read_meta())
+        load.assert_not_called()
+        self.assertEqual(reader._rows, self.index._rows)
+        self.assertEqual(reader._members, self.index._members)
+        self.assertEqual(reader.search(vector, 1)[0][0], new_id)
+
+        self.index.build(self.ids[:100], self.vectors[:100])
+        with mock.patch.object(reader, '_load') as load:
+            reader._refresh(reader._read_meta())
+        load.assert_called_once()
+
+
+class ProfessorVectorIndexSignalTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.override = override_settings(ANN_INDEX_DIR=self.directory.name)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.directory.cleanup()
+
+    def test_saves_update_the_index(self):
+        student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', interestStatement='Protein folding with molecular dynamics simulation.',
+        )
+        for i in range(5):
+            ProfessorProfile.objects.create(name=f'Filler {i}', title='Professor', department='X', institution='U',
+                                            researchDescription=f'Medieval poetry topic {i}.')
+        self.assertLess(professor_vector_index.top_k(student, 1)[0][1], 0.2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            professor = ProfessorProfile.objects.create(
+                name='Folding', title='Professor', department='Biology', institution='U',
+                researchDescription='Molecular dynamics simulation of protein folding.',
+            )
+        self.assertEqual(professor_vector_index.top_k(student, 1)[0][0], professor.id)
+
+        professor.acceptingStudents = False
+        with self.captureOnCommitCallbacks(execute=True):
+            professor.save()
+        self.assertNotIn(professor.id, [i for i, _ in professor_vector_index.top_k(student, 10)])
+
+    @override_settings(ANN_FINGERPRINT_INTERVAL=60)
+    def test_fingerprint_is_checked_at_most_once_per_interval(self):
+        student = StudentProfile.objects.create(firstName='Ada', lastName='Lovelace', email='ada@example.com',
+                                                university='U', department='CS', degreeLevel='PhD')
+        index = ProfessorVectorIndex(self.directory.name)
+        index.top_k(student, 1)
+        with self.assertNumQueries(0):
+            index.top_k(student, 1)
+
+    @override_settings(ANN_FINGERPRINT_INTERVAL=60)
+    def test_local_edit_does_not_adopt_unseen_changes(self):
+        student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', interestStatement='Protein folding with molecular dynamics simulation.',
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            professor = ProfessorProfile.objects.create(name='Filler', title='Professor', department='X', institution='U',
+                                                        researchDescription='Medieval poetry.')
+        professor_vector_index.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            professor.name = 'Renamed'
+            professor.save()
+        self.assertFalse(professor_vector_index._read_meta()['stale'])
+
+        # Another host adds a professor without this process's signals, then a local edit follows
+        unseen, = ProfessorProfile.objects.bulk_create([ProfessorProfile(
+            name='Folding', title='Professor', department='Biology', institution='U',
+            researchDescription='Molecular dynamics simulation of protein folding.',
+        )])
+        with self.captureOnCommitCallbacks(execute=True):
+            professor.name = 'Renamed again'
+            professor.save()
+        self.assertTrue(professor_vector_index._read_meta()['stale'])
+        self.assertEqual(professor_vector_index.top_k(student, 1)[0][0], unseen.id)
+
+    def test_index_failure_does_not_fail_the_save(self):
+        professor = ProfessorProfile.objects.create(name='Grace Hopper', title='Professor', department='CS',
+                                                    institution='U', researchAreas=['Robotics'])
+        professor_vector_index.rebuild()
+        with mock.patch.object(professor_vector_index, '_file_lock', side_effect=OSError('No space left on device')):
+            with self.assertLogs('api.signals', level='ERROR'), self.captureOnCommitCallbacks(execute=True):
+                response = APIClient().patch(f'/api/professors/{professor.id}/', {'name': 'Grace B. Hopper'},
+                                             format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfessorRematchTests(TestCase):
+    def setUp(self):
+        self.professor = ProfessorProfile.objects.create(
+            name='Grace Hopper', title='Professor', department='CS', institution='U',
+            researchAreas=['Robotics'], methods=['Python'], preferredDegreeLevels=['PhD'],
+        )
+        self.sharing = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Genomics'], methods=['Python'], hoursPerWeek=20,
+            matchingStatus='completed',
+        )
+        self.unrelated = StudentProfile.objects.create(
+            firstName='Alan', lastName='Turing', email='alan@example.com', university='U', department='CS',
+            degreeLevel='MS', primaryInterests=['Ecology'], methods=['Fieldwork'],
+        )
+        self.matched = StudentProfile.objects.create(
+            firstName='Edsger', lastName='Dijkstra', email='edsger@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Robotics'], methods=[],
+        )
+        Match.objects.create(student=self.matched, professor=self.professor, score=45, aiScore=88,
+                             aiExplanation='Kept explanation', detailedScores={'research': 90})
+
+    def save_professor(self, **changes):
+        professor = ProfessorProfile.objects.get(id=self.professor.id)
+        for name, value in changes.items():
+            setattr(professor, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            professor.save()
+        return professor
+
+    def test_matching_field_change_rematches_the_column(self):
+        professor = self.save_professor(researchAreas=['Genomics'])
+        job = MatchingJob.objects.get(professor=professor)
+        self.assertEqual(MatchingWorker(worker_id='test').process_next(), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+        service = MatchingService()
+        matches = {match.student_id: match for match in Match.objects.filter(professor=professor)}
+        self.assertEqual(set(matches), {self.sharing.id, self.matched.id})
+        for student in (self.sharing, self.matched):
+            self.assertEqual(matches[student.id].score, service._calculate_basic_score(student, professor))
+            self.assertIn('textSimilarity', matches[student.id].detailedScores)
+        self.assertEqual(matches[self.sharing.id].highlights[0], 'Shared research interests: Genomics')
+
+        # AI fields of the existing match survive the re-match
+        kept = matches[self.matched.id]
+        self.assertEqual((kept.aiScore, kept.aiExplanation, kept.detailedScores['research']), (88, 'Kept explanation', 90))
+
+    def test_students_yet_to_run_matching_are_not_added(self):
+        StudentProfile.objects.filter(id=self.sharing.id).update(matchingStatus='pending')
+        professor = self.save_professor(researchAreas=['Genomics'])
+        MatchingWorker(worker_id='test').process_next()
+        self.assertEqual(set(Match.objects.filter(professor=professor).values_list('student_id', flat=True)),
+                         {self.matched.id})
+
+    def test_other_edits_do_not_enqueue(self):
+        self.save_professor(name='Rear Admiral Hopper', researchAreas=['Robotics'])
+        self.assertFalse(MatchingJob.objects.exists())
+
+    def test_matches_removed_when_not_accepting(self):
+        professor = self.save_professor(acceptingStudents=False)
+        self.assertEqual(enqueue_professor_rematch(professor.id).professor_id, professor.id)
+        MatchingWorker(worker_id='test').process_next()
+        self.assertFalse(Match.objects.filter(professor=professor).exists())
+
+    def test_professor_and_student_jobs_share_the_queue(self):
+        professor_job = enqueue_professor_rematch(self.professor.id)
+        student_job = enqueue_matching_job(self.sharing.id)
+        self.assertEqual(enqueue_professor_rematch(self.professor.id), professor_job)
+        self.assertEqual(claim_next_job('worker-1'), professor_job)
+
+        enqueue_professor_rematch(self.professor.id)
+        self.assertEqual(claim_next_job('worker-2'), student_job)
+        self.assertIsNone(claim_next_job('worker-3'))
+
+
+class AllPairsMatcherTests(TestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        self.professors = [make_professor(rng, name=f'Professor {i}') for i in range(30)]
+        self.students = [make_student(rng, firstName=f'Student {i}') for i in range(25)]
+        for profile in self.professors + self.students:
+            profile.save()
+
+    def matches(self):
+        return {(m.student_id, m.professor_id): m.score for m in Match.objects.all()}
+
+    def test_keeps_top_k_per_student(self):
+        stats = AllPairsMatcher(top_k=3, block_size=4).run()
+        self.assertEqual(stats['students'], 25)
+
+        service = MatchingService()
+        matches = self.matches()
+        for student in self.students:
+            kept = {professor_id: score for (student_id, professor_id), score in matches.items() if student_id == student.id}
+            self.assertLessEqual(len(kept), 3)
+            best = sorted((service._calculate_basic_score(student, p) for p in self.professors), reverse=True)[:3]
+            if all(best):
+                self.assertEqual(sorted(kept.values(), reverse=True), best)
+
+    def test_process_pool_and_shards_agree_with_inline_run(self):
+        AllPairsMatcher(top_k=4, block_size=4).run()
+        inline = self.matches()
+        Match.objects.all().delete()
+
+        for index in range(3):
+            AllPairsMatcher(top_k=4, block_size=4, workers=2, shard=(index, 3)).run()
+        self.assertEqual(self.matches(), inline)
+
+    def test_prune_removes_matches_outside_top_k(self):
+        student = self.students[0]
+        outsider = ProfessorProfile.objects.create(name='Outsider', acceptingStudents=False)
+        Match.objects.create(student=student, professor=outsider, score=99, aiScore=99)
+
+        AllPairsMatcher(top_k=2).run()
+        self.assertTrue(Match.objects.filter(professor=outsider).exists())
+        stats = AllPairsMatcher(top_k=2, prune=True).run()
+        self.assertGreaterEqual(stats['pruned'], 1)
+        self.assertFalse(Match.objects.filter(professor=outsider).exists())
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('1/4'), (1, 4))
+        for value in ('4/4', '1', 'a/b', '0/0'):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+
+class DeferredAcceptanceTests(SimpleTestCase):
+    def test_assignment_is_stable_and_within_capacity(self):
+        rng = np.random.default_rng(3)
+        n_students, n_professors, degree = 400, 40, 6
+        students = np.repeat(np.arange(n_students), degree)
+        professors = np.concatenate([rng.choice(n_professors, degree, replace=False) for _ in range(n_students)])
+        scores = rng.integers(0, 20, len(students)).astype(np.float64) * 5
+        capacities = rng.integers(0, 6, n_professors)
+
+        chosen = deferred_acceptance(students, professors, scores, capacities)
+        self.assertEqual(len(set(students[chosen])), len(chosen))
+        self.assertTrue((np.bincount(professors[chosen], minlength=n_professors) <= capacities).all())
+
+        # Strict preferences on both sides (ties broken by index), as in deferred_acceptance
+        def student_key(edge):
+            return (scores[edge], -professors[edge])
+
+        def professor_key(edge):
+            return (scores[edge], -students[edge])
+
+        assigned = {int(students[edge]): edge for edge in chosen}
+        held = {}
+        for edge in chosen:
+            held.setdefault(int(professors[edge]), []).append(edge)
+        for edge in range(len(students)):
+            student, professor = int(students[edge]), int(professors[edge])
+            if capacities[professor] == 0 or assigned.get(student) == edge:
+                continue
+            if student in assigned and student_key(assigned[student]) > student_key(edge):
+                continue
+            holding = held.get(professor, [])
+            # The student prefers this professor: the professor must be full with better students
+            self.assertEqual(len(holding), capacities[professor])
+            self.assertTrue(all(professor_key(other) > professor_key(edge) for other in holding))
+
+    def test_empty_graph(self):
+        empty = np.zeros(0, dtype=np.int64)
+        self.assertEqual(len(deferred_acceptance(empty, empty, empty.astype(float), np.array([2]))), 0)
+
+
+class AssignmentEndpointTests(TestCase):
+    def test_assign_respects_capacity_and_prefers_higher_scores(self):
+        popular = ProfessorProfile.objects.create(name='Popular', capacity=1)
+        niche = ProfessorProfile.objects.create(name='Niche', capacity=2)
+        closed = ProfessorProfile.objects.create(name='Closed', acceptingStudents=False)
+        students = [StudentProfile.objects.create(firstName=f'S{i}', lastName='Student') for i in range(3)]
+        for i, student in enumerate(students):
+            Match.objects.create(student=student, professor=popular, score=90 - i, aiScore=None)
+            Match.objects.create(student=student, professor=niche, score=50, aiScore=60 + i)
+            Match.objects.create(student=student, professor=closed, score=100, aiScore=100, assigned=True)
+
+        response = APIClient().post('/api/matches/assign/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assigned'], 3)
+
+        assigned = {(m.student_id, m.professor_id) for m in Match.objects.filter(assigned=True)}
+        self.assertEqual(assigned, {(students[0].id, popular.id), (students[1].id, niche.id), (students[2].id, niche.id)})
+
+        listed = APIClient().get('/api/matches/', {'assigned': 'true', 'professor_id': str(niche.id)}).data['results']
+        self.assertEqual(len(listed), 2)
+        self.assertTrue(all(item['assigned'] for item in listed))
+
+    def test_large_catalogs_are_left_to_the_command(self):
+        professor = ProfessorProfile.objects.create(name='Prof', capacity=1)
+        for i in range(3):
+            student = StudentProfile.objects.create(firstName=f'S{i}', lastName='Student')
+            Match.objects.create(student=student, professor=professor, score=50)
+
+        with override_settings(ASSIGNMENT_MAX_REQUEST_MATCHES=2):
+            response = APIClient().post('/api/matches/assign/')
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Match.objects.filter(assigned=True).exists())
+
+    def test_professors_opened_during_the_run_are_skipped(self):
+        student = StudentProfile.objects.create(firstName='S', lastName='Student')
+        professor = ProfessorProfile.objects.create(name='Prof', capacity=1)
+        late = ProfessorProfile.objects.create(name='Late', acceptingStudents=False)
+        Match.objects.create(student=student, professor=professor, score=50)
+        Match.objects.create(student=student, professor=late, score=90)
+        edges = assignment_edges
+
+        def opened_after_capacities_were_read():
+            ProfessorProfile.objects.filter(id=late.id).update(acceptingStudents=True)
+            return edges()
+
+        with mock.patch('api.assignment.assignment_edges', opened_after_capacities_were_read):
+            self.assertEqual(assign_students()['assigned'], 1)
+        self.assertEqual(Match.objects.get(assigned=True).professor_id, professor.id)
+
+
+class MatchingBenchmarkTests(SimpleTestCase):
+    def test_synthetic_catalog_is_deterministic_and_skewed(self):
+        first = SyntheticCatalog(vocabulary_size=50, skew=1.5, seed=4).professors(200)
+        second = SyntheticCatalog(vocabulary_size=50, skew=1.5, seed=4).professors(200)
+        self.assertEqual([p.researchAreas for p in first], [p.researchAreas for p in second])
+
+        popular = sum('Tag 0' in p.researchAreas for p in first)
+        rare = sum('Tag 49' in p.researchAreas for p in first)
+        self.assertGreater(popular, 5 * max(rare, 1))
+
+    def test_command_reports_json(self):
+        out = StringIO()
+        call_command('benchmark_matching', '--scale', '5x20', '--repeat', '1', '--no-db', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual({r['benchmark'] for r in report['results']},
+                         {'basic_score_per_pair', 'basic_score_batched', 'highlights'})
+        self.assertTrue(all(r['operations'] == 100 and r['seconds'] >= 0 for r in report['results']))
+
+
+class FakeGeminiBackendTests(TestCase):
+    def setUp(self):
+        profile_analysis_cache.clear()
+
+    @override_settings(GEMINI_BACKEND='fake', GEMINI_FAKE_LATENCY_MS=0)
+    def test_backend_is_selected_by_setting(self):
+        self.assertIsInstance(get_generative_model(), FakeGeminiModel)
+        self.assertIsInstance(GeminiMatchingService().model, FakeGeminiModel)
+
+    def test_batch_prompt_gets_schema_correct_entries(self):
+        service = GeminiMatchingService()
+        service.model = FakeGeminiModel()
+        professors = [{'id': uuid.uuid4(), 'name': f'Professor {i}', 'researchAreas': ['Robotics']} for i in range(3)]
+        results = service.analyze_matches_batch({'firstName': 'Ada'}, professors)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(0 <= result['score'] <= 100 and result['explanation'] for result in results))
+        self.assertGreater(service.model.stats()['output_tokens'], 0)
+
+    def test_faults_are_reproducible_and_retryable(self):
+        def run():
+            delays = []
+            model = FakeGeminiModel(latency_ms=100, distribution='lognormal', rate_limit_rate=0.3,
+                                    server_error_rate=0.1, malformed_rate=0.2, seed=7, sleep=delays.append)
+            executor = GeminiRequestExecutor(max_in_flight=1, requests_per_minute=60000, max_retries=10, sleep=lambda s: None)
+            texts = [executor.generate(model, f'Calculate a match score {i}').text for i in range(50)]
+            return texts, model.stats(), delays
+
+        texts, stats, delays = run()
+        self.assertEqual(run(), (texts, stats, delays))
+        self.assertGreater(stats['rate_limited'], 0)
+        self.assertGreater(stats['server_errors'], 0)
+        self.assertGreater(stats['malformed'], 0)
+        self.assertEqual(stats['calls'], 50 + stats['rate_limited'] + stats['server_errors'])
+        self.assertAlmostEqual(sum(delays) / len(delays), 0.1, delta=0.03)
+
+        with self.assertRaises(FakeModelError) as raised:
+            FakeGeminiModel(rate_limit_rate=1.0).generate_content('prompt')
+        self.assertEqual(raised.exception.code, 429)
+
+    def test_token_usage_is_configurable(self):
+        def usage(response):
+            return response.usage_metadata.prompt_token_count, response.usage_metadata.candidates_token_count
+
+        prompt = 'x' * 100
+        text = FakeGeminiModel().respond(prompt)
+        self.assertEqual(usage(FakeGeminiModel().generate_content(prompt)), (25, len(text) // 4))
+        self.assertEqual(usage(FakeGeminiModel(chars_per_token=2.5).generate_content(prompt)), (40, int(len(text) / 2.5)))
+        with override_settings(GEMINI_FAKE_LATENCY_MS=0, GEMINI_FAKE_PROMPT_TOKENS=1000, GEMINI_FAKE_OUTPUT_TOKENS=300):
+            self.assertEqual(usage(FakeGeminiModel.from_settings().generate_content(prompt)), (1000, 300))
+        with self.assertRaises(ValueError):
+            FakeGeminiModel(chars_per_token=0)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_and_counter_exposition(self):
+        histogram = Histogram('stage_seconds', 'Stage time', ['stage'], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage='db_load')
+        counter = Counter('errors_total', 'Errors', ['error'])
+        counter.inc(error='Bad "quote"')
+        counter.inc(2, error='Bad "quote"')
+
+        lines = histogram.render() + counter.render()
+        self.assertIn('# TYPE stage_seconds histogram', lines)
+        self.assertIn('stage_seconds_bucket{stage="db_load",le="0.1"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="db_load",le="1.0"} 2', lines)
+        self.assertIn('stage_seconds_bucket{stage="db_load",le="+Inf"} 3', lines)
+        self.assertIn('stage_seconds_count{stage="db_load"} 3', lines)
+        self.assertIn('errors_total{error="Bad \\"quote\\""} 3', lines)
+        with self.assertRaises(ValueError):
+            counter.inc(stage='x')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint_requires_token_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('matching_run_duration_seconds', response.content.decode())
+
+
+class MatchingMetricsTests(TransactionTestCase):
+    def setUp(self):
+        profile_analysis_cache.clear()
+        registry.clear()
+        self.student = StudentProfile.objects.create(
+            firstName='Ada', lastName='Lovelace', email='ada@example.com', university='U', department='CS',
+            degreeLevel='PhD', primaryInterests=['Robotics'], methods=['Python'], hoursPerWeek=20,
+        )
+        for i in range(3):
+            ProfessorProfile.objects.create(name=f'Professor {i}', title='Professor', department='CS', institution='U',
+                                            researchAreas=['Robotics'], methods=['Python'])
+
+    def test_worker_run_records_pipeline_metrics(self):
+        service = MatchingService()
+        service.gemini_service = fake_gemini_service(FakeGeminiModel(), GeminiRequestExecutor(max_in_flight=2, requests_per_minute=60000))
+        service.start_matching_for_student(self.student.id)
+        MatchingWorker(worker_id='test', matching_service=service).process_next()
+
+        text = self.client.get('/metrics').content.decode()
+        for line in (
+            'matching_queue_wait_seconds_count{kind="student"} 1',
+            'matching_run_duration_seconds_count{kind="student",status="completed"} 1',
+            'matching_stage_duration_seconds_count{stage="db_load"} 1',
+            'matching_stage_duration_seconds_count{stage="basic_scoring"} 1',
+            'matching_stage_duration_seconds_count{stage="match_write"} 1',
+            'gemini_request_duration_seconds_count{prompt="batch_score"} 1',
+            'gemini_request_duration_seconds_count{prompt="student_analysis"} 1',
+        ):
+            self.assertIn(line, text)
+        self.assertIn('gemini_tokens_total{prompt="batch_score",direction="out"}', text)
+        self.assertIn('matching_progress_writes_total{target="row"}', text)
+
+    def test_recovered_errors_are_logged_and_counted(self):
+        service = MatchingService()
+        service.gemini_service = fake_gemini_service(FakeGeminiModel(), GeminiRequestExecutor(max_in_flight=2, requests_per_minute=60000))
+        service.start_matching_for_student(self.student.id)
+        with mock.patch.object(professor_vector_index, 'top_k', side_effect=OSError('ANN index unreadable')), \
+                self.assertLogs('api.matching_service', level='ERROR') as logs:
+            MatchingWorker(worker_id='test', matching_service=service).process_next()
+
+        self.assertIn('Similarity shortlist unavailable', logs.output[0])
+        self.assertIn('OSError: ANN index unreadable', logs.output[0])
+        self.assertEqual(MATCHING_ERRORS.value(stage='similarity_shortlist'), 1)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.matchingStatus, 'completed')
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        for i in range(3):
+            ProfessorProfile.objects.create(name=f'Professor {i}', title='Professor', department='CS',
+                                            institution='U', researchAreas=['Robotics'])
+
+    def test_disabled_without_token(self):
+        with override_settings(PROFILING_TOKEN='', PROFILING_DIR=self.directory.name):
+            response = self.client.get('/api/search/global_search/', {'query': 'robotics', 'profile_token': 'x'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(os.scandir(self.directory.name)), [])
+
+    def test_profiled_request_stores_downloadable_artifact(self):
+        untimed = BaseSerializer.__dict__['data']
+        with override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=self.directory.name):
+            plain = self.client.get('/api/search/global_search/', {'query': 'robotics'})
+            self.assertNotIn('X-Profile-Id', plain)
+            with self.assertLogs('api.profiling', level='INFO'):
+                response = self.client.get('/api/search/global_search/', {'query': 'robotics'},
+                                           HTTP_X_PROFILE_TOKEN='secret')
+            self.assertEqual(response.status_code, 200)
+            url = response['X-Profile-Url']
+
+            self.assertEqual(self.client.get(url).status_code, 404)
+            report = self.client.get(url, HTTP_X_PROFILE_TOKEN='secret').json()
+            stats = self.client.get(url, {'format': 'prof', 'profile_token': 'secret'})
+            self.assertNotIn('X-Profile-Id', stats)
+
+        self.assertEqual(report['id'], response['X-Profile-Id'])
+        self.assertEqual(report['path'], '/api/search/global_search/?query=robotics')
+        self.assertEqual(report['query_count'], len(report['queries']))
+        self.assertGreater(report['query_count'], 0)
+        self.assertTrue(any('professor_profiles' in query['sql'] for query in report['queries']))
+        self.assertTrue(any(name.endswith('.data') for name in report['serializers']))
+        # Serializers are only patched while a profiled request runs
+        self.assertIs(BaseSerializer.__dict__['data'], untimed)
+        self.assertIn('function calls', report['profile'])
+        self.assertEqual(stats.status_code, 200)
+        self.assertGreater(len(b''.join(stats.streaming_content)), 0)
+
+    def test_old_artifacts_are_pruned(self):
+        with override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=self.directory.name, PROFILING_MAX_ARTIFACTS=2):
+            for _ in range(3):
+                self.client.get('/api/search/global_search/', {'query': 'robotics', 'profile_token': 'secret'})
+        self.assertEqual(len([entry for entry in os.scandir(self.directory.name) if entry.name.endswith('.json')]), 2)
+
+
+# Query budgets of every router endpoint: (url name, method) -> max queries. Each endpoint is
+# driven against a small and a large fixture (with a small and a large page size) and must
+# stay within budget and issue the same number of queries at both sizes.
+QUERY_BUDGETS = {
+    ('api-root', 'get'): 0,
+    ('studentprofile-list', 'get'): 2,
+    ('studentprofile-list', 'post'): 7,
+    ('studentprofile-detail', 'get'): 1,
+    ('studentprofile-detail', 'put'): 2,
+    ('studentprofile-detail', 'patch'): 2,
+    ('studentprofile-detail', 'delete'): 5,
+    ('studentprofile-search', 'get'): 1,
+    ('studentprofile-matching-status', 'get'): 1,
+    ('professorprofile-list', 'get'): 2,
+    ('professorprofile-list', 'post'): 3,
+    ('professorprofile-detail', 'get'): 1,
+    ('professorprofile-detail', 'put'): 4,
+    ('professorprofile-detail', 'patch'): 4,
+    ('professorprofile-detail', 'delete'): 7,
+    ('professorprofile-search', 'get'): 1,
+    ('match-list', 'get'): 1,
+    ('match-list', 'post'): 4,
+    ('match-detail', 'get'): 1,
+    ('match-detail', 'put'): 5,
+    ('match-detail', 'patch'): 5,
+    ('match-detail', 'delete'): 2,
+    ('match-generate', 'post'): 6,
+    ('match-assign', 'post'): 7,
+    ('search-global-search', 'get'): 2,
+}
+
+
+class QueryBudgetTests(TestCase):
+    SIZES = ((2, 3, 2), (12, 30, 25))  # (students, professors, page size)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        override = override_settings(ANN_INDEX_DIR=self.directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def seed(self, n_students, n_professors):
+        rng = random.Random(n_students)
+        students = StudentProfile.objects.bulk_create(
+            make_student(rng, email=f'student{i}@example.com', university='U', department='CS',
+                         primaryInterests=['Robotics', *rng.sample(TAGS, 2)])
+            for i in range(n_students)
+        )
+        professors = ProfessorProfile.objects.bulk_create(
+            make_professor(rng, title='Professor', department='CS', institution='U',
+                           researchAreas=['Robotics', *rng.sample(TAGS, 2)])
+            for _ in range(n_professors)
+        )
+        matches = Match.objects.bulk_create(
+            Match(student=student, professor=professor, score=rng.randint(0, 100))
+            for student in students for professor in professors
+        )
+        spare = ProfessorProfile.objects.create(name='Spare', title='Professor', department='CS', institution='U')
+        # Warm the in-process indexes so generate measures its steady state
+        professor_tag_index.candidates_for_student(students[0])
+        professor_vector_index.top_k(students[0], 1)
+        return {'student': students[0], 'professor': professors[0], 'match': matches[0], 'spare': spare}
+
+    def request(self, name, method, fixture, page_size):
+        student, professor, match = fixture['student'], fixture['professor'], fixture['match']
+        student_data = {'firstName': 'Ada', 'lastName': 'Lovelace', 'email': 'ada@example.com', 'university': 'U',
+                        'department': 'CS', 'degreeLevel': 'PhD', 'primaryInterests': ['Robotics']}
+        professor_data = {'name': 'Grace Hopper', 'title': 'Professor', 'department': 'CS', 'institution': 'U',
+                          'researchAreas': ['Robotics']}
+        match_data = {'student_id': str(student.id), 'professor_id': str(fixture['spare'].id), 'score': 42}
+        requests = {
+            'api-root': ('/api/', None),
+            'studentprofile-list': ('/api/students/', student_data),
+            'studentprofile-detail': (f'/api/students/{student.id}/', student_data),
+            'studentprofile-search': ('/api/students/search/?q=Test', None),
+            'studentprofile-matching-status': (f'/api/students/{student.id}/matching_status/', None),
+            'professorprofile-list': ('/api/professors/', professor_data),
+            'professorprofile-detail': (f'/api/professors/{professor.id}/', professor_data),
+            'professorprofile-search': ('/api/professors/search/?tags=Robotics', None),
+            'match-list': ('/api/matches/', match_data),
+            'match-detail': (f'/api/matches/{match.id}/', match_data),
+            'match-generate': ('/api/matches/generate/', {'student_id': str(student.id), 'use_ai': False}),
+            'match-assign': ('/api/matches/assign/', None),
+            'search-global-search': ('/api/search/global_search/?query=robotics', None),
+        }
+        path, data = requests[name]
+        if method == 'get':
+            path += ('&' if '?' in path else '?') + f'page_size={page_size}'
+            data = None
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(APIClient(), method)(path, data, format='json')
+        self.assertLess(response.status_code, 400, f'{method.upper()} {name}: {response.status_code} {response.data}')
+        return len(queries), [query['sql'][:160] for query in queries.captured_queries]
+
+    def test_every_router_endpoint_has_a_budget(self):
+        endpoints = {
+            (pattern.name, method)
+            for pattern in router.urls
+            for method in getattr(pattern.callback, 'actions', {'get': None})
+            if method != 'head'  # Added by DRF after the first GET; served like GET
+        }
+        self.assertEqual(endpoints, set(QUERY_BUDGETS))
+
+    def test_query_counts_stay_within_budget_at_every_size(self):
+        for (name, method), budget in QUERY_BUDGETS.items():
+            counts = []
+            for n_students, n_professors, page_size in self.SIZES:
+                with transaction.atomic():
+                    fixture = self.seed(n_students, n_professors)
+                    counts.append(self.request(name, method, fixture, page_size))
+                    transaction.set_rollback(True)
+            with self.subTest(endpoint=name, method=method):
+                (small, small_sql), (large, large_sql) = counts
+                self.assertLessEqual(large, budget, '\n'.join(large_sql))
+                self.assertEqual(small, large, 'Query count grows with data size:\n' + '\n'.join(large_sql))
+
+
+class SharedGeminiModelTests(SimpleTestCase):
+    def setUp(self):
+        llm_backends.reset_shared_model()
+        self.addCleanup(llm_backends.reset_shared_model)
+
+    @override_settings(GEMINI_BACKEND='fake')
+    def test_services_build_no_model_until_first_use(self):
+        services = [MatchingService().gemini_service, GeminiMatchingService()]
+        self.assertIsNone(llm_backends._shared_model)
+
+        model = services[0].model
+        self.assertIsInstance(model, FakeGeminiModel)
+        self.assertIs(services[1].model, model)
+        self.assertIs(GeminiMatchingService(model=FakeModel()).model.__class__, FakeModel)
+
+    def test_concurrent_first_use_builds_one_model(self):
+        barrier = threading.Barrier(8)
+
+        def slow_model():
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        with mock.patch.object(llm_backends, 'get_generative_model', side_effect=slow_model) as factory:
+            def use():
+                barrier.wait()
+                results.append(llm_backends.get_shared_model())
+            threads = [threading.Thread(target=use) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(len({id(model) for model in results}), 1)
+
+    def test_backend_setting_change_resets_model(self):
+        with override_settings(GEMINI_BACKEND='fake', GEMINI_FAKE_SEED=1):
+            first = llm_backends.get_shared_model()
+            self.assertEqual(first.seed, 1)
+        with override_settings(GEMINI_BACKEND='fake', GEMINI_FAKE_SEED=2):
+            self.assertEqual(llm_backends.get_shared_model().seed, 2)
@@ -0,0 +1,143 @@
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Iterable, List, Optional, Sequence
+from django.conf import settings
+import numpy as np
+from .models import StudentProfile, ProfessorProfile
+
+# Profile fields that make up each side's text document; saving any of them refreshes the vector
+PROFESSOR_TEXT_FIELDS = ('researchDescription', 'researchAreas', 'methods', 'publications')
+STUDENT_TEXT_FIELDS = ('interestStatement', 'primaryInterests', 'methods', 'domains', 'coursework', 'publications', 'projects')
+
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself me more most my no nor not of off on once only or other our
+out over own same she should so some such than that the their them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with would you your
+""".split())
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word unigrams and bigrams, stop words removed
+    """
+    words = [word for word in _TOKEN.findall(text.lower()) if word not in STOP_WORDS and len(word) > 1]
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+
+def _titles(entries: Any) -> List[str]:
+    """
+    Titles of publication/project JSON entries (dicts with a title, or plain strings)
+    """
+    titles = []
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            titles.extend(str(entry.get(key) or '') for key in ('title', 'description'))
+        elif isinstance(entry, str):
+            titles.append(entry)
+    return titles
+
+
+def professor_document(professor: ProfessorProfile) -> str:
+    parts = [professor.researchDescription or '', *professor.researchAreas, *professor.methods]
+    return '\n'.join(parts + _titles(professor.publications))
+
+
+def student_document(student: StudentProfile) -> str:
+    parts = [student.interestStatement or '', *student.primaryInterests, *student.methods,
+             *student.domains, *student.coursework]
+    return '\n'.join(parts + _titles(student.publications) + _titles(student.projects))
+
+
+class HashingVectorizer:
+    """
+    Network-free text vectorizer: tokens are hashed (crc32, signed) into `dim` buckets,
+    weighted with sublinear term frequency (1 + log tf) and L2-normalized, so the dot
+    product of two vectors is their cosine similarity. No vocabulary is fitted, so a
+    profile's vector never changes unless its own text does.
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim or settings.TEXT_VECTOR_DIM
+
+    def transform(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token, count in Counter(tokenize(text)).items():
+            digest = zlib.crc32(token.encode('utf-8'))
+            sign = -1.0 if digest & 0x80000000 else 1.0
+            vector[digest % self.dim] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def to_bytes(self, vector: np.ndarray) -> bytes:
+        return vector.astype(np.float32).tobytes()
+
+    def from_bytes(self, blob) -> Optional[np.ndarray]:
+        """
+        Stored vector, or None when missing or encoded with a different dimension
+        """
+        if blob is None or len(blob) != self.dim * 4:
+            return None
+        return np.frombuffer(bytes(blob), dtype=np.float32)
+
+
+def refresh_text_vector(instance):
+    """
+    Recompute the stored text vector of a professor or student profile
+    """
+    vectorizer = HashingVectorizer()
+    if isinstance(instance, ProfessorProfile):
+        vector = vectorizer.transform(professor_document(instance))
+    else:
+        vector = vectorizer.transform(student_document(instance))
+    instance.textVector = vectorizer.to_bytes(vector)
+
+
+def profile_vector(instance, vectorizer: Optional[HashingVectorizer] = None) -> np.ndarray:
+    """
+    Stored text vector of a profile, computed from its text when missing or outdated
+    """
+    vectorizer = vectorizer or HashingVectorizer()
+    vector = vectorizer.from_bytes(instance.textVector)
+    if vector is None:
+        document = professor_document(instance) if isinstance(instance, ProfessorProfile) else student_document(instance)
+        vector = vectorizer.transform(document)
+    return vector
+
+
+def text_vector_stale(update_fields: Optional[Iterable[str]], text_fields: Sequence[str]) -> bool:
+    """
+    Whether a save with these update_fields can change the text document
+    """
+    return update_fields is None or bool(set(update_fields) & set(text_fields))
+
+
+class SemanticSimilarityEngine:
+    """
+    Cosine similarity of one student against a whole professor catalog: the stored
+    professor vectors are stacked into a float32 matrix once, and each student is scored
+    with a single matrix-vector product. Professors without a (current) stored vector
+    are vectorized on the fly.
+    """
+
+    def __init__(self, professors: Sequence[ProfessorProfile], vectorizer: Optional[HashingVectorizer] = None):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.professors: List[ProfessorProfile] = list(professors)
+        self.matrix = np.zeros((len(self.professors), self.vectorizer.dim), dtype=np.float32)
+        for row, professor in enumerate(self.professors):
+            self.matrix[row] = profile_vector(professor, self.vectorizer)
+
+    def similarities(self, student: StudentProfile) -> np.ndarray:
+        """
+        Cosine similarity with every professor, in catalog order
+        """
+        if not self.professors:
+            return np.zeros(0, dtype=np.float32)
+        return self.matrix @ profile_vector(student, self.vectorizer)
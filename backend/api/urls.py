@@ -4,6 +4,7 @@ from .views import (
     StudentProfileViewSet, ProfessorProfileViewSet, 
     MatchViewSet, SearchViewSet
 )
+from .events import matching_events
 
 router = DefaultRouter()
 router.register(r'students', StudentProfileViewSet)
@@ -12,5 +13,6 @@ router.register(r'matches', MatchViewSet)
 router.register(r'search', SearchViewSet, basename='search')
 
 urlpatterns = [
+    path('students/<uuid:pk>/matching_events/', matching_events, name='student-matching-events'),
     path('', include(router.urls)),
 ]
@@ -2,17 +2,27 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from .models import StudentProfile, ProfessorProfile, Match
 from .serializers import (
     StudentProfileSerializer, ProfessorProfileSerializer, MatchSerializer,
-    StudentProfileListSerializer, ProfessorProfileListSerializer
+    StudentProfileListSerializer, ProfessorProfileListSerializer,
+    MatchListSerializer, MATCH_LIST_FIELDS
 )
+from .assignment import assign_students, assignment_edges
 from .gemini_service import GeminiMatchingService
-from .matching_service import MatchingService
+from .matching_service import MatchingService, text_similarity_score, upsert_matches
+from .pagination import KeysetPagination, MatchPagination
+from .progress import get_matching_status
+from .response_cache import cached_catalog_response
+from .scoring_engine import BasicScoringEngine
+from .text_vectors import SemanticSimilarityEngine
 
 @extend_schema_view(
     list=extend_schema(
@@ -51,18 +61,14 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             return StudentProfileListSerializer
         return StudentProfileSerializer
     
-    def create(self, request, *args, **kwargs):
+    def perform_create(self, serializer):
         """Create a new student profile and trigger matching"""
-        response = super().create(request, *args, **kwargs)
+        super().perform_create(serializer)
         
-        # Start matching process in background
-        if response.status_code == 201:  # Created successfully
-            student_id = response.data.get('id')
-            if student_id:
-                matching_service = MatchingService()
-                matching_service.start_matching_for_student(student_id)
-        
-        return response
+        # Start matching process in background; the saved profile is passed along
+        # instead of being read back by id
+        matching_service = MatchingService()
+        matching_service.start_matching_for_student(serializer.instance.id, student=serializer.instance)
     
     @extend_schema(
         summary="Search students",
@@ -93,6 +99,9 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
                 description='Filter by research interests (can be multiple)',
                 many=True
             ),
+            OpenApiParameter(name='cursor', type=OpenApiTypes.STR, description='Cursor from the previous page (next link)'),
+            OpenApiParameter(name='page_size', type=OpenApiTypes.INT, description='Page size (max 100)'),
+            OpenApiParameter(name='count', type=OpenApiTypes.STR, description="Pass 'approximate' to include an estimated total"),
         ],
         examples=[
             OpenApiExample(
@@ -135,35 +144,40 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
         if interests:
             queryset = queryset.filter(primaryInterests__overlap=interests)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
+        paginator = KeysetPagination(ordering=('lastName', 'firstName', 'id'))
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        response = {
             'success': True,
             'data': serializer.data,
-            'total': queryset.count()
-        })
+            'next': paginator.get_next_link()
+        }
+        if paginator.count is not None:
+            response['total'] = paginator.count
+        return Response(response)
     
     @extend_schema(
         summary="Get matching status",
-        description="Get the current matching status for a student",
+        description="Get the current matching status for a student. "
+                    "To follow a running match, prefer the server-sent events stream at "
+                    "/api/students/{id}/matching_events/ over polling this endpoint.",
         tags=['students']
     )
     @action(detail=True, methods=['get'])
     def matching_status(self, request, pk=None):
         """Get the matching status for a student"""
-        try:
-            student = self.get_object()
-            matching_service = MatchingService()
-            status = matching_service.get_matching_status(student.id)
-            
-            return Response({
-                'success': True,
-                'data': status
-            })
-        except StudentProfile.DoesNotExist:
+        # Reads only the status columns; no matching/Gemini services are constructed
+        status = get_matching_status(pk)
+        if status['status'] == 'not_found':
             return Response({
                 'success': False,
                 'error': 'Student not found'
             }, status=404)
+        
+        return Response({
+            'success': True,
+            'data': status
+        })
 
 @extend_schema_view(
     list=extend_schema(
@@ -202,6 +216,16 @@ class ProfessorProfileViewSet(viewsets.ModelViewSet):
             return ProfessorProfileListSerializer
         return ProfessorProfileSerializer
 
+    # Read endpoints are served from the versioned response cache; any professor
+    # save/delete bumps the catalog version (see signals.py)
+    @cached_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @extend_schema(
         summary="Search professors",
         description="Search professors by various criteria including name, research areas, department, and accepting students status",
@@ -210,6 +234,9 @@ class ProfessorProfileViewSet(viewsets.ModelViewSet):
             OpenApiParameter(name='tags', type=OpenApiTypes.STR, description='Comma-separated research areas'),
             OpenApiParameter(name='department', type=OpenApiTypes.STR, description='Department filter'),
             OpenApiParameter(name='accepting_students', type=OpenApiTypes.BOOL, description='Filter by accepting students status'),
+            OpenApiParameter(name='cursor', type=OpenApiTypes.STR, description='Cursor from the previous page (next link)'),
+            OpenApiParameter(name='page_size', type=OpenApiTypes.INT, description='Page size (max 100)'),
+            OpenApiParameter(name='count', type=OpenApiTypes.STR, description="Pass 'approximate' to include an estimated total"),
         ],
         examples=[
             OpenApiExample(
@@ -231,6 +258,7 @@ class ProfessorProfileViewSet(viewsets.ModelViewSet):
         tags=['professors']
     )
     @action(detail=False, methods=['get'])
+    @cached_catalog_response
     def search(self, request):
         """Search professors by various criteria"""
         query = request.query_params.get('query', '')
@@ -256,8 +284,10 @@ class ProfessorProfileViewSet(viewsets.ModelViewSet):
             accepting_students = accepting_students.lower() == 'true'
             queryset = queryset.filter(acceptingStudents=accepting_students)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination(ordering=('name', 'id'))
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 @extend_schema_view(
     list=extend_schema(
@@ -279,6 +309,11 @@ class ProfessorProfileViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.FLOAT,
                 description='Filter matches by minimum score'
             ),
+            OpenApiParameter(
+                name='assigned',
+                type=OpenApiTypes.BOOL,
+                description='Only matches of the latest global assignment'
+            ),
         ],
         examples=[
             OpenApiExample(
@@ -319,10 +354,19 @@ class MatchViewSet(viewsets.ModelViewSet):
     queryset = Match.objects.all()
     serializer_class = MatchSerializer
     permission_classes = [AllowAny]
+    pagination_class = MatchPagination
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'generate'):
+            return MatchListSerializer
+        return MatchSerializer
 
     def get_queryset(self):
         """Filter matches based on query parameters"""
-        queryset = Match.objects.all()
+        queryset = Match.objects.select_related('student', 'professor')
+        if self.action == 'list':
+            # One joined query projecting only the summary columns
+            queryset = queryset.only(*MATCH_LIST_FIELDS)
         
         # Filter by student ID
         student_id = self.request.query_params.get('student_id')
@@ -334,6 +378,10 @@ class MatchViewSet(viewsets.ModelViewSet):
         if professor_id:
             queryset = queryset.filter(professor_id=professor_id)
         
+        # Only matches of the latest global assignment
+        if self.request.query_params.get('assigned') == 'true':
+            queryset = queryset.filter(assigned=True)
+        
         # Filter by minimum score
         min_score = self.request.query_params.get('min_score')
         if min_score:
@@ -386,15 +434,65 @@ class MatchViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(matches, many=True)
         return Response(serializer.data)
 
+    @extend_schema(
+        summary="Run the global assignment",
+        description="Assign students to professors from the existing match scores with student-proposing deferred acceptance, respecting each professor's capacity. The result is a stable allocation, stored on the matches (list it with ?assigned=true). The solve runs within the request, so catalogs above ASSIGNMENT_MAX_REQUEST_MATCHES matches are refused (413); assign those with python manage.py assign_students.",
+        request=None,
+        tags=['matches']
+    )
+    @action(detail=False, methods=['post'])
+    def assign(self, request):
+        """Compute the capacity-constrained assignment of students to professors"""
+        if assignment_edges().count() > settings.ASSIGNMENT_MAX_REQUEST_MATCHES:
+            return Response(
+                {'error': 'Too many matches to assign within a request; run python manage.py assign_students'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        return Response(assign_students())
+
     def _match_student_to_professors(self, student, use_ai=True):
         """AI-enhanced matching algorithm for student to professors"""
-        professors = ProfessorProfile.objects.filter(acceptingStudents=True)
+        professors = list(ProfessorProfile.objects.filter(acceptingStudents=True))
         matches = []
 
-        for professor in professors:
-            # Basic scoring
-            score = self._calculate_basic_score(student, professor)
-            
+        # Basic scoring for every professor in one batched pass, keeping only
+        # professors that share a tag with the student (or rank in the top-K)
+        scores = BasicScoringEngine(professors).score(student)
+        candidates = MatchingService.select_candidates(
+            student, professors, scores, MatchingService.similar_professor_ids(student)
+        )
+        similarities = dict(zip(
+            candidates, SemanticSimilarityEngine([professors[index] for index in candidates]).similarities(student)
+        ))
+
+        # One query for the existing matches instead of a get_or_create per professor
+        existing = {
+            match.professor_id: match
+            for match in Match.objects.filter(
+                student=student,
+                professor_id__in=[professors[index].id for index in candidates]
+            )
+        }
+        writes = []
+        # One service for the whole run; it shares the process-wide model client.
+        # The prompt builders and the analysis cache read plain dicts, as in MatchingService.
+        gemini_service = GeminiMatchingService() if use_ai else None
+        student_data = dict(student.__dict__)
+
+        for index in candidates:
+            professor = professors[index]
+            score = int(scores[index])
+
+            # Existing matches are only replaced when the new score is higher
+            match = existing.get(professor.id)
+            if match is not None:
+                # Reuse the loaded profiles; the serializer would otherwise fetch both per match
+                match.student = student
+                match.professor = professor
+                if score <= match.score:
+                    matches.append(match)
+                    continue
+
             # AI-enhanced analysis
             ai_score = None
             ai_explanation = ""
@@ -403,8 +501,7 @@ class MatchViewSet(viewsets.ModelViewSet):
 
             if use_ai:
                 try:
-                    gemini_service = GeminiMatchingService()
-                    ai_result = gemini_service.analyze_match(student, professor)
+                    ai_result = gemini_service.analyze_match(student_data, professor.__dict__)
                     ai_score = ai_result.get('score', score)
                     ai_explanation = ai_result.get('explanation', '')
                     ai_analysis = ai_result.get('analysis', {})
@@ -413,60 +510,25 @@ class MatchViewSet(viewsets.ModelViewSet):
                     print(f"AI analysis failed: {e}")
                     ai_score = score
 
-            # Create or update match
-            match, created = Match.objects.get_or_create(
-                student=student,
-                professor=professor,
-                defaults={
-                    'score': score,
-                    'aiScore': ai_score,
-                    'aiExplanation': ai_explanation,
-                    'aiAnalysis': ai_analysis,
-                    'detailedScores': detailed_scores,
-                    'highlights': self._generate_highlights(student, professor),
-                    'studentInterests': student.primaryInterests,
-                    'professorInterests': professor.researchAreas
-                }
-            )
-            
-            # Update existing match if it already exists and new score is higher
-            if not created and score > match.score:
-                match.score = score
-                match.aiScore = ai_score
-                match.aiExplanation = ai_explanation
-                match.aiAnalysis = ai_analysis
-                match.detailedScores = detailed_scores
-                match.highlights = self._generate_highlights(student, professor)
-                match.studentInterests = student.primaryInterests
-                match.professorInterests = professor.researchAreas
-                match.save()
+            detailed_scores = {**detailed_scores, 'textSimilarity': text_similarity_score(float(similarities[index]))}
+
+            if match is None:
+                match = Match(student=student, professor=professor)
+            match.score = score
+            match.aiScore = ai_score
+            match.aiExplanation = ai_explanation
+            match.aiAnalysis = ai_analysis
+            match.detailedScores = detailed_scores
+            match.highlights = self._generate_highlights(student, professor)
+            match.studentInterests = student.primaryInterests
+            match.professorInterests = professor.researchAreas
+            writes.append(match)
             matches.append(match)
 
-        return matches
+        # Create and update matches with one upsert per chunk
+        upsert_matches(writes)
 
-    def _calculate_basic_score(self, student, professor):
-        """Calculate basic compatibility score"""
-        score = 0
-        
-        # Research area overlap
-        common_areas = set(student.primaryInterests) & set(professor.researchAreas)
-        if common_areas:
-            score += len(common_areas) * 20
-        
-        # Method overlap
-        common_methods = set(student.methods) & set(professor.methods)
-        if common_methods:
-            score += len(common_methods) * 15
-        
-        # Degree level compatibility
-        if student.degreeLevel in professor.preferredDegreeLevels:
-            score += 25
-        
-        # Availability compatibility
-        if student.hoursPerWeek >= 10:  # Assuming minimum requirement
-            score += 20
-        
-        return min(score, 100)
+        return matches
 
     def _generate_highlights(self, student, professor):
         """Generate match highlights"""
@@ -488,7 +550,8 @@ class MatchViewSet(viewsets.ModelViewSet):
 @extend_schema_view(
     list=extend_schema(
         summary="Global search",
-        description="Search across all entities (students, professors) with a single query",
+        description="Search across all entities (students, professors) with a single query. "
+                    "Supports web-search syntax (quoted phrases, OR, -exclusions); results are ordered by relevance.",
         parameters=[
             OpenApiParameter(name='query', type=OpenApiTypes.STR, required=True, description='Search query'),
             OpenApiParameter(
@@ -498,6 +561,10 @@ class MatchViewSet(viewsets.ModelViewSet):
                 enum=['students', 'professors', 'all'],
                 default='all'
             ),
+            OpenApiParameter(name='students_cursor', type=OpenApiTypes.STR, description='Cursor for the next page of students'),
+            OpenApiParameter(name='professors_cursor', type=OpenApiTypes.STR, description='Cursor for the next page of professors'),
+            OpenApiParameter(name='page_size', type=OpenApiTypes.INT, description='Page size per entity type (max 100)'),
+            OpenApiParameter(name='count', type=OpenApiTypes.STR, description="Pass 'approximate' to include estimated totals"),
         ],
         examples=[
             OpenApiExample(
@@ -533,28 +600,34 @@ class SearchViewSet(viewsets.ViewSet):
         
         results = {
             'students': [],
-            'professors': []
+            'professors': [],
+            'next': {}
         }
         
+        # Ranked full-text search over the trigger-maintained search vectors; the rank is
+        # cast to double precision so it round-trips exactly through the page cursor
+        search_query = SearchQuery(query, search_type='websearch', config='english')
+        rank = Cast(SearchRank(F('searchVector'), search_query), FloatField())
+        ordering = ('-rank', 'id')
+
         # Search students
         if entity_type in ['students', 'all']:
-            students = StudentProfile.objects.filter(
-                Q(firstName__icontains=query) |
-                Q(lastName__icontains=query) |
-                Q(primaryInterests__overlap=[query]) |
-                Q(department__icontains=query) |
-                Q(university__icontains=query)
-            )
-            results['students'] = StudentProfileListSerializer(students, many=True).data
+            students = StudentProfile.objects.filter(searchVector=search_query).annotate(rank=rank)
+            paginator = KeysetPagination(ordering=ordering, cursor_query_param='students_cursor')
+            page = paginator.paginate_queryset(students, request, view=self)
+            results['students'] = StudentProfileListSerializer(page, many=True).data
+            results['next']['students'] = paginator.get_next_link()
+            if paginator.count is not None:
+                results.setdefault('count', {})['students'] = paginator.count
         
         # Search professors
         if entity_type in ['professors', 'all']:
-            professors = ProfessorProfile.objects.filter(
-                Q(name__icontains=query) |
-                Q(researchAreas__overlap=[query]) |
-                Q(department__icontains=query) |
-                Q(institution__icontains=query)
-            )
-            results['professors'] = ProfessorProfileListSerializer(professors, many=True).data
+            professors = ProfessorProfile.objects.filter(searchVector=search_query).annotate(rank=rank)
+            paginator = KeysetPagination(ordering=ordering, cursor_query_param='professors_cursor')
+            page = paginator.paginate_queryset(professors, request, view=self)
+            results['professors'] = ProfessorProfileListSerializer(page, many=True).data
+            results['next']['professors'] = paginator.get_next_link()
+            if paginator.count is not None:
+                results.setdefault('count', {})['professors'] = paginator.count
         
         return Response(results)
@@ -14,11 +14,11 @@ import {
   ExternalLink
 } from 'lucide-react'
 import { matchApi, studentApi } from '@/lib/api'
-import { Match } from '@/types'
+import { MatchSummary } from '@/types'
 import { userSession } from '@/lib/utils'
 
 export default function DashboardPage() {
-  const [matches, setMatches] = useState<Match[]>([])
+  const [matches, setMatches] = useState<MatchSummary[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [matchingStatus, setMatchingStatus] = useState<{
@@ -61,7 +61,7 @@ export default function DashboardPage() {
           : (matchesResponse || [])
         
         // Deduplicate matches by professor ID - keep the highest scoring match for each professor
-        const uniqueMatches = matchesData.reduce((acc: Match[], currentMatch: Match) => {
+        const uniqueMatches = matchesData.reduce((acc: MatchSummary[], currentMatch: MatchSummary) => {
           const existingMatch = acc.find(match => match.professor.id === currentMatch.professor.id)
           
           if (!existingMatch) {
@@ -76,7 +76,7 @@ export default function DashboardPage() {
         }, [])
         
         // Sort by score (highest first)
-        uniqueMatches.sort((a: Match, b: Match) => b.score - a.score)
+        uniqueMatches.sort((a: MatchSummary, b: MatchSummary) => b.score - a.score)
         
         setMatches(uniqueMatches)
         
@@ -91,52 +91,55 @@ export default function DashboardPage() {
     fetchData()
   }, [])
 
-  // Poll for matching status updates when matching is in progress
+  // Follow matching status updates over server-sent events while matching is in progress
+  const isMatching = matchingStatus?.status === 'in_progress'
+
   useEffect(() => {
-    if (!matchingStatus || matchingStatus.status !== 'in_progress') {
+    if (!isMatching) {
       return
     }
 
-    const pollInterval = setInterval(async () => {
-      try {
-        const currentUser = userSession.getCurrentUser()
-        if (!currentUser || currentUser.role !== 'student') {
-          return
-        }
+    const currentUser = userSession.getCurrentUser()
+    if (!currentUser || currentUser.role !== 'student') {
+      return
+    }
+
+    const unsubscribe = studentApi.subscribeMatchingStatus(currentUser.id, async (statusUpdate) => {
+      setMatchingStatus(statusUpdate)
 
-        const statusResponse = await studentApi.getMatchingStatus(currentUser.id)
-        setMatchingStatus(statusResponse)
+      // If matching is completed, refresh matches
+      if (statusUpdate.status !== 'completed') {
+        return
+      }
 
-        // If matching is completed, refresh matches
-        if (statusResponse.status === 'completed') {
-          const matchesResponse = await matchApi.getAll({ studentId: currentUser.id })
-          const matchesData = matchesResponse && typeof matchesResponse === 'object' && 'results' in matchesResponse 
-            ? (matchesResponse as any).results 
-            : (matchesResponse || [])
+      try {
+        const matchesResponse = await matchApi.getAll({ studentId: currentUser.id })
+        const matchesData = matchesResponse && typeof matchesResponse === 'object' && 'results' in matchesResponse 
+          ? (matchesResponse as any).results 
+          : (matchesResponse || [])
+        
+        const uniqueMatches = matchesData.reduce((acc: MatchSummary[], currentMatch: MatchSummary) => {
+          const existingMatch = acc.find(match => match.professor.id === currentMatch.professor.id)
           
-          const uniqueMatches = matchesData.reduce((acc: Match[], currentMatch: Match) => {
-            const existingMatch = acc.find(match => match.professor.id === currentMatch.professor.id)
-            
-            if (!existingMatch) {
-              acc.push(currentMatch)
-            } else if (currentMatch.score > existingMatch.score) {
-              const index = acc.findIndex(match => match.professor.id === currentMatch.professor.id)
-              acc[index] = currentMatch
-            }
-            
-            return acc
-          }, [])
+          if (!existingMatch) {
+            acc.push(currentMatch)
+          } else if (currentMatch.score > existingMatch.score) {
+            const index = acc.findIndex(match => match.professor.id === currentMatch.professor.id)
+            acc[index] = currentMatch
+          }
           
-          uniqueMatches.sort((a: Match, b: Match) => b.score - a.score)
-          setMatches(uniqueMatches)
-        }
+          return acc
+        }, [])
+        
+        uniqueMatches.sort((a: MatchSummary, b: MatchSummary) => b.score - a.score)
+        setMatches(uniqueMatches)
       } catch (err) {
-        console.error('Error polling matching status:', err)
+        console.error('Error refreshing matches:', err)
       }
-    }, 3000) // Poll every 3 seconds
+    })
 
-    return () => clearInterval(pollInterval)
-  }, [matchingStatus])
+    return unsubscribe
+  }, [isMatching])
 
   const getMatchStrengthColor = (score: number) => {
     if (score >= 90) return 'bg-green-100 text-green-800 dark:bg-green-900 dark:text-green-200'
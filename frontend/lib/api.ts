@@ -1,7 +1,9 @@
 import { 
   StudentProfile, 
   ProfessorProfile, 
-  Match 
+  Match,
+  MatchSummary,
+  AssignmentResult
 } from '@/types'
 
 // API Response types
@@ -12,6 +14,21 @@ interface PaginatedResponse<T> {
   results: T[]
 }
 
+// Keyset-paginated responses: follow `next` until it is null
+interface CursorPage<T> {
+  next: string | null
+  count?: number
+  results: T[]
+}
+
+export interface MatchingStatus {
+  status: 'pending' | 'in_progress' | 'completed' | 'failed' | 'not_found'
+  progress: number
+  started_at: string | null
+  completed_at: string | null
+  error: string | null
+}
+
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api'
 
 class ApiError extends Error {
@@ -104,13 +121,24 @@ export const studentApi = {
 
   // Get matching status
   getMatchingStatus: (id: string) =>
-    apiRequest<{
-      status: 'pending' | 'in_progress' | 'completed' | 'failed' | 'not_found'
-      progress: number
-      started_at: string | null
-      completed_at: string | null
-      error: string | null
-    }>(`/students/${id}/matching_status/`),
+    apiRequest<MatchingStatus>(`/students/${id}/matching_status/`),
+
+  // Subscribe to matching status updates over server-sent events.
+  // Returns a function that closes the stream.
+  subscribeMatchingStatus: (id: string, onStatus: (status: MatchingStatus) => void) => {
+    const source = new EventSource(`${API_BASE_URL}/students/${id}/matching_events/`)
+    const handleStatus = (event: MessageEvent) => onStatus(JSON.parse(event.data))
+    const handleFinal = (event: MessageEvent) => {
+      handleStatus(event)
+      source.close()
+    }
+
+    source.addEventListener('progress', handleStatus)
+    source.addEventListener('completed', handleFinal)
+    source.addEventListener('failed', handleFinal)
+
+    return () => source.close()
+  },
 
   // Search students
   search: (filters: {
@@ -127,7 +155,12 @@ export const studentApi = {
       filters.tags.forEach(tag => params.append('interests', tag))
     }
     
-    return apiRequest<StudentProfile[]>(`/students/search/?${params.toString()}`)
+    return apiRequest<{
+      success: boolean
+      data: StudentProfile[]
+      next: string | null
+      total?: number
+    }>(`/students/search/?${params.toString()}`)
   },
 }
 
@@ -186,7 +219,7 @@ export const professorApi = {
     if (filters.department) params.append('department', filters.department)
     if (filters.acceptingStudents !== undefined) params.append('accepting_students', filters.acceptingStudents.toString())
     
-    return apiRequest<ProfessorProfile[]>(`/professors/search/?${params.toString()}`)
+    return apiRequest<CursorPage<ProfessorProfile>>(`/professors/search/?${params.toString()}`)
   }
 }
 
@@ -196,13 +229,15 @@ export const matchApi = {
     studentId?: string
     professorId?: string
     minScore?: number
+    assigned?: boolean
   } = {}) => {
     const params = new URLSearchParams()
     if (filters?.studentId) params.append('student_id', filters.studentId)
     if (filters?.professorId) params.append('professor_id', filters.professorId)
     if (filters?.minScore) params.append('min_score', filters.minScore.toString())
+    if (filters?.assigned) params.append('assigned', 'true')
     
-    return apiRequest<PaginatedResponse<Match>>(`/matches/?${params.toString()}`)
+    return apiRequest<CursorPage<MatchSummary>>(`/matches/?${params.toString()}`)
   },
 
   // Get match by ID
@@ -235,11 +270,17 @@ export const matchApi = {
     params.append('student_id', studentId)
     params.append('use_ai', useAi.toString())
     
-    return apiRequest<Match[]>('/matches/generate/', {
+    return apiRequest<MatchSummary[]>('/matches/generate/', {
       method: 'POST',
       body: JSON.stringify({ student_id: studentId, use_ai: useAi })
     })
-  }
+  },
+
+  // Run the capacity-constrained global assignment
+  assign: () =>
+    apiRequest<AssignmentResult>('/matches/assign/', {
+      method: 'POST'
+    })
 }
 
 export const searchApi = {
@@ -252,6 +293,7 @@ export const searchApi = {
     return apiRequest<{
       students: StudentProfile[]
       professors: ProfessorProfile[]
+      next: { students?: string | null, professors?: string | null }
     }>(`/search/?${params.toString()}`)
   }
 }
@@ -80,6 +80,7 @@ export interface ProfessorProfile {
   methods: string[]
   preferredDegreeLevels: ('BS' | 'MS' | 'PhD')[]
   acceptingStudents: boolean
+  capacity: number
   profileCompleteness: number
   contactPreferences: 'in-app' | 'email'
   timezone: string
@@ -133,10 +134,24 @@ export interface Match {
     availabilityMatch: number
     communicationMatch: number
   }
+  assigned: boolean
   createdAt: string
   updatedAt: string
 }
 
+export interface AssignmentResult {
+  students: number
+  assigned: number
+  professors: number
+  seconds: number
+}
+
+// Match list / generate responses carry summaries of both profiles
+export interface MatchSummary extends Pick<Match, 'id' | 'score' | 'aiScore' | 'aiExplanation' | 'highlights' | 'detailedScores' | 'assigned' | 'createdAt'> {
+  student: Pick<StudentProfile, 'id' | 'firstName' | 'lastName' | 'university' | 'department' | 'degreeLevel'>
+  professor: Pick<ProfessorProfile, 'id' | 'name' | 'title' | 'institution' | 'department' | 'researchAreas' | 'acceptingStudents'>
+}
+
 export interface SkillFit {
   skill: string;
   studentLevel: number;